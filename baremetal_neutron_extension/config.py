@@ -30,14 +30,155 @@ ironic_opts = [
                default=2,
                help="Seconds to wait between retrying commands due to auth "
                     "failure"),
-    cfg.IntOpt("save_queue_max_age",
-               default=30,
-               help="Seconds to wait before processing switch config save "
-                    "commands"),
-    cfg.IntOpt("save_queue_get_wait",
+    cfg.BoolOpt("incremental_create",
+                default=False,
+                help="Compare a port's running-config against the config it "
+                     "should have and only send the difference, instead of "
+                     "clearing and recreating the port"),
+    cfg.FloatOpt("retry_backoff",
+                 default=2.0,
+                 help="Multiplier applied to the retry interval after each "
+                      "failed attempt"),
+    cfg.FloatOpt("retry_max_interval",
+                 default=10.0,
+                 help="Maximum seconds to wait between retries"),
+    cfg.FloatOpt("retry_jitter",
+                 default=0.5,
+                 help="Fraction of each retry interval to randomly shave off "
+                      "so concurrent retries spread out"),
+    cfg.FloatOpt("retry_deadline",
+                 default=20.0,
+                 help="Seconds after which a failing switch operation is no "
+                      "longer retried"),
+    cfg.IntOpt("save_quiet_period",
                default=5,
-               help="Seconds to wait between polling for new switch config "
-                    "save commands")
+               deprecated_name="save_queue_get_wait",
+               help="Seconds a switch must go without changes before its "
+                    "config is saved"),
+    cfg.IntOpt("save_max_delay",
+               default=30,
+               deprecated_name="save_queue_max_age",
+               help="Maximum seconds a switch config save is put off by "
+                    "further changes"),
+    cfg.BoolOpt("durable_save_queue",
+                default=False,
+                help="Record pending switch config saves in the database, "
+                     "so they survive restarts and are shared between API "
+                     "workers"),
+    cfg.IntOpt("save_lease_timeout",
+               default=120,
+               help="Seconds a worker may hold a claimed switch config save "
+                    "before another worker may take it over"),
+    cfg.IntOpt("save_sweep_interval",
+               default=60,
+               help="Seconds between checks for switch config saves left "
+                    "over by restarted or failed workers"),
+    cfg.IntOpt("save_max_pending",
+               default=0,
+               help="Maximum number of switches with a queued config save, "
+                    "0 for no limit. Further saves for an already queued "
+                    "switch are always merged into its queued save"),
+    cfg.StrOpt("save_overflow_policy",
+               default="block",
+               choices=["block", "sync"],
+               help="What to do with a save for a new switch once "
+                    "save_max_pending is reached: 'block' waits up to "
+                    "save_overflow_timeout seconds for room and then saves "
+                    "synchronously, 'sync' saves synchronously right away"),
+    cfg.IntOpt("save_overflow_timeout",
+               default=10,
+               help="Seconds to wait for room in a full save queue"),
+    cfg.BoolOpt("fused_commands",
+                default=False,
+                help="Send each create, delete and detach as a single RPC, "
+                     "skipping over the errors in fused_tolerated_errors "
+                     "instead of splitting the operation up to survive them"),
+    cfg.ListOpt("fused_tolerated_errors",
+                default=["no ip source binding:does-not-exist",
+                         "vpc:already-exists"],
+                help="'<command prefix>:<error>' pairs. A command starting "
+                     "with the prefix that fails with an error of that "
+                     "category (see drivers/cisco/errors.py), or an error "
+                     "containing that text, is skipped in fused mode"),
+    cfg.FloatOpt("running_config_cache_ttl",
+                 default=0,
+                 help="Seconds a switch-wide running-config snapshot is "
+                      "used to answer running-config and clear reads for "
+                      "the ports on it, 0 to query each port on its own. "
+                      "Snapshots are dropped on every change made through "
+                      "the driver"),
+    cfg.FloatOpt("interface_status_cache_ttl",
+                 default=0,
+                 help="Seconds to answer interface status requests from "
+                      "one 'show interface' of the whole switch, 0 to "
+                      "query each port on its own"),
+    cfg.FloatOpt("dhcp_binding_index_ttl",
+                 default=0,
+                 help="Seconds to trust a per-switch index of dhcp snooping "
+                      "bindings, loaded with one bulk read and kept up to "
+                      "date with the driver's own changes, instead of "
+                      "reading a port-channel's bindings before clearing "
+                      "it. 0 disables the index"),
+    cfg.BoolOpt("pipelined_reads",
+                default=False,
+                help="Send the show commands of running_config and "
+                     "interface_status as pipelined RPCs on one NETCONF "
+                     "session, using ncclient's async mode, rather than "
+                     "waiting for each reply before sending the next"),
+    cfg.FloatOpt("command_batch_window",
+                 default=0,
+                 help="Seconds to gather config changes for the same switch "
+                      "from concurrent requests and send them in a single "
+                      "RPC, 0 to send every change on its own. Changes that "
+                      "can't be applied twice, like vPCs and ip source "
+                      "bindings, are always sent on their own"),
+    cfg.IntOpt("command_batch_max_size",
+               default=50,
+               help="Maximum number of changes sent in a single batch"),
+    cfg.IntOpt("session_pool_min_size",
+               default=0,
+               help="Number of NETCONF sessions to keep open per switch"),
+    cfg.IntOpt("session_pool_max_size",
+               default=4,
+               help="Maximum number of concurrent NETCONF sessions per "
+                    "switch"),
+    cfg.IntOpt("session_pool_idle_timeout",
+               default=300,
+               help="Seconds an idle NETCONF session is kept open before "
+                    "it is closed"),
+    cfg.IntOpt("session_keepalive_interval",
+               default=60,
+               help="Seconds between health probes of idle NETCONF "
+                    "sessions, 0 to disable"),
+    cfg.IntOpt("netconf_channels_per_transport",
+               default=1,
+               help="NETCONF sessions to open as channels of one "
+                    "authenticated SSH connection to a switch, rather than "
+                    "each doing its own SSH handshake and authentication. "
+                    "1 gives every session its own connection"),
+    cfg.ListOpt("nxapi_switches",
+                default=[],
+                help="Switch hosts to manage through NX-API (JSON-RPC over "
+                     "HTTP(S)) rather than NETCONF over SSH"),
+    cfg.StrOpt("nxapi_scheme",
+               default="https",
+               choices=["http", "https"],
+               help="Scheme NX-API switches are reached on"),
+    cfg.IntOpt("nxapi_port",
+               default=0,
+               help="Port NX-API switches listen on, 0 for the scheme's "
+                    "default"),
+    cfg.BoolOpt("nxapi_verify_ssl",
+                default=True,
+                help="Verify the certificates of NX-API switches"),
+    cfg.IntOpt("circuit_breaker_threshold",
+               default=3,
+               help="Consecutive failures reaching a switch after which "
+                    "calls to it fail immediately, 0 to disable"),
+    cfg.IntOpt("circuit_breaker_reset_timeout",
+               default=30,
+               help="Seconds to fail fast on an unreachable switch before "
+                    "probing it again")
 ]
 
 cfg.CONF.register_opts(ironic_opts, "ironic")
@@ -14,13 +14,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from oslo.db import exception as db_exc
+import sqlalchemy as sa
 from sqlalchemy import orm
 
 from neutron.db import api as db_api
 from neutron.openstack.common import log as logging
+from neutron.openstack.common import timeutils
 
 from baremetal_neutron_extension.db import models
 
+import datetime
+
 
 LOG = logging.getLogger(__name__)
 
@@ -355,3 +360,127 @@ def delete_switch(switch_id, session=None):
         session.delete(switch)
         session.flush()
         return True
+
+
+def upsert_pending_save(switch_host, session=None):
+    """Request a config save for a switch, merging into a pending one."""
+    if not session:
+        session = db_api.get_session()
+
+    now = timeutils.utcnow()
+    model = models.SwitchPendingSave
+
+    with session.begin(subtransactions=True):
+        updated = (session.query(model).
+                   filter_by(switch_host=switch_host).
+                   update({'generation': model.generation + 1,
+                           'requested_at': now},
+                          synchronize_session=False))
+        if updated:
+            return
+
+    try:
+        with session.begin(subtransactions=True):
+            session.add(model(switch_host=switch_host,
+                              generation=0,
+                              requested_at=now))
+            session.flush()
+    except db_exc.DBDuplicateEntry:
+        # another worker beat us to the insert, so bump theirs instead
+        with session.begin(subtransactions=True):
+            (session.query(model).
+             filter_by(switch_host=switch_host).
+             update({'generation': model.generation + 1,
+                     'requested_at': now},
+                    synchronize_session=False))
+
+
+def get_all_pending_saves(session=None):
+    if not session:
+        session = db_api.get_session()
+
+    with session.begin(subtransactions=True):
+        return (session.query(models.SwitchPendingSave).all())
+
+
+def claim_pending_saves(worker_id, lease_seconds, switch_host=None,
+                        requested_before=None, session=None):
+    """Claim pending saves that are unclaimed or whose lease expired.
+
+    Every row is claimed with its own conditional update, so when several
+    workers race for the same switch exactly one of them wins. Returns the
+    rows claimed by worker_id.
+    """
+    if not session:
+        session = db_api.get_session()
+
+    now = timeutils.utcnow()
+    lease_expires = now + datetime.timedelta(seconds=lease_seconds)
+    model = models.SwitchPendingSave
+    claimable = sa.or_(model.claimed_by.is_(None),
+                       model.lease_expires < now)
+
+    with session.begin(subtransactions=True):
+        query = session.query(model.switch_host).filter(claimable)
+        if switch_host:
+            query = query.filter_by(switch_host=switch_host)
+        if requested_before:
+            query = query.filter(model.requested_at <= requested_before)
+        hosts = [row.switch_host for row in query]
+
+    claimed = []
+    for host in hosts:
+        with session.begin(subtransactions=True):
+            updated = (session.query(model).
+                       filter_by(switch_host=host).
+                       filter(claimable).
+                       update({'claimed_by': worker_id,
+                               'lease_expires': lease_expires},
+                              synchronize_session=False))
+        if updated:
+            claimed.append(host)
+
+    if not claimed:
+        return []
+
+    with session.begin(subtransactions=True):
+        return (session.query(model).
+                populate_existing().
+                filter(model.switch_host.in_(claimed)).
+                filter_by(claimed_by=worker_id).all())
+
+
+def release_pending_save(switch_host, worker_id, session=None):
+    """Give up a claim so the save can be picked up again."""
+    if not session:
+        session = db_api.get_session()
+
+    with session.begin(subtransactions=True):
+        return bool(session.query(models.SwitchPendingSave).
+                    filter_by(switch_host=switch_host,
+                              claimed_by=worker_id).
+                    update({'claimed_by': None,
+                            'lease_expires': None},
+                           synchronize_session=False))
+
+
+def complete_pending_save(switch_host, worker_id, generation, session=None):
+    """Remove a claimed save once it has run.
+
+    If another save was requested since the claim (the generation moved
+    on), the row is released instead so those changes get saved too.
+    Returns whether the row was removed.
+    """
+    if not session:
+        session = db_api.get_session()
+
+    with session.begin(subtransactions=True):
+        deleted = (session.query(models.SwitchPendingSave).
+                   filter_by(switch_host=switch_host,
+                             claimed_by=worker_id,
+                             generation=generation).
+                   delete(synchronize_session=False))
+
+    if not deleted:
+        release_pending_save(switch_host, worker_id, session=session)
+    return bool(deleted)
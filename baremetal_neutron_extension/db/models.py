@@ -202,3 +202,31 @@ class SwitchPortBinding(model_base.BASEV2):
             u"switch_port_id": self.switch_port_id,
             u"state": self.state
         }
+
+
+class SwitchPendingSave(model_base.BASEV2):
+    """A switch with config changes not yet saved to startup-config.
+
+    generation is bumped every time another save is requested, so the
+    worker that claimed the row can tell whether more changes arrived
+    while it was saving.
+    """
+
+    __tablename__ = "switch_pending_saves"
+
+    switch_host = sa.Column(sa.String(255), primary_key=True)
+    generation = sa.Column(sa.Integer, nullable=False, default=0)
+    requested_at = sa.Column(sa.DateTime, nullable=False)
+
+    # the worker currently saving this switch, and until when
+    claimed_by = sa.Column(sa.String(255), nullable=True)
+    lease_expires = sa.Column(sa.DateTime, nullable=True)
+
+    def as_dict(self):
+        return {
+            u"switch_host": self.switch_host,
+            u"generation": self.generation,
+            u"requested_at": self.requested_at,
+            u"claimed_by": self.claimed_by,
+            u"lease_expires": self.lease_expires
+        }
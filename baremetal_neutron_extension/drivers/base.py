@@ -68,6 +68,32 @@ class Driver(object):
         """Remove a network from a physical switchport."""
         raise NotImplementedError
 
+    def attach_vlans(self, port_infos):
+        """Attach several networks to the same physical switchport.
+
+        Drivers that can do this in one go should override it.
+        """
+        return [self.attach(port_info) for port_info in port_infos]
+
+    def detach_vlans(self, port_infos):
+        """Remove several networks from the same physical switchport."""
+        return [self.detach(port_info) for port_info in port_infos]
+
+    def attach_ports(self, port_infos):
+        """Attach networks to many switchports of the same switch.
+
+        Drivers that can do this in one go should override it.
+        """
+        return [self.attach(port_info) for port_info in port_infos]
+
+    def detach_ports(self, port_infos):
+        """Remove networks from many switchports of the same switch."""
+        return [self.detach(port_info) for port_info in port_infos]
+
+    def delete_ports(self, port_infos):
+        """Delete many switchports of the same switch."""
+        return [self.delete(port_info) for port_info in port_infos]
+
 
 class PortInfo(object):
     """Instead of leaking the database models into the drivers, we
@@ -0,0 +1,109 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Merges command lists from concurrent callers into a single RPC.
+"""
+import eventlet
+from eventlet import event
+
+from neutron.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class CommandBatcher(object):
+    """Send the command lists submitted to one switch in batches.
+
+    The first submit() opens a window of window seconds, and every list
+    submitted before it closes (or until max_size lists are waiting) is
+    sent with a single send(cmds) call. Each caller blocks until then and
+    gets the batch's result back.
+
+    A failed batch can't tell whose commands failed, so its lists are
+    sent again one at a time and every caller gets their own result or
+    error, as if they had run alone. The lists ahead of the failure were
+    applied by the batch though, so only lists that can be applied twice
+    should be submitted.
+    """
+
+    def __init__(self, host, send, window, max_size=None):
+        self.host = host
+        self.window = window
+        self.max_size = max_size
+
+        self._send = send
+        self._pending = []
+        self._timer = None
+
+        self.stats = {
+            'batches': 0,
+            'batched': 0,
+            'splits': 0,
+        }
+
+    def submit(self, cmds):
+        waiter = event.Event()
+        self._pending.append((cmds, waiter))
+
+        if self.max_size and len(self._pending) >= self.max_size:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = eventlet.spawn(self._flush)
+        elif not self._timer:
+            self._timer = eventlet.spawn_after(self.window, self._flush)
+
+        return waiter.wait()
+
+    def _flush(self):
+        self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        if len(batch) == 1:
+            self._run_alone(*batch[0])
+            return
+
+        self.stats['batches'] += 1
+        self.stats['batched'] += len(batch)
+        LOG.debug('Sending %d command lists to %s in one batch' %
+                  (len(batch), self.host))
+
+        merged = []
+        for cmds, waiter in batch:
+            merged = merged + cmds
+
+        try:
+            res = self._send(merged)
+        except Exception as e:
+            self.stats['splits'] += 1
+            LOG.debug('Batch of %d command lists failed on %s, sending them '
+                      'one at a time: %s' % (len(batch), self.host, e))
+            for cmds, waiter in batch:
+                self._run_alone(cmds, waiter)
+            return
+
+        for cmds, waiter in batch:
+            waiter.send(res)
+
+    def _run_alone(self, cmds, waiter):
+        try:
+            res = self._send(cmds)
+        except Exception as e:
+            waiter.send_exception(e)
+        else:
+            waiter.send(res)
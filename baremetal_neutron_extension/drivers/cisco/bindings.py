@@ -0,0 +1,113 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-switch index of dhcp snooping bindings, by port-channel.
+"""
+from neutron.openstack.common import log as logging
+
+from baremetal_neutron_extension.drivers.cisco import state
+
+import time
+
+LOG = logging.getLogger(__name__)
+
+DELETE_PORT_CHANNEL = 'no interface port-channel '
+
+
+class BindingIndex(object):
+    """Know each switch's 'ip source binding' lines without asking it.
+
+    A switch's index is loaded from one bulk read, then kept up to date
+    with apply() for every command list the driver sends successfully.
+    It is authoritative for ttl seconds after loading, as nothing tells
+    us about changes made to the switch by anything else.
+
+    A command list that fails may have been applied in part, so it
+    drops the switch's index until it is loaded again.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._switches = {}
+
+    def load(self, host, bindings):
+        """Replace a switch's index with {port-channel: [lines]}."""
+        self._switches[host] = {
+            'bindings': dict((po, list(lines))
+                             for po, lines in bindings.items()),
+            'loaded_at': time.time(),
+        }
+
+    def invalidate(self, host):
+        self._switches.pop(host, None)
+
+    def get_all(self, host):
+        """A switch's {port-channel: [lines]}, None if it isn't known."""
+        switch = self._switches.get(host)
+        if not switch:
+            return None
+        if time.time() - switch['loaded_at'] >= self.ttl:
+            self.invalidate(host)
+            return None
+        return dict((po, list(lines))
+                    for po, lines in switch['bindings'].items())
+
+    def get(self, host, interface):
+        """A port-channel's binding lines, None if the index can't tell."""
+        bindings = self.get_all(host)
+        if bindings is None:
+            return None
+        return bindings.get(interface, [])
+
+    def apply(self, host, cmds):
+        """Fold the binding changes in a command list into the index."""
+        switch = self._switches.get(host)
+        if not switch:
+            return
+        bindings = switch['bindings']
+
+        for cmd in cmds:
+            binding = state.parse_binding(cmd)
+            if binding:
+                lines = bindings.setdefault(binding[3], [])
+                if binding not in [state.parse_binding(l) for l in lines]:
+                    lines.append(cmd)
+                continue
+
+            if cmd.startswith(DELETE_PORT_CHANNEL):
+                # whether the switch keeps the bindings of a deleted
+                # port-channel isn't ours to guess
+                try:
+                    deleted = state._vlans(cmd[len(DELETE_PORT_CHANNEL):])
+                except ValueError:
+                    deleted = None
+                if deleted is None or [po for po in bindings
+                                       if bindings[po] and
+                                       (not po.isdigit() or
+                                        int(po) in deleted)]:
+                    LOG.debug('Dropping dhcp binding index of %s after '
+                              '%s' % (host, cmd))
+                    self.invalidate(host)
+                    return
+                continue
+
+            if cmd.startswith('no '):
+                binding = state.parse_binding(cmd[3:])
+                if binding:
+                    bindings[binding[3]] = [
+                        l for l in bindings.get(binding[3], [])
+                        if state.parse_binding(l) != binding]
@@ -0,0 +1,87 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Circuit breaker for fast-failing calls to unreachable switches.
+"""
+from neutron.openstack.common import log as logging
+
+import time
+
+LOG = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker(object):
+    """Track consecutive failures talking to a single switch.
+
+    The breaker starts CLOSED and lets every call through. After
+    failure_threshold consecutive failures it goes OPEN and rejects calls
+    until reset_timeout seconds have passed, then goes HALF_OPEN and lets
+    exactly one probe call through. The probe succeeding closes the
+    breaker again, failing re-opens it for another reset_timeout.
+    """
+
+    def __init__(self, host, failure_threshold, reset_timeout):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+
+    def allow(self):
+        """Return whether a call to the switch should be attempted."""
+        if self.state == OPEN:
+            if time.time() - self.opened_at >= self.reset_timeout:
+                LOG.info('Circuit to %s is half-open, probing' % (self.host))
+                self.state = HALF_OPEN
+                return True
+        if self.state == CLOSED:
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self):
+        if self.state != CLOSED:
+            LOG.info('Circuit to %s is closed' % (self.host))
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self):
+        self.failures += 1
+        if (self.state == HALF_OPEN or
+                self.failures >= self.failure_threshold):
+            if self.state != OPEN:
+                LOG.warning('Circuit to %s is open after %d failures, '
+                            'failing fast for %ss' %
+                            (self.host, self.failures, self.reset_timeout))
+            self.state = OPEN
+            self.opened_at = time.time()
+
+    def as_dict(self):
+        return {
+            u"state": self.state,
+            u"failures": self.failures,
+            u"opened_at": self.opened_at,
+            u"rejected": self.rejected
+        }
@@ -0,0 +1,95 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Several NETCONF sessions on their own channels of one SSH transport.
+"""
+from neutron.openstack.common import importutils
+from neutron.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+SUBSYSTEM = 'netconf'
+
+
+class SharedTransport(object):
+    """An authenticated SSH transport to a switch, shared by sessions.
+
+    The first session to a switch is connected by ncclient as usual and
+    adopted; more sessions are opened as NETCONF subsystem channels on
+    its transport, which costs a channel open rather than a TCP and SSH
+    handshake plus authentication. Closing a session only closes its
+    channel, and the transport is closed with the last one.
+
+    ncclient has no API for this, so open() sets up its SSHSession the
+    way SSHSession.connect() does after authenticating.
+    """
+
+    def __init__(self, host, transport, max_channels):
+        self.host = host
+        self.transport = transport
+        self.max_channels = max_channels
+        self.channels = 0
+
+    def available(self):
+        return (self.transport.is_active() and
+                self.channels < self.max_channels)
+
+    def adopt(self, manager):
+        """Make a session's close only close its own channel."""
+        session = manager._session
+        channel = session._channel
+        state = {'closed': False}
+
+        def close():
+            if state['closed']:
+                return
+            state['closed'] = True
+            session._connected = False
+            try:
+                channel.close()
+            finally:
+                self._release()
+
+        session.close = close
+        self.channels += 1
+        return manager
+
+    def _release(self):
+        self.channels -= 1
+        if self.channels <= 0 and self.transport.is_active():
+            LOG.debug('Closing SSH transport to %s' % (self.host))
+            self.transport.close()
+
+    def open(self, ncclient, timeout):
+        """Open a NETCONF session on a new channel of the transport."""
+        transport = importutils.import_module('ncclient.transport')
+        handler = ncclient.make_device_handler(None)
+
+        channel = self.transport.open_session()
+        try:
+            channel.invoke_subsystem(SUBSYSTEM)
+
+            session = transport.SSHSession(handler)
+            session._transport = self.transport
+            session._channel = channel
+            session._connected = True
+            session._post_connect()
+        except Exception:
+            channel.close()
+            raise
+
+        return self.adopt(ncclient.Manager(session, handler, timeout=timeout))
@@ -168,10 +168,109 @@ def _delete_ethernet_interface(interface):
     )
 
 
+def _optimize_pass(cmds):
+    out = []
+    in_config = False
+    current = None  # interface context we are in, if known
+    unknown = object()
+    seen = set()  # interfaces known to exist
+
+    for i, cmd in enumerate(cmds):
+        following = cmds[i + 1] if i + 1 < len(cmds) else None
+        leaves = (following is None or
+                  following == _configure()[0] or
+                  following.startswith('interface '))
+
+        if cmd == _configure()[0]:
+            # entering an interface works from any config mode, and so
+            # does configure terminal from global config mode.
+            if in_config and (current is None or
+                              (following or '').startswith('interface ')):
+                continue
+            in_config = True
+            current = None
+        elif cmd.startswith('interface '):
+            if in_config and current == cmd:
+                continue
+            # entering an interface creates it (port-channels), so an
+            # empty context can only go if the interface already exists.
+            if in_config and leaves and cmd in seen:
+                continue
+            current = cmd
+            seen.add(cmd)
+        elif (cmd.startswith('no interface ') or
+              cmd.startswith('default interface ')):
+            current = unknown
+            seen.discard(cmd.split(' ', 1)[1])
+
+        out.append(cmd)
+    return out
+
+
+def optimize(cmds):
+    """Drop redundant mode changes from a list of commands.
+
+    Builders are concatenated from fragments that each enter the mode
+    they need, which leaves repeated 'configure terminal' lines and
+    interface contexts we are already in. The result leaves the switch
+    with the same config, in fewer lines.
+    """
+    while True:
+        optimized = _optimize_pass(cmds)
+        if optimized == cmds:
+            return optimized
+        cmds = optimized
+
+
+def context(cmds, index):
+    """The commands that get back to the mode cmds[index] runs in."""
+    for cmd in reversed(cmds[:index]):
+        if cmd.startswith('interface '):
+            return _configure() + [cmd]
+        if (cmd == _configure()[0] or
+                cmd.startswith('no interface ') or
+                cmd.startswith('default interface ')):
+            break
+    return _configure()
+
+
+def only_modes(cmds):
+    """Whether cmds only enter config modes, see context()."""
+    for cmd in cmds:
+        if cmd != _configure()[0] and not cmd.startswith('interface '):
+            return False
+    return True
+
+
+def idempotent(cmds):
+    """Whether running cmds a second time succeeds like the first."""
+    for cmd in cmds:
+        if cmd.startswith(('vpc ', 'ip source binding ',
+                           'no ip source binding ')):
+            return False
+    return True
+
+
+def changes_config(cmds):
+    """Whether running cmds can change the running-config."""
+    for cmd in cmds:
+        if not cmd.startswith(('show ', 'copy ')):
+            return True
+    return False
+
+
 def copy_running_config():
     return ['copy running-config startup-config']
 
 
+def show_running_config():
+    return ['show running-config']
+
+
+def show_clock():
+    return ['show clock']
+
+
 def show_interface(type, interface):
     if type == 'ethernet':
         interface = _make_ethernet_interface(interface)
@@ -180,6 +279,10 @@ def show_interface(type, interface):
     return ['show interface %s %s' % (type, interface)]
 
 
+def show_all_interfaces():
+    return ['show interface']
+
+
 def show_interface_configuration(type, interface):
     if type == 'ethernet':
         interface = _make_ethernet_interface(interface)
@@ -188,6 +291,12 @@ def show_interface_configuration(type, interface):
     return ['show running interface %s %s' % (type, interface)]
 
 
+def show_all_dhcp_snooping_configuration():
+    # not 'show ip source binding': its table prints the bindings in
+    # another form than the config lines _clear negates verbatim
+    return ['show running dhcp | include "ip source binding"']
+
+
 def show_dhcp_snooping_configuration(interface):
     return ['show running dhcp | egrep port-channel%s$' % (interface)]
 
@@ -274,6 +383,178 @@ def add_vlan(interface, vlan_id, ip, mac_address, trunked):
         return []  # TODO(morgabra) throw? This is a no-op
 
 
+def _ranges(numbers):
+    """Collapse numbers into a sorted list of ranges, like ['1-3', '5']."""
+    numbers = sorted(set(int(n) for n in numbers))
+
+    ranges = []
+    for n in numbers:
+        if ranges and ranges[-1][1] == n - 1:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+
+    return [str(start) if start == end else '%s-%s' % (start, end)
+            for start, end in ranges]
+
+
+def compact_vlans(vlan_ids):
+    """Render vlan ids as a range list, like '101-110,201,301'."""
+    return ','.join(_ranges(vlan_ids))
+
+
+def _interface_range(type, interfaces):
+    """Render several interfaces as an NX-OS interface range.
+
+    Port-channels look like 'port-channel 1-10,15', ethernet interfaces
+    like 'ethernet 1/1-3, ethernet 2/5'.
+    """
+    if type == 'port-channel':
+        return 'port-channel %s' % (','.join(_ranges(interfaces)))
+
+    slots = {}
+    for interface in interfaces:
+        slot, _, port = interface.rpartition('/')
+        slots.setdefault(slot, []).append(port)
+
+    return ', '.join('%s %s' % (type, slot + '/' + r if slot else r)
+                     for slot in sorted(slots)
+                     for r in _ranges(slots[slot]))
+
+
+def _configure_interface_range(type, interfaces):
+    return (
+        _configure() +
+        ['interface %s' % (_interface_range(type, interfaces))]
+    )
+
+
+def add_vlans(interface, vlans, trunked):
+    """Add several vlans to a trunk at once.
+
+    vlans is a list of (vlan_id, ip, mac_address) tuples, one per network.
+    """
+    portchan_int = _make_portchannel_interface(interface)
+
+    if trunked and vlans:
+        cmds = _configure_interface('port-channel', portchan_int)
+        for vlan_id, ip, mac_address in vlans:
+            # add mac/ip to the dhcp snooping table
+            cmds = cmds + _bind_ip(ip, mac_address, vlan_id, portchan_int)
+        return (
+            cmds +
+            # add port-channel to vlans
+            _configure_interface('port-channel', portchan_int) +
+            ['switchport trunk allowed vlan add %s' %
+             (compact_vlans([v[0] for v in vlans]))]
+        )
+    else:
+        return []
+
+
+def remove_vlans(interface, vlans, trunked):
+    """Remove several vlans from a trunk at once, see add_vlans()."""
+    portchan_int = _make_portchannel_interface(interface)
+
+    if trunked and vlans:
+        return (
+            _configure_interface('port-channel', portchan_int) +
+            ['switchport trunk allowed vlan remove %s' %
+             (compact_vlans([v[0] for v in vlans]))]
+        )
+    else:
+        return []
+
+
+def unbind_ips(interface, vlans, trunked):
+    """Remove the dhcp snooping bindings of several vlans at once."""
+    portchan_int = _make_portchannel_interface(interface)
+
+    if trunked and vlans:
+        cmds = _configure_interface('port-channel', portchan_int)
+        for vlan_id, ip, mac_address in vlans:
+            cmds = cmds + _unbind_ip(ip, mac_address, vlan_id, portchan_int)
+        return cmds
+    else:
+        return []
+
+
+def _by_vlan(ports):
+    vlans = {}
+    for interface, vlan_id, ip, mac_address in ports:
+        vlans.setdefault(vlan_id, []).append(
+            _make_portchannel_interface(interface))
+    return sorted(vlans.items())
+
+
+def add_vlan_range(ports):
+    """Add vlans to many trunks of one switch at once.
+
+    ports is a list of (interface, vlan_id, ip, mac_address) tuples, one
+    per network. Trunks getting the same vlan share one interface range.
+    """
+    if not ports:
+        return []
+
+    portchan_ints = [_make_portchannel_interface(p[0]) for p in ports]
+    cmds = _configure_interface_range('port-channel', portchan_ints)
+    for interface, vlan_id, ip, mac_address in ports:
+        # add mac/ip to the dhcp snooping table
+        cmds = cmds + _bind_ip(ip, mac_address, vlan_id,
+                               _make_portchannel_interface(interface))
+
+    # add port-channels to vlans
+    for vlan_id, interfaces in _by_vlan(ports):
+        cmds = (cmds +
+                _configure_interface_range('port-channel', interfaces) +
+                ['switchport trunk allowed vlan add %s' % (vlan_id)])
+    return cmds
+
+
+def remove_vlan_range(ports):
+    """Remove vlans from many trunks of one switch, see add_vlan_range()."""
+    cmds = []
+    for vlan_id, interfaces in _by_vlan(ports):
+        cmds = (cmds +
+                _configure_interface_range('port-channel', interfaces) +
+                ['switchport trunk allowed vlan remove %s' % (vlan_id)])
+    return cmds
+
+
+def unbind_ip_range(ports):
+    """Remove the dhcp snooping bindings of many trunks at once."""
+    if not ports:
+        return []
+
+    portchan_ints = [_make_portchannel_interface(p[0]) for p in ports]
+    cmds = _configure_interface_range('port-channel', portchan_ints)
+    for interface, vlan_id, ip, mac_address in ports:
+        cmds = cmds + _unbind_ip(ip, mac_address, vlan_id,
+                                 _make_portchannel_interface(interface))
+    return cmds
+
+
+def delete_port_range(interfaces):
+    """Delete the port-channels of many interfaces and default them."""
+    portchan_ints = [_make_portchannel_interface(i) for i in interfaces]
+    eth_ints = [_make_ethernet_interface(i) for i in interfaces]
+    if not eth_ints:
+        return []
+
+    portchan_range = _interface_range('port-channel', portchan_ints)
+    eth_range = _interface_range('ethernet', eth_ints)
+    return (
+        # see _delete_port_channel_interface()
+        _configure_interface_range('port-channel', portchan_ints) +
+        _remove_ipsg() +
+        ['no interface %s' % (portchan_range)] +
+        _configure() +
+        ['default interface %s' % (eth_range)] +
+        _configure_interface_range('ethernet', eth_ints) +
+        ['shutdown']
+    )
+
+
 def remove_vlan(interface, vlan_id, ip, mac_address, trunked):
     portchan_int = _make_portchannel_interface(interface)
 
@@ -20,115 +20,344 @@ Implements a Nexus-OS NETCONF over SSHv2 API Client.
 This is lifted partially from the cisco ml2 mechanism.
 """
 import eventlet
+from eventlet import event
 
 from neutron.openstack.common import importutils
 from neutron.openstack.common import lockutils
 from neutron.openstack.common import log as logging
 
 from baremetal_neutron_extension import config
+from baremetal_neutron_extension.db import db
 from baremetal_neutron_extension.drivers import base as base_driver
+from baremetal_neutron_extension.drivers.cisco import batch
+from baremetal_neutron_extension.drivers.cisco import bindings
+from baremetal_neutron_extension.drivers.cisco import breaker
+from baremetal_neutron_extension.drivers.cisco import channels
 from baremetal_neutron_extension.drivers.cisco import commands
+from baremetal_neutron_extension.drivers.cisco import errors
+from baremetal_neutron_extension.drivers.cisco import nxapi
+from baremetal_neutron_extension.drivers.cisco import pool
+from baremetal_neutron_extension.drivers.cisco import retry
+from baremetal_neutron_extension.drivers.cisco import save
+from baremetal_neutron_extension.drivers.cisco import snapshot
+from baremetal_neutron_extension.drivers.cisco import state
 from baremetal_neutron_extension.drivers.cisco import utils as cisco_utils
 
 import time
 
 LOG = logging.getLogger(__name__)
 
-RETRYABLE_ERRORS = ['authorization failed',
-                    'permission denied',
-                    'not connected to netconf server']
-
 
 class CiscoException(base_driver.DriverException):
     pass
 
 
+class CiscoSwitchUnavailable(CiscoException):
+    pass
+
+
+class ReplyTimeoutError(Exception):
+    pass
+
+
+# removing an ip binding that is already gone is fine, whatever
+# fused_tolerated_errors says, see detach() and _clear()
+UNBIND_TOLERATED = [('no ip source binding', errors.DOES_NOT_EXIST)]
+
+
+def _reply(reply):
+    """A pipelined reply, raising the error it failed with instead."""
+    if isinstance(reply, Exception):
+        raise reply
+    return reply
+
+
+def _port_channel_reply(reply, parse):
+    # a port-channel might not be defined
+    if isinstance(reply, Exception) and errors.is_category(
+            reply, errors.SYNTAX, errors.DOES_NOT_EXIST):
+        return ['no port-channel']
+    return parse(_reply(reply))
+
+
 class CiscoDriver(base_driver.Driver):
 
     def __init__(self, dry_run=None,
-                 save_queue_max_age=None,
-                 save_queue_get_wait=None):
+                 save_quiet_period=None,
+                 save_max_delay=None,
+                 keepalive_interval=None,
+                 durable_save_queue=None,
+                 incremental_create=None,
+                 fused_commands=None,
+                 snapshot_ttl=None,
+                 status_ttl=None,
+                 pipelined_reads=None):
 
         self._config = config.cfg.CONF.ironic
-        self.connections = {}
+        self.pools = {}
+        self.save_pools = {}
+        self.batchers = {}
+        self.breakers = {}
+        self.transports = {}
+        self.snapshots = {}
+        self.statuses = {}
         self.ncclient = None
 
+        # per-switch count of config changes sent, and the count as of the
+        # last successful save, so saves can be skipped for clean switches.
+        self._generations = {}
+        self._saved_generations = {}
+        # changes still being sent, per switch: {generation: Event}
+        self._in_flight = {}
+
         self.dry_run = dry_run
         if dry_run is None:
             self.dry_run = self._config.dry_run
 
-        self._save_queue_max_age = save_queue_max_age
-        if self._save_queue_max_age is None:
-            self._save_queue_max_age = self._config.save_queue_max_age
-
-        self._save_queue_get_wait = save_queue_get_wait
-        if self._save_queue_get_wait is None:
-            self._save_queue_get_wait = self._config.save_queue_get_wait
-
-        self._save_queue = eventlet.queue.Queue(maxsize=50)
-
-        eventlet.spawn(self._process_save_queue)
+        self.incremental_create = incremental_create
+        if incremental_create is None:
+            self.incremental_create = self._config.incremental_create
+
+        self.fused_commands = fused_commands
+        if fused_commands is None:
+            self.fused_commands = self._config.fused_commands
+
+        self.snapshot_ttl = snapshot_ttl
+        if snapshot_ttl is None:
+            self.snapshot_ttl = self._config.running_config_cache_ttl
+
+        self.status_ttl = status_ttl
+        if status_ttl is None:
+            self.status_ttl = self._config.interface_status_cache_ttl
+
+        self.pipelined_reads = pipelined_reads
+        if pipelined_reads is None:
+            self.pipelined_reads = self._config.pipelined_reads
+
+        self.binding_index = bindings.BindingIndex(
+            ttl=self._config.dhcp_binding_index_ttl)
+
+        self.tolerated_errors = []
+        for pair in self._config.fused_tolerated_errors:
+            prefix, error = pair.split(':', 1)
+            self.tolerated_errors.append((prefix.strip(),
+                                          error.strip().lower()))
+
+        if save_quiet_period is None:
+            save_quiet_period = self._config.save_quiet_period
+
+        if save_max_delay is None:
+            save_max_delay = self._config.save_max_delay
+
+        self._keepalive_interval = keepalive_interval
+        if self._keepalive_interval is None:
+            self._keepalive_interval = self._config.session_keepalive_interval
+
+        self.retry_policy = retry.RetryPolicy(
+            max_retries=self._config.auth_failure_retries,
+            interval=self._config.auth_failure_retry_interval,
+            backoff=self._config.retry_backoff,
+            max_interval=self._config.retry_max_interval,
+            jitter=self._config.retry_jitter,
+            deadline=self._config.retry_deadline,
+            classifiers=[errors.retry_classifier])
+
+        if durable_save_queue is None:
+            durable_save_queue = self._config.durable_save_queue
+
+        save_store = None
+        if durable_save_queue:
+            save_store = save.PendingSaveStore(
+                lease_timeout=self._config.save_lease_timeout)
+
+        self._save_scheduler = save.SaveScheduler(
+            self._save,
+            quiet_period=save_quiet_period,
+            max_delay=save_max_delay,
+            store=save_store,
+            lookup=self._lookup_switch,
+            sweep_interval=self._config.save_sweep_interval,
+            max_pending=self._config.save_max_pending,
+            overflow_policy=self._config.save_overflow_policy,
+            overflow_timeout=self._config.save_overflow_timeout)
+
+        if self._keepalive_interval:
+            eventlet.spawn(self._keepalive)
         eventlet.sleep(0)
 
-    def _process_save_queue(self):
-
+    def _keepalive(self):
+        """Probe idle sessions and reopen the ones that have gone away."""
         while True:
-            start_time = time.time()
-            elapsed = lambda: time.time() - start_time
+            eventlet.sleep(self._keepalive_interval)
 
-            # poll save queue
-            save_queue = {}
-            LOG.debug('Polling save queue.')
-            while not save_queue or elapsed() < self._save_queue_max_age:
+            for p in (list(self.pools.values()) +
+                      list(self.save_pools.values())):
                 try:
-                    port = self._save_queue.get(
-                        timeout=self._save_queue_get_wait)
-                    save_queue[port[0].switch_host] = port
-                    LOG.debug(('Queued config save on %s.' %
-                              (port[0].switch_host)))
-                except eventlet.queue.Empty:
-                    if not save_queue:
-                        start_time = time.time()
-
-            # process save queue
-            LOG.info('Running config save on %s queued items.'
-                     % len(save_queue))
-            for port, attempt in save_queue.values():
-                attempt = attempt + 1
-                LOG.debug(('Starting config save on %s (attempt %d/3)' %
-                           (port.switch_host, attempt)))
-                try:
-                    self._save(port)
-                    LOG.info(('Finished config save on %s (attempt %d/3)' %
-                              (port.switch_host, attempt)))
+                    p.evict()
+                    p.probe(self._probe, min_idle=self._keepalive_interval)
+                    p.fill()
                 except Exception as e:
-                    if attempt >= 3:
-                        LOG.error(('Failed config save on %s (attempt: %d/3) '
-                                   'Aborting, %s') % (port.switch_host,
-                                                      attempt, e))
-                    else:
-                        LOG.debug(('Failed config save on %s (attempt: %d/3) '
-                                   'Retrying, %s') % (port.switch_host,
-                                                      attempt, e))
-                        self._save_queue.put((port, attempt))
-
-                eventlet.sleep(0)  # yield after each save
+                    LOG.error('Failed probing sessions on %s: %s' %
+                              (p.host, e))
+
+                LOG.debug('Session stats for %s: %s' % (p.host, p.stats))
+                eventlet.sleep(0)  # yield after each switch
+
+            tripped = dict((host, b['state'])
+                           for host, b in self.circuit_status().items()
+                           if b['state'] != breaker.CLOSED)
+            if tripped:
+                LOG.warning('Switch circuits not closed: %s' % (tripped))
+
+    def _probe(self, session):
+        session.command(commands.show_clock())
+
+    def circuit_status(self):
+        """Return circuit breaker state, keyed by switch host."""
+        return dict((host, b.as_dict()) for host, b in self.breakers.items())
+
+    def session_stats(self):
+        """Return keepalive probe counters, keyed by switch host."""
+        return dict((host, dict(p.stats, size=p.size, idle=p.idle))
+                    for host, p in self.pools.items())
+
+    def save_stats(self):
+        """Return save queue counters."""
+        return dict(self._save_scheduler.stats,
+                    pending=len(self._save_scheduler.pending()))
+
+    def _lookup_switch(self, host):
+        """Build a PortInfo for switch-wide operations on a host."""
+        switch = db.filter_switches(host=host).first()
+        if not switch:
+            return None
+        return base_driver.PortInfo(
+            switch_host=switch.host,
+            switch_username=switch.username,
+            switch_password=switch.password,
+            interface=None)
+
+    def _mark_dirty(self, port):
+        host = port.switch_host
+        self._generations[host] = self._generations.get(host, 0) + 1
+        return self._generations[host]
+
+    def _begin_change(self, port):
+        generation = self._mark_dirty(port)
+        self.snapshots.pop(port.switch_host, None)
+        self.statuses.pop(port.switch_host, None)
+        self._in_flight.setdefault(port.switch_host, {})[generation] = (
+            event.Event())
+        return generation
+
+    def _end_change(self, port, generation):
+        self._in_flight[port.switch_host].pop(generation).send()
+
+    def _wait_for_changes(self, port, generation):
+        """Wait for changes up to generation to finish being sent."""
+        in_flight = self._in_flight.get(port.switch_host, {})
+        for g, done in list(in_flight.items()):
+            if g <= generation:
+                done.wait()
+
+    def is_dirty(self, port):
+        """Whether a switch changed since it was last saved."""
+        host = port.switch_host
+        return (self._generations.get(host, 0) !=
+                self._saved_generations.get(host, 0))
 
     def _save(self, port):
+        host = port.switch_host
+        generation = self._generations.get(host, 0)
+
+        # the save has to see every change made before it was asked for
+        self._wait_for_changes(port, generation)
+
+        # saves take seconds, so they run on their own session and without
+        # the interface lock to stay out of the way of other commands.
         cmds = commands.copy_running_config()
-        self._run_commands(port, cmds)
+        self.retry_policy.call(self._run_commands_inner, port, cmds,
+                               save=True)
+
+        # changes sent while we were saving are still dirty
+        self._saved_generations[host] = max(
+            generation, self._saved_generations.get(host, 0))
 
     def save(self, port, async=True):
+        if not self.is_dirty(port):
+            LOG.debug('Skipping config save on %s, nothing changed' %
+                      (port.switch_host))
+            return
+
         if async:
-            try:
-                LOG.info('Queuing config save on %s' % (port.switch_host))
-                self._save_queue.put((port, 0), block=False)
-            except eventlet.queue.Full:
-                LOG.error('Failed config save on %s, queue is full.' %
-                          (port.switch_host))
+            LOG.info('Queuing config save on %s' % (port.switch_host))
+            self._save_scheduler.schedule(port)
         else:
             self._save(port)
 
+    def _fresh_snapshot(self, port):
+        """The switch's running-config snapshot, if it is still current."""
+        snap = self.snapshots.get(port.switch_host)
+        if (snap and snap.age() < self.snapshot_ttl and
+                snap.generation == self._generations.get(port.switch_host,
+                                                         0)):
+            return snap
+        return None
+
+    def running_config_snapshot(self, port):
+        """Return the switch's running-config, fetching it if stale."""
+        snap = self._fresh_snapshot(port)
+        if snap:
+            return snap
+
+        host = port.switch_host
+        generation = self._generations.get(host, 0)
+
+        # a change being sent now could land either side of the show
+        self._wait_for_changes(port, generation)
+
+        LOG.debug("Fetching running-config snapshot of %s" % (host))
+        result = self._run_commands(port, commands.show_running_config())
+        snap = snapshot.parse_running_config(
+            cisco_utils.command_result_text(result), generation=generation)
+
+        # changes sent during the show leave the snapshot stale already
+        if generation == self._generations.get(host, 0):
+            self.snapshots[host] = snap
+            if self.binding_index.ttl:
+                self.binding_index.load(host, snap.bindings)
+        return snap
+
+    def _switch_bindings(self, port):
+        """All dhcp snooping bindings on a switch, by port-channel."""
+        snap = self._fresh_snapshot(port)
+        if snap:
+            return snap.bindings
+
+        host = port.switch_host
+        if self.binding_index.ttl:
+            indexed = self.binding_index.get_all(host)
+            if indexed is not None:
+                return indexed
+
+        generation = self._generations.get(host, 0)
+        self._wait_for_changes(port, generation)
+
+        LOG.debug("Fetching dhcp snooping entries of %s" % (host))
+        cmds = commands.show_all_dhcp_snooping_configuration()
+        result = self._run_commands(port, cmds)
+
+        switch_bindings = {}
+        for line in cisco_utils.parse_command_result(result):
+            binding = state.parse_binding(line)
+            if binding:
+                switch_bindings.setdefault(binding[3], []).append(line)
+
+        if (self.binding_index.ttl and
+                generation == self._generations.get(host, 0)):
+            self.binding_index.load(host, switch_bindings)
+        return switch_bindings
+
     def show_interface(self, port, type="ethernet"):
         LOG.debug("Fetching interface %s %s" % (type, port.interface))
 
@@ -137,6 +366,35 @@ class CiscoDriver(base_driver.Driver):
         result = self._run_commands(port, cmds)
         return cisco_utils.parse_interface_status(result)
 
+    def switch_interface_status(self, port):
+        """Status of every interface on a switch, keyed by name.
+
+        One 'show interface' answers for the whole switch for status_ttl
+        seconds, or until a change is made through the driver.
+        """
+        host = port.switch_host
+        generation = self._generations.get(host, 0)
+
+        cached = self.statuses.get(host)
+        if (cached and time.time() - cached['fetched_at'] < self.status_ttl
+                and cached['generation'] == generation):
+            return cached['interfaces']
+
+        # a change being sent now could land either side of the show
+        self._wait_for_changes(port, generation)
+
+        LOG.debug("Fetching interface status of %s" % (host))
+        result = self._run_commands(port, commands.show_all_interfaces())
+        interfaces = cisco_utils.parse_interface_statuses(result)
+
+        if generation == self._generations.get(host, 0):
+            self.statuses[host] = {
+                'interfaces': interfaces,
+                'generation': generation,
+                'fetched_at': time.time(),
+            }
+        return interfaces
+
     def show_interface_configuration(self, port, type="ethernet"):
         LOG.debug("Fetching interface %s %s" % (type, port.interface))
 
@@ -146,18 +404,25 @@ class CiscoDriver(base_driver.Driver):
         return cisco_utils.parse_command_result(result)
 
     def show_dhcp_snooping_configuration(self, port):
+        po_int = commands._make_portchannel_interface(port.interface)
+
+        if self.binding_index.ttl or self._fresh_snapshot(port):
+            return self._switch_bindings(port).get(po_int, [])
+
         LOG.debug("Fetching dhcp snooping entries for int %s" % port.interface)
 
-        po_int = commands._make_portchannel_interface(port.interface)
         cmds = commands.show_dhcp_snooping_configuration(po_int)
 
         result = self._run_commands(port, cmds)
         return cisco_utils.parse_command_result(result)
 
-    def _clear(self, port):
+    def _clear(self, port, fused=False):
         """Remove all configuration for a given interface, which includes
         the ethernet interface, related port-channel, and any dhcp snooping
         bindings or other port security features.
+
+        With fused, the commands are returned rather than run after the
+        dhcp snooping bindings have been read.
         """
         LOG.debug("clearing interface %s" % (port.interface))
 
@@ -177,20 +442,179 @@ class CiscoDriver(base_driver.Driver):
             cmds = cmds + commands._configure_interface('port-channel', po_int)
             cmds = cmds + dhcp_conf
 
+        # delete the portchannel and default the eth interface
+        delete_cmds = (commands._delete_port_channel_interface(po_int) +
+                       commands._delete_ethernet_interface(eth_int))
+
+        if fused:
+            return cmds + delete_cmds
+
         # for some reason authentication errors happen apparently randomly when
         # running commands. All other port creation commands are safe to run
         # twice during retry except for removing the dhcp binding, which fails
         # with 'ERROR: Entry does not exist'
         if cmds:
-            self._run_commands(port, cmds)
+            try:
+                self._run_commands(port, cmds)
+            except CiscoException as e:
+                if not errors.is_category(e, errors.DOES_NOT_EXIST):
+                    raise
+                LOG.info("dhcp snooping binding already removed: %s" % e)
 
-        # delete the portchannel and default the eth interface
-        cmds = commands._delete_port_channel_interface(po_int)
-        cmds = cmds + commands._delete_ethernet_interface(eth_int)
+        return self._run_commands(port, delete_cmds)
+
+    def _tolerates(self, cmd, err, tolerate=()):
+        """Whether err is a harmless failure of cmd, see _run_fused()."""
+        category = errors.categorize(err)
+        message = str(err).lower()
+        for prefix, error in self.tolerated_errors + list(tolerate):
+            if (cmd.startswith(prefix) and
+                    (error == category or error in message)):
+                return True
+        return False
+
+    def _failed_line(self, cmds, start, err):
+        """Index of the line in cmds[start:] err names, if it names one."""
+        failed = errors.failed_command(err)
+        for i in range(start, len(cmds)):
+            if cmds[i] == failed or cmds[i].lower() in str(err).lower():
+                return i
+        return None
+
+    def _run_fused(self, port, cmds, ports=None, tolerate=()):
+        """Run cmds as one RPC, skipping lines that fail harmlessly.
+
+        Lines fail harmlessly as configured in fused_tolerated_errors, or
+        as the caller says in tolerate, a list of (prefix, error) pairs
+        like theirs. A line is only skipped when the error names it, and
+        the rest of cmds is then sent again, starting in the mode the
+        failed line ran in. An error that could be harmless for some line
+        but doesn't say which one failed splits cmds up instead, see
+        _run_split().
+        """
+        start = 0
+        context = []
+        while True:
+            try:
+                return self._run_commands(port, context + cmds[start:],
+                                          ports=ports)
+            except CiscoException as e:
+                if not any(self._tolerates(cmd, e, tolerate)
+                           for cmd in cmds[start:]):
+                    raise
 
-        return self._run_commands(port, cmds)
+                i = self._failed_line(cmds, start, e)
+                if i is None:
+                    LOG.info("Can't tell which line failed on %s %s, "
+                             "splitting the commands up: %s" %
+                             (port.switch_host, port.interface, e))
+                    return self._run_split(port, context + cmds[start:],
+                                           ports=ports, tolerate=tolerate)
+                if not self._tolerates(cmds[i], e, tolerate):
+                    raise
+
+                LOG.info("Ignoring failed '%s' on %s %s: %s" %
+                         (cmds[i], port.switch_host, port.interface, e))
+                start = i + 1
+                if start >= len(cmds):
+                    return None
+                context = commands.context(cmds, start)
+
+    def _run_split(self, port, cmds, ports=None, tolerate=()):
+        """Run cmds with every line that may fail harmlessly on its own.
+
+        The lines between them still go out together, and any error
+        they get is raised. Each RPC starts in the mode its first line
+        runs in, so lines that only enter a mode aren't sent on their own.
+        """
+        res = None
+        start = 0
+        for i, cmd in enumerate(cmds):
+            if not any(cmd.startswith(prefix) for prefix, error in
+                       self.tolerated_errors + list(tolerate)):
+                continue
+
+            # the next RPC enters its own mode
+            end = i
+            while end > start and commands.only_modes(cmds[end - 1:end]):
+                end -= 1
+            if start < end:
+                res = self._run_commands(
+                    port, commands.context(cmds, start) + cmds[start:end],
+                    ports=ports)
+            try:
+                res = self._run_commands(
+                    port, commands.context(cmds, i) + [cmd], ports=ports)
+            except CiscoException as e:
+                if not self._tolerates(cmd, e, tolerate):
+                    raise
+                LOG.info("Ignoring failed '%s' on %s %s: %s" %
+                         (cmd, port.switch_host, port.interface, e))
+            start = i + 1
+
+        if not commands.only_modes(cmds[start:]):
+            res = self._run_commands(
+                port, commands.context(cmds, start) + cmds[start:],
+                ports=ports)
+        return res
+
+    def _diff_port(self, port):
+        """Commands taking a port from its running to its desired config.
+
+        Returns a list of command lists, or None if it can't be diffed.
+        """
+        desired = state.compile_port(
+            hardware_id=port.hardware_id,
+            interface=port.interface,
+            vlan_id=port.vlan_id,
+            ip=port.ip,
+            mac_address=port.mac_address,
+            trunked=port.trunked)
+
+        dhcp = self.show_dhcp_snooping_configuration(port)
+        ethernet = self.show_interface_configuration(port, type="ethernet")
+        try:
+            port_channel = self.show_interface_configuration(
+                port, type="port-channel")
+        except CiscoException as e:
+            if errors.is_category(e, errors.SYNTAX, errors.DOES_NOT_EXIST):
+                port_channel = None
+            else:
+                raise e
+
+        return state.diff_port(desired, ethernet, port_channel, dhcp)
+
+    def _create_incremental(self, port):
+        try:
+            batches = self._diff_port(port)
+        except CiscoException as e:
+            LOG.warning("Failed diffing port %s, recreating it: %s" %
+                        (port.interface, e))
+            return False, None
+
+        if batches is None:
+            LOG.info("Port %s has config we can't diff, recreating it" %
+                     (port.interface))
+            return False, None
+
+        LOG.debug("Updating port %s for hardware_id %s in %d steps"
+                  % (port.interface, port.hardware_id, len(batches)))
+
+        res = None
+        for cmds in batches:
+            res = self._run_commands(port, cmds)
+        return True, res
 
     def create(self, port):
+        if self.incremental_create:
+            done, res = self._create_incremental(port)
+            if done:
+                self.save(port)
+                return res
+
+        if self.fused_commands:
+            return self._create_fused(port)
+
         self._clear(port)
 
         LOG.debug("Creating port %s for hardware_id %s"
@@ -217,15 +641,49 @@ class CiscoDriver(base_driver.Driver):
             po_int = commands._make_portchannel_interface(interface)
             cmds = commands._configure_interface('port-channel', po_int)
             cmds = cmds + commands._add_vpc(po_int)
-            res = self._run_commands(port, cmds)
+            try:
+                res = self._run_commands(port, cmds)
+            except CiscoException as e:
+                if not errors.is_category(e, errors.ALREADY_EXISTS):
+                    raise
+                LOG.info("vpc %s already exists" % (po_int))
 
         self.save(port)
 
         return res
 
+    def _create_fused(self, port):
+        cmds = self._clear(port, fused=True)
+
+        LOG.debug("Creating port %s for hardware_id %s"
+                  % (port.interface, port.hardware_id))
+
+        cmds = cmds + commands.create_port(
+            hardware_id=port.hardware_id,
+            interface=port.interface,
+            vlan_id=port.vlan_id,
+            ip=port.ip,
+            mac_address=port.mac_address,
+            trunked=port.trunked)
+
+        if port.trunked:
+            po_int = commands._make_portchannel_interface(port.interface)
+            cmds = cmds + commands._configure_interface('port-channel', po_int)
+            cmds = cmds + commands._add_vpc(po_int)
+
+        res = self._run_fused(port, cmds, tolerate=UNBIND_TOLERATED)
+        self.save(port)
+        return res
+
     def delete(self, port):
         LOG.debug("Deleting port %s for hardware_id %s"
                   % (port.interface, port.hardware_id))
+        if self.fused_commands:
+            res = self._run_fused(port, self._clear(port, fused=True),
+                                  tolerate=UNBIND_TOLERATED)
+            self.save(port)
+            return res
+
         res = self._clear(port)
         self.save(port)
         return res
@@ -256,14 +714,21 @@ class CiscoDriver(base_driver.Driver):
             mac_address=port.mac_address,
             trunked=port.trunked)
 
+        if self.fused_commands:
+            cmds = cmds + commands.unbind_ip(
+                interface=port.interface,
+                vlan_id=port.vlan_id,
+                ip=port.ip,
+                mac_address=port.mac_address,
+                trunked=port.trunked)
+            res = self._run_fused(port, cmds, tolerate=UNBIND_TOLERATED)
+            self.save(port)
+            return res
+
         self._run_commands(port, cmds)
 
-        # TODO(morgbara) this is not ideal, but we don't want
-        # to fail an vlan removal if the ip binding doesn't exist,
-        # and there really isn't a way to do this safely without
-        # checking for it (which takes time). This will be a little
-        # better when we differenciate between types of failures when
-        # talking to a switch better.
+        # we don't want to fail a vlan removal if the ip binding is
+        # already gone, but we do want to hear about anything else.
         cmds = commands.unbind_ip(
             interface=port.interface,
             vlan_id=port.vlan_id,
@@ -275,12 +740,145 @@ class CiscoDriver(base_driver.Driver):
         try:
             res = self._run_commands(port, cmds)
         except CiscoException as e:
-            LOG.info("Failed to remove ip binding: %s" % str(e))
+            if not errors.is_category(e, errors.DOES_NOT_EXIST):
+                raise
+            LOG.info("ip binding already removed: %s" % str(e))
             res = None
 
         self.save(port)
         return res
 
+    def _vlans(self, ports):
+        """Check ports share a switchport, return their vlans."""
+        for p in ports[1:]:
+            if ((p.switch_host, p.interface, p.trunked) !=
+                    (ports[0].switch_host, ports[0].interface,
+                     ports[0].trunked)):
+                raise CiscoException(
+                    'Bulk vlan changes must be for a single switchport, '
+                    'got %s %s and %s %s' %
+                    (ports[0].switch_host, ports[0].interface,
+                     p.switch_host, p.interface))
+        return [(p.vlan_id, p.ip, p.mac_address) for p in ports]
+
+    def attach_vlans(self, ports):
+        if not ports:
+            return None
+        port = ports[0]
+        vlans = self._vlans(ports)
+
+        LOG.debug("Attaching vlans %s to interface %s"
+                  % (commands.compact_vlans([v[0] for v in vlans]),
+                     port.interface))
+
+        cmds = commands.add_vlans(
+            interface=port.interface,
+            vlans=vlans,
+            trunked=port.trunked)
+
+        res = self._run_commands(port, cmds)
+        self.save(port)
+        return res
+
+    def detach_vlans(self, ports):
+        if not ports:
+            return None
+        port = ports[0]
+        vlans = self._vlans(ports)
+
+        LOG.debug("Detaching vlans %s from interface %s"
+                  % (commands.compact_vlans([v[0] for v in vlans]),
+                     port.interface))
+
+        cmds = commands.remove_vlans(
+            interface=port.interface,
+            vlans=vlans,
+            trunked=port.trunked)
+        self._run_commands(port, cmds)
+
+        # skips over bindings that are already gone
+        cmds = commands.unbind_ips(
+            interface=port.interface,
+            vlans=vlans,
+            trunked=port.trunked)
+        res = self._run_fused(port, cmds, tolerate=UNBIND_TOLERATED)
+
+        self.save(port)
+        return res
+
+    def _ports(self, ports):
+        """Check ports share a switch, return their trunks' networks."""
+        for p in ports[1:]:
+            if p.switch_host != ports[0].switch_host:
+                raise CiscoException(
+                    'Bulk port changes must be for a single switch, '
+                    'got %s and %s' % (ports[0].switch_host, p.switch_host))
+        return [(p.interface, p.vlan_id, p.ip, p.mac_address)
+                for p in ports if p.trunked]
+
+    def attach_ports(self, ports):
+        if not ports:
+            return None
+        port = ports[0]
+        trunks = self._ports(ports)
+
+        LOG.debug("Attaching vlans to %d interfaces on %s"
+                  % (len(trunks), port.switch_host))
+
+        cmds = commands.add_vlan_range(trunks)
+        res = self._run_commands(port, cmds, ports=ports)
+        self.save(port)
+        return res
+
+    def detach_ports(self, ports):
+        if not ports:
+            return None
+        port = ports[0]
+        trunks = self._ports(ports)
+
+        LOG.debug("Detaching vlans from %d interfaces on %s"
+                  % (len(trunks), port.switch_host))
+
+        # skips over bindings that are already gone
+        cmds = (commands.remove_vlan_range(trunks) +
+                commands.unbind_ip_range(trunks))
+        res = self._run_fused(port, cmds, ports=ports,
+                              tolerate=UNBIND_TOLERATED)
+
+        self.save(port)
+        return res
+
+    def delete_ports(self, ports):
+        if not ports:
+            return None
+        port = ports[0]
+        self._ports(ports)
+
+        LOG.debug("Deleting %d interfaces on %s"
+                  % (len(ports), port.switch_host))
+
+        interfaces = [p.interface for p in ports]
+        po_ints = set(commands._make_portchannel_interface(i)
+                      for i in interfaces)
+
+        # one read for the bindings of every port-channel, see _clear()
+        switch_bindings = self._switch_bindings(port)
+        dhcp_conf = [(po, cisco_utils.negate_conf(l))
+                     for po in sorted(po_ints)
+                     for l in switch_bindings.get(po, [])]
+
+        cmds = []
+        if dhcp_conf:
+            cmds = (commands._configure_interface_range(
+                'port-channel', [c[0] for c in dhcp_conf]) +
+                [c[1] for c in dhcp_conf])
+        cmds = cmds + commands.delete_port_range(interfaces)
+
+        res = self._run_fused(port, cmds, ports=ports,
+                              tolerate=UNBIND_TOLERATED)
+        self.save(port)
+        return res
+
     def running_config(self, port):
         LOG.debug("Fetching running-config %s" % (port.interface))
 
@@ -291,6 +889,33 @@ class CiscoDriver(base_driver.Driver):
 
         running_config = {}
 
+        if self.snapshot_ttl:
+            snap = self.running_config_snapshot(port)
+            eth_int = commands._make_ethernet_interface(port.interface)
+            po_int = commands._make_portchannel_interface(port.interface)
+
+            # an interface the switch doesn't know is left for it to
+            # complain about below
+            if snap.interface('ethernet', eth_int) is not None:
+                running_config['dhcp'] = snap.dhcp(po_int)
+                running_config['ethernet'] = snap.interface('ethernet',
+                                                            eth_int)
+                running_config['port-channel'] = snap.interface(
+                    'port-channel', po_int)
+                if running_config['port-channel'] is None:
+                    running_config['port-channel'] = ['no port-channel']
+                return {
+                    "switch": switch,
+                    "running-config": running_config
+                }
+
+        if self.pipelined_reads:
+            running_config = self._running_config_pipelined(port)
+            return {
+                "switch": switch,
+                "running-config": running_config
+            }
+
         running_config['dhcp'] = self.show_dhcp_snooping_configuration(port)
 
         running_config['ethernet'] = self.show_interface_configuration(
@@ -301,7 +926,7 @@ class CiscoDriver(base_driver.Driver):
             running_config['port-channel'] = self.show_interface_configuration(
                 port, type="port-channel")
         except CiscoException as e:
-            if ('syntax error' in str(e).lower()):
+            if errors.is_category(e, errors.SYNTAX, errors.DOES_NOT_EXIST):
                 running_config['port-channel'] = ['no port-channel']
             else:
                 raise e
@@ -311,6 +936,49 @@ class CiscoDriver(base_driver.Driver):
             "running-config": running_config
         }
 
+    def _running_config_pipelined(self, port):
+        cmd_lists = [
+            commands.show_interface_configuration('ethernet', port.interface),
+            commands.show_interface_configuration('port-channel',
+                                                  port.interface),
+        ]
+
+        # bindings we already know don't need asking for
+        known = self.binding_index.ttl or self._fresh_snapshot(port)
+        if not known:
+            po_int = commands._make_portchannel_interface(port.interface)
+            cmd_lists.append(
+                commands.show_dhcp_snooping_configuration(po_int))
+
+        replies = self.retry_policy.call(self._run_pipelined, port,
+                                         cmd_lists)
+
+        running_config = {}
+        running_config['ethernet'] = cisco_utils.parse_command_result(
+            _reply(replies[0]))
+        running_config['port-channel'] = _port_channel_reply(
+            replies[1], cisco_utils.parse_command_result)
+        if known:
+            running_config['dhcp'] = self.show_dhcp_snooping_configuration(
+                port)
+        else:
+            running_config['dhcp'] = cisco_utils.parse_command_result(
+                _reply(replies[2]))
+        return running_config
+
+    def _interface_status_pipelined(self, port):
+        replies = self.retry_policy.call(self._run_pipelined, port, [
+            commands.show_interface('ethernet', port.interface),
+            commands.show_interface('port-channel', port.interface),
+        ])
+
+        return {
+            'ethernet': cisco_utils.parse_interface_status(
+                _reply(replies[0])),
+            'port-channel': _port_channel_reply(
+                replies[1], cisco_utils.parse_interface_status),
+        }
+
     def interface_status(self, port):
         LOG.debug("Fetching interface status %s" % (port.interface))
 
@@ -320,6 +988,31 @@ class CiscoDriver(base_driver.Driver):
         }
 
         status = {}
+
+        if self.status_ttl:
+            interfaces = self.switch_interface_status(port)
+            eth_int = 'ethernet%s' % (
+                commands._make_ethernet_interface(port.interface))
+            po_int = 'port-channel%s' % (
+                commands._make_portchannel_interface(port.interface))
+
+            # an interface the switch doesn't know is left for it to
+            # complain about below
+            if eth_int in interfaces:
+                status['ethernet'] = interfaces[eth_int]
+                status['port-channel'] = interfaces.get(
+                    po_int, ['no port-channel'])
+                return {
+                    "switch": switch,
+                    "interface-status": status
+                }
+
+        if self.pipelined_reads:
+            return {
+                "switch": switch,
+                "interface-status": self._interface_status_pipelined(port)
+            }
+
         status['ethernet'] = self.show_interface(
             port, type="ethernet")
 
@@ -328,7 +1021,7 @@ class CiscoDriver(base_driver.Driver):
             status['port-channel'] = self.show_interface(
                 port, type="port-channel")
         except CiscoException as e:
-            if ('syntax error' in str(e).lower()):
+            if errors.is_category(e, errors.SYNTAX, errors.DOES_NOT_EXIST):
                 status['port-channel'] = ['no port-channel']
             else:
                 raise e
@@ -349,86 +1042,316 @@ class CiscoDriver(base_driver.Driver):
         return importutils.import_module('ncclient.manager')
 
     def _connect(self, port):
-        c = self.connections.get(port.switch_host)
-
-        # TODO(morgabra) connected is updated from a thread, so obviously
-        # there are some issues with checking this here.
-        if not c or not c.connected:
-            LOG.debug("starting session: %s@%s" % (port.switch_username,
-                                                   port.switch_host))
-            connect_args = {
-                "host": port.switch_host,
-                "port": 22,  # TODO(morgabra) configurable
-                "username": port.switch_username,
-                "password": port.switch_password,
-                "timeout": 10  # TOOD(morgabra) configurable
-            }
-            c = self.ncclient.connect(**connect_args)
-            self.connections[port.switch_host] = c
+        LOG.debug("starting session: %s@%s" % (port.switch_username,
+                                               port.switch_host))
+
+        if port.switch_host in self._config.nxapi_switches:
+            return nxapi.NxapiSession(
+                port.switch_host,
+                port.switch_username,
+                port.switch_password,
+                port=self._config.nxapi_port or None,
+                scheme=self._config.nxapi_scheme,
+                verify=self._config.nxapi_verify_ssl,
+                timeout=10)
+
+        if not self.ncclient:
+            self.ncclient = self._import_ncclient()
+
+        max_channels = self._config.netconf_channels_per_transport
+        shared = self.transports.get(port.switch_host)
+        if max_channels > 1 and shared and shared.available():
+            try:
+                c = shared.open(self.ncclient, timeout=10)
+                LOG.debug("got session on a new channel: %s@%s id:%s" %
+                          (port.switch_username, port.switch_host,
+                           c.session_id))
+                return c
+            except Exception as e:
+                LOG.warning("Failed opening a NETCONF channel to %s, "
+                            "connecting instead: %s" % (port.switch_host, e))
+
+        connect_args = {
+            "host": port.switch_host,
+            "port": 22,  # TODO(morgabra) configurable
+            "username": port.switch_username,
+            "password": port.switch_password,
+            "timeout": 10  # TOOD(morgabra) configurable
+        }
+        c = self.ncclient.connect(**connect_args)
 
         LOG.debug("got session: %s@%s id:%s" % (port.switch_username,
                                                 port.switch_host,
                                                 c.session_id))
 
+        if max_channels > 1:
+            try:
+                shared = channels.SharedTransport(
+                    port.switch_host, c._session._transport, max_channels)
+                shared.adopt(c)
+                self.transports[port.switch_host] = shared
+            except AttributeError as e:
+                LOG.warning("Can't share the SSH transport of this ncclient "
+                            "session to %s: %s" % (port.switch_host, e))
         return c
 
-    def _retryable_error(self, err, retryable=RETRYABLE_ERRORS):
-        err = str(err).lower()
-        for retry_err in retryable:
-            if retry_err in err:
-                return True
-        return False
-
-    def _run_commands_inner(self, port, commands):
+    def _get_pool(self, port):
+        """Get the session pool for a switch, creating it if needed."""
+        p = self.pools.get(port.switch_host)
+        if not p:
+            p = pool.SessionPool(
+                port.switch_host,
+                create=lambda: self._connect(port),
+                max_size=self._config.session_pool_max_size,
+                min_size=self._config.session_pool_min_size,
+                idle_timeout=self._config.session_pool_idle_timeout)
+            self.pools[port.switch_host] = p
+            p.fill()
+        return p
+
+    def _get_save_pool(self, port):
+        """Get the single-session pool a switch's saves run on."""
+        p = self.save_pools.get(port.switch_host)
+        if not p:
+            p = pool.SessionPool(
+                port.switch_host,
+                create=lambda: self._connect(port),
+                max_size=1,
+                idle_timeout=self._config.session_pool_idle_timeout)
+            self.save_pools[port.switch_host] = p
+        return p
+
+    def _get_batcher(self, port):
+        b = self.batchers.get(port.switch_host)
+        if not b:
+            p = self._get_pool(port)
+            b = batch.CommandBatcher(
+                port.switch_host,
+                send=lambda cmds: self._send_batch(port, p,
+                                                   commands.optimize(cmds)),
+                window=self._config.command_batch_window,
+                max_size=self._config.command_batch_max_size)
+            self.batchers[port.switch_host] = b
+        return b
+
+    def _send_batch(self, port, p, cmds):
+        # the callers sharing a batch share its RPC, so the breaker
+        # counts the RPC rather than each of them
+        b = None
+        if self._config.circuit_breaker_threshold:
+            b = self._get_breaker(port)
+        try:
+            res = self._send(port, p, cmds)
+        except Exception as e:
+            self._record(b, e)
+            raise
+        self._record(b)
+        return res
 
-        if not commands:
-            LOG.debug("No commands to run - %(switch)s %(interface)s" %
+    def _get_breaker(self, port):
+        b = self.breakers.get(port.switch_host)
+        if not b:
+            b = breaker.CircuitBreaker(
+                port.switch_host,
+                failure_threshold=self._config.circuit_breaker_threshold,
+                reset_timeout=self._config.circuit_breaker_reset_timeout)
+            self.breakers[port.switch_host] = b
+        return b
+
+    def _run_commands_inner(self, port, cmds, save=False):
+
+        cmds = commands.optimize(cmds)
+        if not cmds:
+            LOG.debug("No commands to run - %s %s" %
                       (port.switch_host, port.interface))
             return
 
         LOG.debug("executing commands - %s %s: %s" %
-                  (port.switch_host, port.interface, commands))
+                  (port.switch_host, port.interface, cmds))
 
         if self.dry_run:
             LOG.debug("Dry run is enabled - skipping")
             return None
 
-        if not self.ncclient:
-            self.ncclient = self._import_ncclient()
+        b = self._allow(port)
+
+        if save:
+            p = self._get_save_pool(port)
+        else:
+            p = self._get_pool(port)
 
-        c = None
+        # a failed batch is sent again a list at a time, so only lists
+        # that can be applied twice are batched
+        batched = (self._config.command_batch_window and not save and
+                   commands.changes_config(cmds) and
+                   commands.idempotent(cmds))
         try:
-            c = self._connect(port)
-            return c.command(commands)
+            if batched:
+                res = self._get_batcher(port).submit(cmds)
+            else:
+                res = self._send(port, p, cmds)
         except Exception as e:
             LOG.debug("Failed running commands - %s %s: %s" %
                       (port.switch_host, port.interface, e))
+            if not batched:
+                self._record(b, e)
+            raise CiscoException(e)
 
-            if c:
-                self.connections[port.switch_host] = None
-                try:
-                    c.close_session()
-                except Exception as err:
-                    LOG.debug("Failed closing session %(sess)s: %(e)s",
-                              {'sess': c.session_id, 'e': err})
+        if not batched:
+            self._record(b)
+        return res
+
+    def _allow(self, port):
+        """Get the switch's circuit breaker, raising if it is open."""
+        if not self._config.circuit_breaker_threshold:
+            return None
+
+        b = self._get_breaker(port)
+        if not b.allow():
+            raise CiscoSwitchUnavailable(
+                'Circuit to %s is %s, not running commands' %
+                (port.switch_host, b.state))
+        return b
+
+    def _record(self, b, e=None):
+        if not b:
+            return
+        if e is None or errors.switch_answered(e):
+            b.success()
+        else:
+            b.failure()
+
+    def _run_pipelined(self, port, cmd_lists):
+        """Run independent, read-only command lists at once.
+
+        The lists go out on one session back to back, without waiting
+        for replies in between (ncclient matches the replies to their
+        RPCs by message-id), so they take about one round trip between
+        them. Returns each list's reply, or the CiscoException it failed
+        with; errors that fail the session, or that are worth retrying
+        the whole pipeline for, are raised.
+        """
+        cmd_lists = [commands.optimize(cmds) for cmds in cmd_lists]
 
+        LOG.debug("executing pipelined commands - %s %s: %s" %
+                  (port.switch_host, port.interface, cmd_lists))
+
+        if self.dry_run:
+            LOG.debug("Dry run is enabled - skipping")
+            return [None for cmds in cmd_lists]
+
+        b = self._allow(port)
+        try:
+            replies = self._send_pipelined(self._get_pool(port), cmd_lists)
+        except Exception as e:
+            LOG.debug("Failed running pipelined commands - %s %s: %s" %
+                      (port.switch_host, port.interface, e))
+            self._record(b, e)
             raise CiscoException(e)
 
-    def _run_commands(self, port, commands):
-        num_tries = 0
-        max_tries = 1 + self._config.auth_failure_retries
-        sleep_time = self._config.auth_failure_retry_interval
+        for r in replies:
+            if (isinstance(r, Exception) and
+                    errors.retry_classifier(r) == retry.TRANSIENT):
+                LOG.debug("Failed running pipelined commands - %s %s: %s" %
+                          (port.switch_host, port.interface, r))
+                self._record(b, r)
+                raise CiscoException(r)
+
+        self._record(b)
+        return [CiscoException(r) if isinstance(r, Exception) else r
+                for r in replies]
+
+    def _send_pipelined(self, p, cmd_lists):
+        with p.item() as c:
+            if isinstance(c, nxapi.NxapiSession):
+                # no async mode over HTTP, one request after the other
+                replies = []
+                for cmds in cmd_lists:
+                    try:
+                        replies.append(c.command(cmds))
+                    except nxapi.NxapiError as e:
+                        replies.append(e)
+                return replies
+
+            c.async_mode = True
+            try:
+                rpcs = [c.command(cmds) for cmds in cmd_lists]
+            finally:
+                c.async_mode = False
+
+            replies = []
+            for rpc in rpcs:
+                reply = self._wait_reply(p, c, rpc)
+                error = cisco_utils.reply_error(reply)
+                replies.append(reply if error is None else error)
+            return replies
+
+    def _command(self, p, c, cmds):
+        """Run commands on a session, leaving the reply unparsed.
+
+        In sync mode ncclient builds a DOM of every reply before handing
+        it back, so we send in async mode and wait for the reply here;
+        the parsers in utils then stream it instead.
+        """
+        if isinstance(c, nxapi.NxapiSession):
+            return c.command(cmds)
 
-        while True:
-            num_tries += 1
+        c.async_mode = True
+        try:
+            rpc = c.command(cmds)
+        finally:
+            c.async_mode = False
+
+        reply = self._wait_reply(p, c, rpc)
+        error = cisco_utils.reply_error(reply)
+        if error is not None:
+            raise error
+        return reply
+
+    def _wait_reply(self, p, c, rpc):
+        rpc.event.wait(getattr(c, 'timeout', None) or 30)
+        if not rpc.event.is_set():
+            raise ReplyTimeoutError('No reply to RPC from %s' % (p.host))
+        if rpc.error is not None:
+            raise rpc.error
+        return rpc.reply
+
+    def _send(self, port, p, cmds):
+        with p.item() as c:
+            generation = None
+            if commands.changes_config(cmds):
+                generation = self._begin_change(port)
             try:
-                # we must lock during switch communication here because we run
-                # the save commands in a separate greenthread.
-                with lockutils.lock('CiscoDriver-%s' % (port.switch_host),
-                                    lock_file_prefix='neutron-'):
-                    return self._run_commands_inner(port, commands)
-            except CiscoException as err:
-                if (num_tries == max_tries or not self._retryable_error(err)):
-                    raise
-                LOG.warning("Received retryable failure: %s" % err)
-            time.sleep(sleep_time)
+                res = self._command(p, c, cmds)
+            except Exception:
+                if generation is not None:
+                    # we can't tell how much of it the switch applied
+                    self.binding_index.invalidate(port.switch_host)
+                raise
+            else:
+                if generation is not None:
+                    self.binding_index.apply(port.switch_host, cmds)
+                return res
+            finally:
+                if generation is not None:
+                    self._end_change(port, generation)
+
+    def _run_commands_locked(self, port, commands, ports=None):
+        # sessions come from a per-switch pool, so we only need to
+        # serialize operations on the same interface. Bulk operations
+        # lock every interface they touch, in order so that two of them
+        # can't deadlock.
+        interfaces = sorted(set(p.interface for p in (ports or [port])))
+        return self._with_locks(port.switch_host, interfaces,
+                                self._run_commands_inner, port, commands)
+
+    def _with_locks(self, host, interfaces, f, *args):
+        if not interfaces:
+            return f(*args)
+        with lockutils.lock('CiscoDriver-%s-%s' % (host, interfaces[0]),
+                            lock_file_prefix='neutron-'):
+            return self._with_locks(host, interfaces[1:], f, *args)
+
+    def _run_commands(self, port, commands, ports=None):
+        return self.retry_policy.call(
+            self._run_commands_locked, port, commands, ports)
@@ -0,0 +1,208 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Sorts NX-OS errors into categories the driver can act on.
+
+Errors come from ncclient either as an RPCError, which carries the
+<rpc-error> element of the reply, or as a transport error when the
+session itself failed. NX-API errors only carry the switch's message.
+The NETCONF error-tag is used when the switch sets a meaningful one,
+otherwise the NX-OS error message is matched.
+"""
+from baremetal_neutron_extension.drivers.cisco import retry
+
+TRANSIENT_AUTH = 'transient-auth'
+CONNECTION = 'connection'
+ALREADY_EXISTS = 'already-exists'
+DOES_NOT_EXIST = 'does-not-exist'
+SYNTAX = 'syntax'
+RESOURCE_EXHAUSTED = 'resource-exhausted'
+UNKNOWN = 'unknown'
+
+# NETCONF error-tags (RFC 6241 appendix A)
+TAGS = {
+    'access-denied': TRANSIENT_AUTH,
+    'data-exists': ALREADY_EXISTS,
+    'data-missing': DOES_NOT_EXIST,
+    'resource-denied': RESOURCE_EXHAUSTED,
+    'unknown-element': SYNTAX,
+    'bad-element': SYNTAX,
+    'unknown-attribute': SYNTAX,
+    'bad-attribute': SYNTAX,
+    'missing-element': SYNTAX,
+}
+
+# NX-OS error messages, checked in order
+MESSAGES = [
+    ('authorization failed', TRANSIENT_AUTH),
+    ('permission denied', TRANSIENT_AUTH),
+    ('not connected to netconf server', CONNECTION),
+    ('already exists', ALREADY_EXISTS),
+    ('already configured', ALREADY_EXISTS),
+    ('does not exist', DOES_NOT_EXIST),
+    ('not present', DOES_NOT_EXIST),
+    ('syntax error', SYNTAX),
+    ('invalid command', SYNTAX),
+    ('incomplete command', SYNTAX),
+    ('invalid range', SYNTAX),
+    ('invalid interface', SYNTAX),
+    ('resources', RESOURCE_EXHAUSTED),
+    ('exhausted', RESOURCE_EXHAUSTED),
+    ('maximum number', RESOURCE_EXHAUSTED),
+    ('limit reached', RESOURCE_EXHAUSTED),
+    ('out of memory', RESOURCE_EXHAUSTED),
+    ('no free', RESOURCE_EXHAUSTED),
+]
+
+# ncclient and NX-API transport errors, by name as ncclient is imported
+# lazily
+TRANSPORT_ERRORS = [
+    'TransportError',
+    'SessionCloseError',
+    'SSHError',
+    'SSHUnknownHostError',
+    'TimeoutExpiredError',
+    'NxapiTransportError',
+    'ReplyTimeoutError',
+]
+
+# errors only raised with the switch's answer, whatever it says
+SWITCH_ERRORS = [
+    'NxapiError',
+]
+
+# categories that mean the switch got the request and answered it
+SWITCH_ANSWERED = [
+    TRANSIENT_AUTH,
+    ALREADY_EXISTS,
+    DOES_NOT_EXIST,
+    SYNTAX,
+    RESOURCE_EXHAUSTED,
+]
+
+
+def _ns_strip(tag):
+    return tag.split('}', 1)[-1]
+
+
+def _cause(err):
+    """Unwrap a driver exception raised with the ncclient error."""
+    while err.args and isinstance(err.args[0], Exception):
+        err = err.args[0]
+    return err
+
+
+def parse_rpc_errors(element):
+    """Parse the <rpc-error>s in a reply (or an <rpc-error> itself).
+
+    Returns a list of dicts with the error's tag, type, severity and
+    message, any of which may be None.
+    """
+    if element is None:
+        return []
+
+    if _ns_strip(element.tag) == 'rpc-error':
+        rpc_errors = [element]
+    else:
+        rpc_errors = [e for e in element.iter()
+                      if _ns_strip(e.tag) == 'rpc-error']
+
+    parsed = []
+    for rpc_error in rpc_errors:
+        error = dict.fromkeys(['tag', 'type', 'severity', 'message'])
+        for child in rpc_error:
+            key = _ns_strip(child.tag)[len('error-'):]
+            if key in error and child.text:
+                error[key] = child.text.strip()
+        parsed.append(error)
+    return parsed
+
+
+def _categorize_message(message):
+    message = str(message or '').lower()
+    for text, category in MESSAGES:
+        if text in message:
+            return category
+    return None
+
+
+def categorize(err):
+    """Return the category of an error raised running commands."""
+    err = _cause(err)
+
+    if type(err).__name__ in TRANSPORT_ERRORS:
+        return _categorize_message(str(err)) or CONNECTION
+
+    errors = []
+    if getattr(err, 'tag', None):
+        # an ncclient RPCError
+        errors.append({'tag': err.tag,
+                       'message': getattr(err, 'message', None)})
+    if getattr(err, 'xml', None) is not None:
+        try:
+            errors = errors + parse_rpc_errors(err.xml)
+        except Exception:
+            pass
+
+    for error in errors:
+        category = TAGS.get(error['tag'])
+        if category:
+            return category
+        category = _categorize_message(error['message'])
+        if category:
+            return category
+
+    return _categorize_message(str(err)) or UNKNOWN
+
+
+def failed_command(err):
+    """The command an error says failed, if it says.
+
+    NX-API errors name their command. For NETCONF the whole batch fails
+    with one rpc-error, so only a message quoting the command tells.
+    """
+    return getattr(_cause(err), 'cmd', None)
+
+
+def is_category(err, *categories):
+    return categorize(err) in categories
+
+
+def switch_answered(err):
+    """Whether an error came from the switch rather than the network.
+
+    An rpc-error or NX-API error the switch sent back proves it's
+    reachable, even when its message isn't one we know.
+    """
+    cause = _cause(err)
+    if type(cause).__name__ in TRANSPORT_ERRORS:
+        return False
+    if (getattr(cause, 'tag', None) or
+            getattr(cause, 'xml', None) is not None or
+            type(cause).__name__ in SWITCH_ERRORS):
+        return True
+    return categorize(err) in SWITCH_ANSWERED
+
+
+def retry_classifier(err):
+    """Retry classifier retrying transient errors only."""
+    category = categorize(err)
+    if category in (TRANSIENT_AUTH, CONNECTION):
+        return retry.TRANSIENT
+    if category == UNKNOWN:
+        return None
+    return retry.PERMANENT
@@ -0,0 +1,168 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+NX-API transport, running NX-OS commands as JSON-RPC over HTTP(S).
+
+An NxapiSession stands in for an ncclient manager, so the session pool,
+retries, batching and error handling work the same on either transport.
+Each session keeps its own keep-alive connection to the switch.
+
+Like ncclient, the requests library NX-API needs is only imported once a
+switch is configured to use it.
+"""
+from neutron.openstack.common import importutils
+
+import json
+import uuid
+
+CONTENT_TYPE = 'application/json-rpc'
+
+
+class NxapiError(Exception):
+    """A command the switch refused, with the switch's error message."""
+
+    def __init__(self, message, code=None, cmd=None):
+        super(NxapiError, self).__init__(message)
+        self.code = code
+        self.cmd = cmd
+
+
+class NxapiTransportError(Exception):
+    """The request never got an answer from the switch."""
+
+
+class NxapiReply(object):
+    """The results of a batch of commands.
+
+    text is the text output of the commands, as the <data> of a NETCONF
+    reply would have it, and rows the ROW_interface tables of show
+    commands with structured output, with their values as strings.
+    """
+
+    def __init__(self, results):
+        self.results = results
+
+    @property
+    def text(self):
+        msgs = [r['msg'] for r in self.results
+                if isinstance(r, dict) and r.get('msg')]
+        if not msgs:
+            return None
+        return '\n'.join(msgs)
+
+    @property
+    def rows(self):
+        rows = []
+        for r in self.results:
+            if isinstance(r, dict):
+                _find_rows(r.get('body'), rows)
+        return rows
+
+
+def _find_rows(body, rows):
+    if isinstance(body, list):
+        for item in body:
+            _find_rows(item, rows)
+    elif isinstance(body, dict):
+        for k, v in body.items():
+            if k == 'ROW_interface':
+                for row in (v if isinstance(v, list) else [v]):
+                    rows.append(dict((rk, str(rv)) for rk, rv in row.items()
+                                     if not isinstance(rv, (dict, list))))
+            else:
+                _find_rows(v, rows)
+
+
+def _method(cmd):
+    # the running-config only comes as text, everything else as json
+    if cmd.startswith('show running'):
+        return 'cli_ascii'
+    return 'cli'
+
+
+class NxapiSession(object):
+    """An HTTP(S) keep-alive connection to a switch's NX-API."""
+
+    def __init__(self, host, username, password, port=None, scheme='https',
+                 verify=True, timeout=10):
+        self.host = host
+        self.url = '%s://%s%s/ins' % (scheme, host,
+                                      ':%s' % (port) if port else '')
+        self.timeout = timeout
+        self.session_id = uuid.uuid4().hex
+        self.connected = True
+
+        self._requests = importutils.import_module('requests')
+        self._http = self._requests.Session()
+        self._http.auth = (username, password)
+        self._http.verify = verify
+        self._http.headers['Content-Type'] = CONTENT_TYPE
+
+    def command(self, cmds):
+        """Run a list of commands as one JSON-RPC batch."""
+        payload = [{'jsonrpc': '2.0',
+                    'method': _method(cmd),
+                    'params': {'cmd': cmd, 'version': 1},
+                    'id': i + 1}
+                   for i, cmd in enumerate(cmds)]
+
+        try:
+            res = self._http.post(self.url, data=json.dumps(payload),
+                                  timeout=self.timeout)
+        except self._requests.RequestException as e:
+            self.connected = False
+            raise NxapiTransportError('NX-API request to %s failed: %s' %
+                                      (self.host, e))
+
+        if res.status_code == 401:
+            raise NxapiError('Authorization failed on %s' % (self.host),
+                             code=res.status_code)
+
+        try:
+            body = res.json()
+        except ValueError:
+            self.connected = False
+            raise NxapiTransportError('NX-API request to %s failed: HTTP %s'
+                                      % (self.host, res.status_code))
+
+        if not isinstance(body, list):
+            body = [body]
+        body.sort(key=lambda r: r.get('id'))
+
+        results = []
+        for r in body:
+            if r.get('error'):
+                raise self._error(r['error'], cmds, r.get('id'))
+            results.append(r.get('result'))
+        return NxapiReply(results)
+
+    def _error(self, error, cmds, id):
+        cmd = None
+        if isinstance(id, int) and 0 < id <= len(cmds):
+            cmd = cmds[id - 1]
+
+        message = error.get('message') or ''
+        data = error.get('data')
+        if isinstance(data, dict) and data.get('msg'):
+            message = '%s: %s' % (message, data['msg'].strip())
+        if cmd:
+            message = '%s (%s)' % (message, cmd)
+        return NxapiError(message, code=error.get('code'), cmd=cmd)
+
+    def close_session(self):
+        self.connected = False
+        self._http.close()
@@ -0,0 +1,180 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A bounded pool of NETCONF sessions to a single switch.
+"""
+import collections
+import contextlib
+
+from eventlet import semaphore
+
+from neutron.openstack.common import log as logging
+
+import time
+
+LOG = logging.getLogger(__name__)
+
+
+class SessionPool(object):
+    """Check out and check in sessions to a single switch.
+
+    At most max_size sessions are checked out at once, further callers
+    block until a session is checked back in. Idle sessions are reused
+    most recently used first. Sessions that have disconnected, or that
+    have been idle longer than idle_timeout while the pool holds more
+    than min_size sessions, are closed instead of being handed out.
+    """
+
+    def __init__(self, host, create, max_size, min_size=0,
+                 idle_timeout=None):
+        self.host = host
+        self.max_size = max_size
+        self.min_size = min(min_size, max_size)
+        self.idle_timeout = idle_timeout
+
+        # number of open sessions, idle or checked out
+        self.size = 0
+
+        self.stats = {
+            'probes': 0,
+            'probe_failures': 0,
+            'reconnects': 0
+        }
+
+        self._create = create
+        self._idle = collections.deque()
+        self._semaphore = semaphore.Semaphore(max_size)
+
+    def _connected(self, session):
+        # TODO(morgabra) connected is updated from a thread, so obviously
+        # there are some issues with checking this here.
+        return getattr(session, 'connected', True)
+
+    def _close(self, session):
+        self.size -= 1
+        try:
+            session.close_session()
+        except Exception as e:
+            LOG.debug("Failed closing session %(sess)s: %(e)s",
+                      {'sess': getattr(session, 'session_id', None), 'e': e})
+
+    def _open(self):
+        session = self._create()
+        self.size += 1
+        return session
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def evict(self):
+        """Close idle sessions that are disconnected or have expired."""
+        now = time.time()
+        for entry in list(self._idle):
+            session, checked_in = entry
+            expired = (self.idle_timeout and
+                       now - checked_in > self.idle_timeout and
+                       self.size > self.min_size)
+            if expired or not self._connected(session):
+                LOG.debug("evicting session to %s" % (self.host))
+                self._idle.remove(entry)
+                self._close(session)
+
+    def fill(self):
+        """Open idle sessions until the pool holds min_size sessions."""
+        while self.size < self.min_size:
+            self._idle.appendleft((self._open(), time.time()))
+
+    def probe(self, check, min_idle=0):
+        """Run check(session) over idle sessions, reopening failed ones.
+
+        Sessions checked in less than min_idle seconds ago are skipped, as
+        they have just proven themselves. Probing stops early if the pool is
+        fully checked out. Probed sessions keep their checkin time, so a
+        probe never keeps an otherwise expired session alive.
+        """
+        now = time.time()
+        for entry in list(self._idle):
+            session, checked_in = entry
+            if now - checked_in < min_idle:
+                continue
+            if not self._semaphore.acquire(blocking=False):
+                break
+            try:
+                try:
+                    self._idle.remove(entry)
+                except ValueError:
+                    continue  # checked out since we started
+
+                self.stats['probes'] += 1
+                try:
+                    check(session)
+                except Exception as e:
+                    self.stats['probe_failures'] += 1
+                    LOG.warning("Session probe to %s failed, reconnecting: %s"
+                                % (self.host, e))
+                    self._close(session)
+                    session = self._open()
+                    self.stats['reconnects'] += 1
+                self._idle.appendleft((session, checked_in))
+            except Exception as e:
+                LOG.error("Failed reconnecting session to %s: %s"
+                          % (self.host, e))
+            finally:
+                self._semaphore.release()
+
+    def get(self):
+        self._semaphore.acquire()
+        try:
+            self.evict()
+            if self._idle:
+                session, checked_in = self._idle.pop()
+                return session
+            return self._open()
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    def put(self, session, discard=False):
+        try:
+            if discard or not self._connected(session):
+                self._close(session)
+            else:
+                self._idle.append((session, time.time()))
+        finally:
+            self._semaphore.release()
+
+    @contextlib.contextmanager
+    def item(self):
+        """Check out a session for the duration of the block.
+
+        The session is closed rather than reused if the block raises, as
+        there is no telling what state a failed session was left in.
+        """
+        session = self.get()
+        try:
+            yield session
+        except Exception:
+            self.put(session, discard=True)
+            raise
+        self.put(session)
+
+    def close(self):
+        """Close all idle sessions."""
+        while self._idle:
+            session, checked_in = self._idle.pop()
+            self._close(session)
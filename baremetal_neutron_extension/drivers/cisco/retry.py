@@ -0,0 +1,111 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Retry policy for switch operations.
+
+Errors are run through a list of classifiers, each of which may call an
+error TRANSIENT (worth retrying), PERMANENT (fail now) or have no opinion
+(None). The first opinion wins, and errors nobody recognizes are treated
+as permanent.
+"""
+import eventlet
+
+from neutron.openstack.common import log as logging
+
+import random
+import time
+
+LOG = logging.getLogger(__name__)
+
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+
+def substring_classifier(substrings, result):
+    """Classify errors whose message contains a given substring."""
+    def classify(err):
+        msg = str(err).lower()
+        for s in substrings:
+            if s in msg:
+                return result
+        return None
+    return classify
+
+
+class RetryPolicy(object):
+    """Exponential backoff with jitter and an overall deadline.
+
+    The n-th retry waits interval * backoff ** (n - 1) seconds, capped at
+    max_interval and randomly shortened by up to the jitter fraction so
+    that callers who failed together do not retry together. No retry is
+    attempted if it would start after deadline seconds from the first
+    attempt.
+    """
+
+    def __init__(self, max_retries, interval, backoff=2.0, max_interval=None,
+                 jitter=0.0, deadline=None, classifiers=None,
+                 sleep=eventlet.sleep):
+        self.max_retries = max_retries
+        self.interval = interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.deadline = deadline
+        self.classifiers = list(classifiers or [])
+        self._sleep = sleep
+
+    def classify(self, err):
+        for classifier in self.classifiers:
+            result = classifier(err)
+            if result is not None:
+                return result
+        return PERMANENT
+
+    def delay(self, retry):
+        delay = self.interval * (self.backoff ** (retry - 1))
+        if self.max_interval is not None:
+            delay = min(delay, self.max_interval)
+        if self.jitter:
+            delay = delay * (1 - self.jitter * random.random())
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        start_time = time.time()
+        retries = 0
+
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as err:
+                if retries >= self.max_retries:
+                    raise
+                if self.classify(err) != TRANSIENT:
+                    raise
+
+                retries += 1
+                delay = self.delay(retries)
+                elapsed = time.time() - start_time
+                if (self.deadline is not None and
+                        elapsed + delay > self.deadline):
+                    LOG.warning("Retry deadline of %ss exceeded: %s" %
+                                (self.deadline, err))
+                    raise
+
+                LOG.warning("Received retryable failure, retrying in "
+                            "%.2fs (retry %d/%d): %s" %
+                            (delay, retries, self.max_retries, err))
+            self._sleep(delay)
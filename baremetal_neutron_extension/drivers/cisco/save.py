@@ -0,0 +1,312 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Debounced, per-switch scheduling of switch config saves.
+"""
+import eventlet
+from eventlet import event
+
+from neutron.openstack.common import log as logging
+from neutron.openstack.common import timeutils
+
+from baremetal_neutron_extension.db import db
+
+import datetime
+import time
+import uuid
+
+LOG = logging.getLogger(__name__)
+
+BLOCK = 'block'
+SYNC = 'sync'
+
+
+class PendingSaveStore(object):
+    """Keep pending saves in the database.
+
+    Pending saves then survive a restart, and with several API workers
+    each switch is claimed and saved by exactly one of them.
+    """
+
+    def __init__(self, lease_timeout):
+        self.lease_timeout = lease_timeout
+        self.worker_id = uuid.uuid4().hex
+
+    def add(self, host):
+        db.upsert_pending_save(host)
+
+    def claim(self, host=None, requested_before=None):
+        """Claim pending saves, returning a {host: generation} dict."""
+        rows = db.claim_pending_saves(self.worker_id,
+                                      self.lease_timeout,
+                                      switch_host=host,
+                                      requested_before=requested_before)
+        return dict((row.switch_host, row.generation) for row in rows)
+
+    def release(self, host):
+        db.release_pending_save(host, self.worker_id)
+
+    def complete(self, host, generation):
+        return db.complete_pending_save(host, self.worker_id, generation)
+
+
+class SaveScheduler(object):
+    """Run save(port) once a switch has been quiet for a while.
+
+    Every schedule() for a switch pushes its save back to quiet_period
+    seconds after the latest call, but never further than max_delay
+    seconds after the first call since the switch was last saved. Each
+    switch has its own timer, so saves for different switches run in
+    parallel, and at most one save per switch runs at a time.
+
+    Failed saves are retried after another quiet period, up to
+    max_attempts attempts in total.
+
+    At most max_pending switches (0 for no limit) wait for a save. A
+    schedule() for a switch that is not already waiting, once the limit
+    is reached, either waits up to overflow_timeout seconds for room
+    (BLOCK) or goes straight to saving in the caller (SYNC). A BLOCK that
+    times out saves in the caller as well, so no save is ever dropped.
+
+    Given a store, every schedule() is also recorded there and a save
+    only runs once it has been claimed from the store. Every
+    sweep_interval seconds, saves that no worker has run for longer than
+    quiet_period + max_delay (left over from a restart, or from a worker
+    that gave up) are claimed and run, using lookup(host) to find the
+    switch.
+
+    All timing goes through clock() and spawn_after(seconds, f, *args),
+    which default to time.time and eventlet.spawn_after.
+    """
+
+    def __init__(self, save, quiet_period, max_delay, max_attempts=3,
+                 store=None, lookup=None, sweep_interval=None,
+                 max_pending=0, overflow_policy=BLOCK, overflow_timeout=0,
+                 clock=time.time, spawn_after=eventlet.spawn_after):
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self.overflow_policy = overflow_policy
+        self.overflow_timeout = overflow_timeout
+
+        self._save = save
+        self._clock = clock
+        self._spawn_after = spawn_after
+        self._pending = {}
+        self._running = set()
+        self._waiters = []
+
+        self.stats = {
+            'scheduled': 0,
+            'coalesced': 0,
+            'overflows': 0,
+            'overflow_waits': 0,
+            'sync_saves': 0,
+            'peak_pending': 0,
+        }
+
+        self._store = store
+        self._lookup = lookup
+        if store and sweep_interval:
+            self._spawn_after(sweep_interval, self._sweep, sweep_interval)
+
+    def pending(self):
+        return self._pending.keys()
+
+    def _full(self, host):
+        return (self.max_pending and
+                host not in self._pending and
+                host not in self._running and
+                len(self._pending) >= self.max_pending)
+
+    def _wait_for_room(self, host):
+        self.stats['overflow_waits'] += 1
+        deadline = self._clock() + self.overflow_timeout
+
+        while self._full(host):
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return False
+
+            waiter = event.Event()
+            self._waiters.append(waiter)
+            timer = self._spawn_after(remaining, self._give_up, waiter)
+            waiter.wait()
+            timer.cancel()
+        return True
+
+    def _give_up(self, waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            waiter.send()
+
+    def _wake_waiter(self):
+        if self._waiters:
+            self._waiters.pop(0).send()
+
+    def schedule(self, port):
+        host = port.switch_host
+        self.stats['scheduled'] += 1
+
+        if self._store:
+            try:
+                self._store.add(host)
+            except Exception as e:
+                LOG.error('Failed recording config save on %s: %s' %
+                          (host, e))
+
+        if self._full(host):
+            self.stats['overflows'] += 1
+            LOG.warning('Config save queue is full (%d switches) adding %s' %
+                        (len(self._pending), host))
+
+            if (self.overflow_policy != BLOCK or
+                    not self._wait_for_room(host)):
+                self.stats['sync_saves'] += 1
+                LOG.warning('Saving config on %s synchronously' % (host))
+                self._claim_and_run(host, port, 1)
+                return
+
+        if host in self._pending:
+            self.stats['coalesced'] += 1
+        self._arm(port)
+        self.stats['peak_pending'] = max(
+            self.stats['peak_pending'], len(self._pending))
+
+    def _arm(self, port, attempt=0):
+        host = port.switch_host
+        now = self._clock()
+
+        entry = self._pending.get(host)
+        if entry:
+            entry['timer'].cancel()
+            entry['attempt'] = max(entry['attempt'], attempt)
+        else:
+            entry = {'first': now, 'attempt': attempt}
+            self._pending[host] = entry
+        entry['port'] = port
+
+        delay = min(self.quiet_period,
+                    max(0, entry['first'] + self.max_delay - now))
+        entry['timer'] = self._spawn_after(delay, self._fire, host)
+        LOG.debug('Queued config save on %s in %.2fs' % (host, delay))
+
+    def _fire(self, host):
+        if host in self._running:
+            # a save that started before the latest change is still going,
+            # so ours has to follow it rather than run alongside it.
+            entry = self._pending[host]
+            entry['timer'] = self._spawn_after(
+                self.quiet_period or 0.01, self._fire, host)
+            return
+
+        entry = self._pending.pop(host)
+        self._wake_waiter()
+        self._claim_and_run(host, entry['port'], entry['attempt'] + 1)
+
+    def _claim_and_run(self, host, port, attempt):
+        generation = None
+        if self._store:
+            try:
+                claimed = self._store.claim(host=host)
+            except Exception as e:
+                # better to save twice than not at all
+                LOG.error('Failed claiming config save on %s, saving '
+                          'anyway: %s' % (host, e))
+                claimed = None
+
+            if claimed is not None:
+                if host not in claimed:
+                    LOG.debug('Config save on %s is claimed elsewhere' %
+                              (host))
+                    return
+                generation = claimed[host]
+
+        self._run(port, attempt, generation)
+
+    def _run(self, port, attempt, generation=None):
+        host = port.switch_host
+
+        self._running.add(host)
+        try:
+            LOG.debug('Starting config save on %s (attempt %d/%d)' %
+                      (host, attempt, self.max_attempts))
+            self._save(port)
+            LOG.info('Finished config save on %s (attempt %d/%d)' %
+                     (host, attempt, self.max_attempts))
+        except Exception as e:
+            if generation is not None:
+                self._release(host)
+
+            if attempt >= self.max_attempts:
+                LOG.error('Failed config save on %s (attempt: %d/%d) '
+                          'Aborting, %s' %
+                          (host, attempt, self.max_attempts, e))
+            else:
+                LOG.debug('Failed config save on %s (attempt: %d/%d) '
+                          'Retrying, %s' %
+                          (host, attempt, self.max_attempts, e))
+                self._arm(port, attempt=attempt)
+        else:
+            if generation is not None:
+                self._complete(host, generation)
+        finally:
+            self._running.discard(host)
+
+    def _complete(self, host, generation):
+        try:
+            self._store.complete(host, generation)
+        except Exception as e:
+            LOG.error('Failed completing config save on %s: %s' % (host, e))
+
+    def _release(self, host):
+        try:
+            self._store.release(host)
+        except Exception as e:
+            LOG.error('Failed releasing config save on %s: %s' % (host, e))
+
+    def _sweep(self, interval):
+        try:
+            self._sweep_once()
+        finally:
+            self._spawn_after(interval, self._sweep, interval)
+
+    def _sweep_once(self):
+        max_age = datetime.timedelta(
+            seconds=self.quiet_period + self.max_delay)
+        try:
+            claimed = self._store.claim(
+                requested_before=timeutils.utcnow() - max_age)
+        except Exception as e:
+            LOG.error('Failed claiming orphaned config saves: %s' % (e))
+            return
+
+        for host, generation in claimed.items():
+            if host in self._running or host in self._pending:
+                self._release(host)
+                continue
+
+            port = self._lookup(host)
+            if not port:
+                LOG.error('Dropping config save on unknown switch %s' %
+                          (host))
+                self._complete(host, generation)
+                continue
+
+            LOG.info('Picked up orphaned config save on %s' % (host))
+            eventlet.spawn(self._run, port, 1, generation)
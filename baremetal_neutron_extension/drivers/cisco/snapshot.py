@@ -0,0 +1,220 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Switch-wide snapshot of the running-config, split into interface
+sections and dhcp snooping bindings, parsed into typed objects and
+indexed by vlan, port-channel and binding mac/ip.
+"""
+from baremetal_neutron_extension.drivers.cisco import state
+from baremetal_neutron_extension.drivers.cisco import utils as cisco_utils
+
+import re
+import time
+
+INTERFACE_RE = re.compile(r'^interface (ethernet|port-channel)\s*(\S+)$',
+                          re.IGNORECASE)
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip())
+
+
+class InterfaceConfig(object):
+    """The settings we care about in an interface's config section.
+
+    mode is 'access' or 'trunk'. allowed_vlans is a set of vlan ids, or
+    None for a trunk that allows every vlan (NX-OS then shows no allowed
+    vlan line at all). channel_group and vpc are strings like the
+    port-channel ids used elsewhere, or None.
+    """
+
+    def __init__(self, type, interface, lines):
+        self.type = type
+        self.interface = interface
+        self.lines = lines
+
+        self.description = None
+        self.mode = 'access'
+        self.access_vlan = 1
+        self.allowed_vlans = None
+        self.channel_group = None
+        self.channel_mode = None
+        self.vpc = None
+        self.shutdown = False
+
+        for line in lines:
+            try:
+                self._parse(line)
+            except (IndexError, ValueError):
+                pass  # not a form we know, leave it to the raw lines
+
+    def _parse(self, line):
+        words = line.split()
+        if line.startswith('description '):
+            self.description = line[len('description '):]
+        elif line.startswith('switchport mode '):
+            self.mode = words[2]
+        elif line.startswith('switchport access vlan '):
+            self.access_vlan = int(words[3])
+        elif line == 'switchport trunk allowed vlan none':
+            self.allowed_vlans = set()
+        elif line.startswith('switchport trunk allowed vlan add '):
+            self.allowed_vlans = ((self.allowed_vlans or set()) |
+                                  state._vlans(words[5]))
+        elif line.startswith('switchport trunk allowed vlan '):
+            self.allowed_vlans = state._vlans(words[4])
+        elif line.startswith('channel-group '):
+            self.channel_group = words[1]
+            if len(words) > 3 and words[2] == 'mode':
+                self.channel_mode = words[3]
+        elif line.startswith('vpc ') and words[1].isdigit():
+            self.vpc = words[1]
+        elif line == 'shutdown':
+            self.shutdown = True
+
+    @property
+    def name(self):
+        return '%s%s' % (self.type, self.interface)
+
+    def vlans(self):
+        """The vlans this interface carries, None for all of them."""
+        if self.mode == 'trunk':
+            if self.allowed_vlans is None:
+                return None
+            return set(self.allowed_vlans)
+        return set([self.access_vlan])
+
+    def __repr__(self):
+        return '<InterfaceConfig %s>' % (self.name)
+
+
+class Binding(object):
+    """A dhcp snooping 'ip source binding' entry."""
+
+    def __init__(self, line):
+        self.line = line
+        self.ip, self.mac, vlan, self.port_channel = state.parse_binding(
+            line)
+        self.vlan = int(vlan)
+
+    def __repr__(self):
+        return '<Binding %s %s vlan %s port-channel%s>' % (
+            self.ip, self.mac, self.vlan, self.port_channel)
+
+
+class Snapshot(object):
+    """The running-config of one switch at one point in time.
+
+    interfaces maps (type, interface), like ('ethernet', '1/20') or
+    ('port-channel', '20'), to the lines of that interface's section, in
+    the form utils.parse_command_result returns them. bindings maps a
+    port-channel to its dhcp snooping binding lines.
+
+    generation is the driver's change count for the switch when the
+    snapshot was taken.
+
+    The same config is also parsed into InterfaceConfigs and Bindings,
+    indexed by_vlan (interfaces carrying an explicitly allowed vlan),
+    by_port_channel (the port-channel and its member interfaces), and
+    by_mac and by_ip (bindings, with macs as state.parse_binding
+    normalizes them).
+    """
+
+    def __init__(self, interfaces, bindings, generation=None):
+        self.interfaces = interfaces
+        self.bindings = bindings
+        self.generation = generation
+        self.created_at = time.time()
+
+        self.configs = {}
+        self.by_vlan = {}
+        self.by_port_channel = {}
+        for (type, interface), lines in sorted(interfaces.items()):
+            config = InterfaceConfig(type, interface, lines)
+            self.configs[(type, interface)] = config
+
+            for vlan in config.vlans() or []:
+                self.by_vlan.setdefault(vlan, []).append(config)
+
+            if type == 'port-channel':
+                self.by_port_channel.setdefault(interface, []).insert(
+                    0, config)
+            elif config.channel_group:
+                self.by_port_channel.setdefault(
+                    config.channel_group, []).append(config)
+
+        self.by_mac = {}
+        self.by_ip = {}
+        for lines in bindings.values():
+            for line in lines:
+                binding = Binding(line)
+                self.by_mac.setdefault(binding.mac, []).append(binding)
+                self.by_ip.setdefault(binding.ip, []).append(binding)
+
+    def age(self):
+        return time.time() - self.created_at
+
+    def interface(self, type, interface):
+        """Lines configured on an interface, None if it isn't there."""
+        return self.interfaces.get((type, interface))
+
+    def dhcp(self, interface):
+        """dhcp snooping bindings of a port-channel."""
+        return list(self.bindings.get(interface, []))
+
+    def config(self, type, interface):
+        """The InterfaceConfig of an interface, None if it isn't there."""
+        return self.configs.get((type, interface))
+
+    def binding_entries(self, interface):
+        """dhcp snooping bindings of a port-channel, as Bindings."""
+        return [Binding(l) for l in self.bindings.get(interface, [])]
+
+    def mac(self, mac_address):
+        """Bindings for a mac address, in any format."""
+        return list(self.by_mac.get(state._mac(mac_address), []))
+
+
+def parse_running_config(text, generation=None):
+    """Parse the text of 'show running-config' into a Snapshot."""
+    interfaces = {}
+    bindings = {}
+
+    current = None
+    current_indent = 0
+    for line in (text or '').split('\n'):
+        if not line.strip():
+            continue
+
+        if current is not None and _indent(line) > current_indent:
+            if cisco_utils.filter_interface_conf(line):
+                current.append(line.strip())
+            continue
+        current = None
+
+        m = INTERFACE_RE.match(line.strip())
+        if m:
+            key = (m.group(1).lower(), m.group(2))
+            current = interfaces.setdefault(key, [])
+            current_indent = _indent(line)
+            continue
+
+        binding = state.parse_binding(line)
+        if binding:
+            bindings.setdefault(binding[3], []).append(line.strip())
+
+    return Snapshot(interfaces, bindings, generation=generation)
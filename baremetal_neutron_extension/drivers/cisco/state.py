@@ -0,0 +1,315 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Desired-state model of a provisioned interface, and diffing it against
+the running-config.
+
+The desired state is compiled from the very command lists commands.py
+builds for a new port, so the two can not drift apart. Lines are kept in
+the form NX-OS shows them in the running-config, which means defaults
+(like 'no shutdown') become lines that must be *absent* rather than
+present.
+"""
+from baremetal_neutron_extension.drivers.cisco import commands
+from baremetal_neutron_extension.drivers.cisco import utils as cisco_utils
+
+import re
+
+# settings that take a single value, where setting a new value replaces
+# the old one rather than adding to it.
+KEYS = [
+    'description',
+    'switchport mode',
+    'switchport access vlan',
+    'switchport trunk allowed vlan',
+    'spanning-tree port type',
+    'channel-group',
+    'vpc',
+]
+
+# defaults, which the running-config does not show.
+DEFAULTS = [
+    'no shutdown',
+    'switchport mode access',
+    'lldp transmit',
+    'cdp enable',
+]
+
+# lines the switch adds on its own.
+SWITCH_ADDED = [
+    'no negotiate auto',
+]
+
+BINDING_RE = re.compile(r'^ip source binding (\S+) (\S+) vlan (\S+) '
+                        r'interface port-channel(\S+)$')
+
+
+def _key(line):
+    for key in KEYS:
+        if line == key or line.startswith(key + ' '):
+            return key
+    return None
+
+
+def _negate(line):
+    if line.startswith('no '):
+        return line[3:]
+    return cisco_utils.negate_conf(line)
+
+
+def _vlans(value):
+    """Expand a vlan list like '1,3-5' into a set of vlan ids."""
+    vlans = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            vlans.update(range(int(start), int(end) + 1))
+        else:
+            vlans.add(int(part))
+    return vlans
+
+
+def _same(desired, running):
+    if desired == running:
+        return True
+    key = 'switchport trunk allowed vlan'
+    if _key(desired) == key and _key(running) == key:
+        try:
+            return (_vlans(desired[len(key):]) ==
+                    _vlans(running[len(key):]))
+        except ValueError:
+            return False
+    return False
+
+
+def _mac(mac_address):
+    return re.sub('[^0-9a-f]', '', mac_address.lower())
+
+
+def parse_binding(line):
+    """Parse a dhcp snooping binding into an (ip, mac, vlan, po) tuple."""
+    m = BINDING_RE.match(line.strip())
+    if not m:
+        return None
+    ip, mac, vlan, po = m.groups()
+    return (ip, _mac(mac), vlan, po)
+
+
+class InterfaceState(object):
+    """Desired configuration of a single interface.
+
+    lines must show up in the running-config, absent must not, and
+    defaults maps a key to the line restoring its default value.
+    """
+
+    def __init__(self, type, interface):
+        self.type = type
+        self.interface = interface
+        self.lines = []
+        self.absent = set()
+        self.defaults = {}
+
+    def keys(self):
+        return set(_key(l) for l in self.lines) - set([None])
+
+    def apply(self, line):
+        """Fold one configuration command into the desired state."""
+        if line.startswith('no ') and line[3:] in self.lines:
+            self.lines.remove(line[3:])
+            self.absent.add(line[3:])
+            return
+
+        if line in DEFAULTS:
+            key = _key(line)
+            if key:
+                self.defaults[key] = line
+                self.lines = [l for l in self.lines if _key(l) != key]
+            else:
+                self.absent.add(_negate(line))
+                if _negate(line) in self.lines:
+                    self.lines.remove(_negate(line))
+            return
+
+        key = _key(line)
+        if key:
+            self.lines = [l for l in self.lines if _key(l) != key]
+            self.defaults.pop(key, None)
+        self.absent.discard(line)
+        if line not in self.lines:
+            self.lines.append(line)
+
+    def diff(self, running, tolerated=None):
+        """Commands taking running to this state, None if we can't tell.
+
+        tolerated is another InterfaceState whose lines may show up in
+        running as well, as a port-channel's do on its member interfaces.
+        """
+        remove = []
+        for line in running:
+            if [l for l in self.lines if _same(l, line)]:
+                continue
+            key = _key(line)
+            if line in self.absent:
+                remove.append(_negate(line))
+            elif key and key in self.keys():
+                continue  # replaced below
+            elif key and key in self.defaults:
+                remove.append(self.defaults[key])
+            elif line in SWITCH_ADDED:
+                continue
+            elif tolerated and (line in tolerated.lines or
+                                (key and key in tolerated.keys())):
+                continue
+            else:
+                # config we did not put there, only a full rebuild is safe
+                return None
+
+        add = [l for l in self.lines
+               if not [r for r in running if _same(l, r)]]
+        return remove + add
+
+
+class PortState(object):
+    """Desired configuration of a port, and its dhcp snooping binding."""
+
+    def __init__(self, ethernet, port_channel=None, bindings=None):
+        self.ethernet = ethernet
+        self.port_channel = port_channel
+        self.bindings = bindings or []
+
+
+def compile_commands(cmds):
+    """Fold a list of commands into a list of InterfaceStates.
+
+    Global 'ip source binding' commands are returned alongside as a list
+    of (binding, line) pairs.
+    """
+    interfaces = {}
+    order = []
+    bindings = []
+    current = None
+
+    for cmd in cmds:
+        if cmd == commands._configure()[0]:
+            current = None
+        elif cmd.startswith('interface '):
+            type, interface = cmd.split(' ')[1:3]
+            key = (type, interface)
+            if key not in interfaces:
+                interfaces[key] = InterfaceState(type, interface)
+                order.append(key)
+            current = interfaces[key]
+        elif parse_binding(cmd):
+            bindings.append((parse_binding(cmd), cmd))
+        elif cmd.startswith('no ') and parse_binding(cmd[3:]):
+            binding = parse_binding(cmd[3:])
+            bindings = [b for b in bindings if b[0] != binding]
+        elif current is not None:
+            current.apply(cmd)
+
+    return [interfaces[k] for k in order], bindings
+
+
+def compile_port(hardware_id, interface, vlan_id, ip, mac_address, trunked):
+    """Compile the config create_port() gives an interface."""
+    portchan_int = commands._make_portchannel_interface(interface)
+    eth_int = commands._make_ethernet_interface(interface)
+
+    cmds = commands.create_port(
+        hardware_id=hardware_id,
+        interface=interface,
+        vlan_id=vlan_id,
+        ip=ip,
+        mac_address=mac_address,
+        trunked=trunked)
+    if trunked:
+        cmds = (cmds +
+                commands._configure_interface('port-channel', portchan_int) +
+                commands._add_vpc(portchan_int))
+
+    interfaces, bindings = compile_commands(cmds)
+    by_type = dict((i.type, i) for i in interfaces)
+
+    ethernet = by_type.get('ethernet') or InterfaceState('ethernet', eth_int)
+    return PortState(ethernet,
+                     port_channel=by_type.get('port-channel'),
+                     bindings=bindings)
+
+
+def diff_port(desired, ethernet, port_channel, dhcp):
+    """Work out the commands taking a port to the desired PortState.
+
+    ethernet and port_channel are running-config lines as returned by
+    utils.parse_command_result (port_channel is None if the port-channel
+    does not exist), dhcp are the port-channel's snooping bindings.
+
+    Returns a list of command lists, each safe to retry on its own, or
+    None if the running config can not be diffed and the port has to be
+    rebuilt from scratch.
+    """
+    running_bindings = [(parse_binding(l), l) for l in dhcp
+                        if parse_binding(l)]
+
+    # creating or deleting the port-channel (with its members and
+    # bindings) is what a full rebuild is for.
+    if (desired.port_channel is None) != (port_channel is None):
+        return None
+    if desired.port_channel is None and running_bindings:
+        return None
+
+    eth_cmds = desired.ethernet.diff(ethernet,
+                                     tolerated=desired.port_channel)
+    if eth_cmds is None:
+        return None
+
+    po_cmds = []
+    vpc_cmds = []
+    if desired.port_channel is not None:
+        po_cmds = desired.port_channel.diff(port_channel)
+        if po_cmds is None:
+            return None
+
+        # adding a vpc twice fails, so it can't share a retry with others
+        vpc_cmds = [c for c in po_cmds if _key(c) == 'vpc']
+        po_cmds = [c for c in po_cmds if _key(c) != 'vpc']
+
+    wanted = [b for b, l in desired.bindings]
+    have = [b for b, l in running_bindings]
+    dhcp_cmds = ([cisco_utils.negate_conf(l) for b, l in running_bindings
+                  if b not in wanted] +
+                 [l for b, l in desired.bindings if b not in have])
+
+    cmds = []
+    if po_cmds:
+        cmds = cmds + commands._configure_interface(
+            'port-channel', desired.port_channel.interface) + po_cmds
+    if dhcp_cmds:
+        cmds = cmds + commands._configure() + dhcp_cmds
+    if eth_cmds:
+        cmds = cmds + commands._configure_interface(
+            'ethernet', desired.ethernet.interface) + eth_cmds
+
+    batches = []
+    if cmds:
+        batches.append(cmds)
+    if vpc_cmds:
+        batches.append(commands._configure_interface(
+            'port-channel', desired.port_channel.interface) + vpc_cmds)
+    return batches
@@ -15,6 +15,18 @@
 # limitations under the License.
 
 
+from neutron.openstack.common import importutils
+
+from baremetal_neutron_extension.drivers.cisco import nxapi
+
+import io
+
+# lxml comes with ncclient, so it is optional too
+etree = importutils.try_import('lxml.etree')
+
+NETCONF_NS = '{urn:ietf:params:xml:ns:netconf:base:1.0}'
+
+
 def filter_interface_conf(c):
     """Determine if an interface configuration string is relevant."""
     c = c.strip()
@@ -34,6 +46,67 @@ def negate_conf(c):
     return "no %s" % c
 
 
+def _raw_reply(res):
+    """The reply's raw XML, if we can stream it rather than use the DOM."""
+    raw = getattr(res, 'xml', None)
+    if etree is None or not isinstance(raw, str):
+        return None
+    return raw
+
+
+def reply_error(reply):
+    """Get the error an ncclient reply carries, see below.
+
+    ncclient parses a reply into a DOM as soon as its error is looked
+    at. Only replies that might hold an rpc-error get that far, so a big
+    reply never has a DOM built just to find out it has no error.
+    """
+    raw = getattr(reply, 'xml', None)
+    if isinstance(raw, str) and 'rpc-error' not in raw:
+        return None
+    return reply.error
+
+
+def _iterparse(raw, tag):
+    """Yield each tag element of a raw reply, freeing it afterwards.
+
+    lxml builds the tree a read buffer at a time, and the elements
+    already yielded are dropped, so memory use follows the size of a
+    buffer rather than the whole reply.
+    """
+    for _, elem in etree.iterparse(io.BytesIO(raw), events=('end',),
+                                   tag=NETCONF_NS + tag, huge_tree=True):
+        yield elem
+
+        # drop the element and the siblings already seen
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def command_result_text(res):
+    """Get the raw text of an ncclient command response, see below."""
+    if not res:
+        return None
+
+    if isinstance(res, nxapi.NxapiReply):
+        return res.text
+
+    raw = _raw_reply(res)
+    if raw is not None:
+        texts = [elem.text for elem in _iterparse(raw, 'data')]
+        if len(texts) != 1:
+            raise Exception("cannot parse command response")
+        return texts[0]
+
+    # get the first child from the xml response
+    res = res._root.getchildren()
+    if len(res) != 1:
+        raise Exception("cannot parse command response")
+
+    return res[0].text
+
+
 def parse_command_result(res):
     """Get text reponse from an ncclient command.
 
@@ -63,19 +136,11 @@ def parse_command_result(res):
      'spanning-tree port type edge',
      'spanning-tree bpduguard enable']
     """
-    if not res:
-        return []
-
-    # get the first child from the xml response
-    res = res._root.getchildren()
-    if len(res) != 1:
-        raise Exception("cannot parse command response")
-
-    # split the raw text by newline
-    text = res[0].text
+    text = command_result_text(res)
     if not text:
         return []
 
+    # split the raw text by newline
     res = text.split("\n")
 
     # filter comments and other unrelated data
@@ -118,10 +183,29 @@ def parse_interface_status(res):
       </data>
     </rpc-reply>
     """
-    # XML namespace
-    ns = '{urn:ietf:params:xml:ns:netconf:base:1.0}'
+    interfaces = _interface_rows(res)
+
+    if not interfaces:
+        raise Exception("no interface data found")
+
+    if len(interfaces) > 1:
+        raise Exception("more than 1 interface found")
+
+    return interfaces[0]
+
+
+def parse_interface_statuses(res):
+    """Parse a 'show interface' for many interfaces, see above.
+
+    Returns a dict of the interfaces keyed by their lower-cased name,
+    like 'ethernet1/1' or 'port-channel1'.
+    """
+    return dict((r['interface'].lower(), r) for r in _interface_rows(res)
+                if r.get('interface'))
 
-    root = res._root
+
+def _interface_rows(res):
+    ns = NETCONF_NS
 
     def _add_ns(key):
         return '%s%s' % (ns, key)
@@ -129,25 +213,29 @@ def parse_interface_status(res):
     def _strip_ns(tag):
         return tag[len(ns):]
 
-    interfaces = list(root.getiterator(_add_ns('ROW_interface')))
-
-    if not interfaces:
-        raise Exception("no interface data found")
-
-    if len(interfaces) > 1:
-        raise Exception("more than 1 interface found")
+    if isinstance(res, nxapi.NxapiReply):
+        return res.rows
 
-    interface = interfaces[0]
+    raw = _raw_reply(res)
+    if raw is not None:
+        interfaces = _iterparse(raw, 'ROW_interface')
+    else:
+        interfaces = res._root.getiterator(_add_ns('ROW_interface'))
 
-    r = {}
-    for e in interface.iter():
+    rows = []
+    for interface in interfaces:
+        r = {}
+        for e in interface.iter():
+            if not isinstance(e.tag, str):
+                continue  # comments
 
-        k = _strip_ns(e.tag)
-        v = e.text
+            k = _strip_ns(e.tag)
+            v = e.text
 
-        if not k or k == 'ROW_interface':
-            continue
+            if not k or k == 'ROW_interface':
+                continue
 
-        r[k] = v
+            r[k] = v
+        rows.append(r)
 
-    return r
+    return rows
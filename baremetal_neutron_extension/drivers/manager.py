@@ -14,6 +14,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import eventlet
+
 from baremetal_neutron_extension.db import db
 from baremetal_neutron_extension.db import models
 
@@ -114,14 +116,34 @@ class DriverManager(object):
 
         return info
 
+    def _run_concurrently(self, calls):
+        """Run (func, arg) pairs in parallel greenthreads.
+
+        Returns a (result, exception) pair for each call, in order.
+        """
+        pool = eventlet.GreenPool(len(calls) or 1)
+        threads = [pool.spawn(func, arg) for func, arg in calls]
+
+        results = []
+        for gt in threads:
+            try:
+                results.append((gt.wait(), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
+
     def attach(self, neutron_port, neutron_network):
         """Realize a neutron port configuration on given physical ports.
 
         We can't just wrap this in a database transaction because we'll have
-        to manually recover the switch configurations if we fail.
+        to manually recover the switch configurations if we fail. Each
+        switchport is configured concurrently, and if any of them fails the
+        ones that succeeded are rolled back, or marked ERROR if the rollback
+        fails too.
         """
         switchports = self._get_switchports(neutron_port)
 
+        jobs = []
         try:
             if not switchports:
                 msg = ('Cannot attach, no given switchports '
@@ -150,12 +172,14 @@ class DriverManager(object):
                 )
 
                 if portbindings:
-                    driver.attach(port_info)
+                    jobs.append((switchport, new_portbinding, port_info,
+                                 driver.attach, driver.detach))
                 else:
-                    driver.create(port_info)
+                    jobs.append((switchport, new_portbinding, port_info,
+                                 driver.create, driver.delete))
 
-                self._set_portbinding_state(
-                    new_portbinding, models.SwitchPortBindingState.ACTIVE)
+            results = self._run_concurrently(
+                [(job[3], job[2]) for job in jobs])
 
         except Exception as e:
             for switchport in switchports:
@@ -163,10 +187,38 @@ class DriverManager(object):
             LOG.error('Failed configuring port: %s', e)
             raise e
 
+        errors = [exc for _, exc in results if exc]
+        for job, (_, exc) in zip(jobs, results):
+            switchport, portbinding, port_info, _, undo = job
+            if not errors:
+                self._set_portbinding_state(
+                    portbinding, models.SwitchPortBindingState.ACTIVE)
+                continue
+
+            if not exc:
+                try:
+                    undo(port_info)
+                except Exception as undo_exc:
+                    LOG.error('Failed rolling back switchport %s: %s' %
+                              (switchport['id'], undo_exc))
+                    self._set_portbinding_state(
+                        portbinding, models.SwitchPortBindingState.ERROR)
+                    continue
+            self._delete_portbinding(neutron_port, switchport)
+
+        if errors:
+            LOG.error('Failed configuring port: %s', errors[0])
+            raise errors[0]
+
     def detach(self, neutron_port, neutron_network):
-        """Realize a neutron port configuration on given physical ports."""
+        """Realize a neutron port configuration on given physical ports.
+
+        Each switchport is deconfigured concurrently. Switchports that fail
+        keep their binding, marked ERROR, as their configuration is unknown.
+        """
         switchports = self._get_switchports(neutron_port)
 
+        jobs = []
         try:
             if not switchports:
                 msg = ('Cannot detach, no given switchports '
@@ -200,14 +252,30 @@ class DriverManager(object):
                 )
 
                 if len(portbindings) == 1:
-                    driver.delete(port_info)
+                    jobs.append((switchport, active_portbinding, port_info,
+                                 driver.delete))
                 else:
-                    driver.detach(port_info)
+                    jobs.append((switchport, active_portbinding, port_info,
+                                 driver.detach))
 
-                self._delete_portbinding(neutron_port, switchport)
+            results = self._run_concurrently(
+                [(job[3], job[2]) for job in jobs])
 
         except Exception as e:
             for switchport in switchports:
                 self._delete_portbinding(neutron_port, switchport)
             LOG.error('Failed configuring port: %s', e)
             raise e
+
+        errors = [exc for _, exc in results if exc]
+        for job, (_, exc) in zip(jobs, results):
+            switchport, portbinding = job[:2]
+            if exc:
+                self._set_portbinding_state(
+                    portbinding, models.SwitchPortBindingState.ERROR)
+            else:
+                self._delete_portbinding(neutron_port, switchport)
+
+        if errors:
+            LOG.error('Failed configuring port: %s', errors[0])
+            raise errors[0]
@@ -26,6 +26,22 @@ def ok():
     return res
 
 
+def rpc_error(message):
+    res = """<?xml version="1.0" encoding="ISO-8859-1"?>
+<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"
+           xmlns:if="http://www.cisco.com/nxos:1.0:if_manager"
+           xmlns:nxos="http://www.cisco.com/nxos:1.0"
+           message-id="urn:uuid:e7ef8254-10a6-11e4-b86d-becafe000bed">
+  <rpc-error>
+    <error-type>application</error-type>
+    <error-tag>operation-failed</error-tag>
+    <error-severity>error</error-severity>
+    <error-message>%s</error-message>
+  </rpc-error>
+</rpc-reply>"""
+    return res % (message)
+
+
 def show_dhcp(port):
 
     dhcp = ("ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF "
@@ -193,3 +209,93 @@ def show_ethernet_status(port):
   </data>
 </rpc-reply>"""
     return res % ({'port': port})
+
+
+def show_running_config(ports):
+
+    interfaces = []
+    for port in ports:
+        interfaces.append("""
+interface port-channel%(port)s
+  description CUST39a8365c-3b84-4169-bc1a-1efa3ab20e04-host
+  switchport mode trunk
+  switchport trunk allowed vlan 1,2
+  ip verify source dhcp-snooping-vlan
+  spanning-tree port type edge trunk
+  no negotiate auto
+  vpc %(port)s""" % ({'port': port}))
+
+    for port in ports:
+        interfaces.append("""
+interface Ethernet1/%(port)s
+  description CUST39a8365c-3b84-4169-bc1a-1efa3ab20e04-host
+  no lldp transmit
+  switchport mode trunk
+  switchport trunk allowed vlan 1,2
+  spanning-tree port type edge trunk
+  spanning-tree bpduguard enable
+  channel-group %(port)s mode active""" % ({'port': port}))
+
+    bindings = [("ip source binding 10.0.0.%(port)s FFFF.FFFF.FFFF.FFFF "
+                 "vlan 1 interface port-channel%(port)s") % ({'port': port})
+                for port in ports]
+
+    res = """<?xml version="1.0" encoding="ISO-8859-1"?>
+<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"
+           xmlns:if="http://www.cisco.com/nxos:1.0:if_manager"
+           xmlns:nxos="http://www.cisco.com/nxos:1.0"
+           message-id="urn:uuid:4a9be8b4-df85-11e3-ab20-becafe000bed">
+  <data>
+!Command: show running-config
+!Time: Mon May 19 18:40:08 2014
+
+version 6.0(2)U2(4)
+feature dhcp
+
+%(bindings)s
+%(interfaces)s
+
+interface mgmt0
+  vrf member management
+  ip address 10.1.1.2/24
+  </data>
+</rpc-reply>"""
+    return res % ({'bindings': '\n'.join(bindings),
+                   'interfaces': '\n'.join(interfaces)})
+
+
+def show_interfaces(ports):
+
+    rows = []
+    for port in ports:
+        rows.append("""
+                <ROW_interface>
+                  <interface>Ethernet1/%(port)s</interface>
+                  <state>up</state>
+                </ROW_interface>""" % ({'port': port}))
+        rows.append("""
+                <ROW_interface>
+                  <interface>port-channel%(port)s</interface>
+                  <state>up</state>
+                  <vpc_status>vPC Status: Up, vPC number: %(port)s</vpc_status>
+                </ROW_interface>""" % ({'port': port}))
+
+    res = """<?xml version="1.0" encoding="ISO-8859-1"?>
+<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"
+           xmlns:if="http://www.cisco.com/nxos:1.0:if_manager"
+           xmlns:nxos="http://www.cisco.com/nxos:1.0"
+           message-id="urn:uuid:c87305ee-0d19-11e4-ab20-becafe000bed">
+  <data>
+    <show>
+      <interface>
+        <__XML__OPT_Cmd_show_interface___readonly__>
+          <__readonly__>
+            <TABLE_interface>%(rows)s
+            </TABLE_interface>
+          </__readonly__>
+        </__XML__OPT_Cmd_show_interface___readonly__>
+      </interface>
+    </show>
+  </data>
+</rpc-reply>"""
+    return res % ({'rows': ''.join(rows)})
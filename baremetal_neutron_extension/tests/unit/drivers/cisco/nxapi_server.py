@@ -0,0 +1,107 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A local stand-in for a switch's NX-API, for tests.
+"""
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+import base64
+import json
+import threading
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class FakeNxapiServer(object):
+    """Answer NX-API JSON-RPC batches on a local port.
+
+    outputs maps a command to its result, and errors maps a command to
+    the message of the error it fails with; other commands succeed with
+    no output. Every batch is recorded in requests, with the client
+    port it came in on in clients.
+    """
+
+    def __init__(self, username='user1', password='pass'):
+        self.auth = 'Basic ' + base64.b64encode(
+            ('%s:%s' % (username, password)).encode()).decode()
+        self.outputs = {}
+        self.errors = {}
+        self.requests = []
+        self.clients = []
+
+        server = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+
+                if self.headers.get('Authorization') != server.auth:
+                    self._reply(401, b'')
+                    return
+
+                batch = json.loads(body.decode())
+                server.requests.append([r['params']['cmd'] for r in batch])
+                server.clients.append(self.client_address[1])
+
+                results = []
+                for r in batch:
+                    cmd = r['params']['cmd']
+                    if cmd in server.errors:
+                        results.append({
+                            'jsonrpc': '2.0',
+                            'error': {'code': -32602,
+                                      'message': 'Invalid params',
+                                      'data': {'msg': server.errors[cmd]}},
+                            'id': r['id']})
+                        break
+                    results.append({'jsonrpc': '2.0',
+                                    'result': server.outputs.get(cmd),
+                                    'id': r['id']})
+
+                status = 500 if 'error' in results[-1] else 200
+                if len(batch) == 1:
+                    results = results[0]
+                self._reply(status, json.dumps(results).encode())
+
+            def _reply(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json-rpc')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = _HTTPServer(('127.0.0.1', 0), Handler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        kwargs={'poll_interval': .01})
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
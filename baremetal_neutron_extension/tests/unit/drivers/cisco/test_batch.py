@@ -0,0 +1,83 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import eventlet
+
+import unittest
+
+from baremetal_neutron_extension.drivers.cisco import batch
+
+
+class FakeSwitchError(Exception):
+    pass
+
+
+class TestCommandBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.sent = []
+        self.batcher = batch.CommandBatcher('switch1.host.com',
+                                            send=self._send,
+                                            window=.01)
+
+    def _send(self, cmds):
+        self.sent.append(cmds)
+        if 'bad' in cmds:
+            raise FakeSwitchError('Syntax error at ^')
+        return 'ok %d' % len(self.sent)
+
+    def _submit_all(self, lists):
+        threads = [eventlet.spawn(self.batcher.submit, cmds)
+                   for cmds in lists]
+        results = []
+        for t in threads:
+            try:
+                results.append(t.wait())
+            except FakeSwitchError as e:
+                results.append(e)
+        return results
+
+    def test_single_list_runs_alone(self):
+        self.assertEqual(self.batcher.submit(['a']), 'ok 1')
+        self.assertEqual(self.sent, [['a']])
+        self.assertEqual(self.batcher.stats['batches'], 0)
+
+    def test_merges_concurrent_lists(self):
+        results = self._submit_all([['a'], ['b'], ['c']])
+
+        self.assertEqual(self.sent, [['a', 'b', 'c']])
+        self.assertEqual(results, ['ok 1', 'ok 1', 'ok 1'])
+        self.assertEqual(self.batcher.stats['batches'], 1)
+        self.assertEqual(self.batcher.stats['batched'], 3)
+
+    def test_failed_batch_is_split(self):
+        results = self._submit_all([['a'], ['bad'], ['c']])
+
+        self.assertEqual(self.sent, [['a', 'bad', 'c'], ['a'], ['bad'], ['c']])
+        self.assertEqual(results[0], 'ok 2')
+        self.assertTrue(isinstance(results[1], FakeSwitchError))
+        self.assertEqual(results[2], 'ok 4')
+        self.assertEqual(self.batcher.stats['splits'], 1)
+
+    def test_max_size_flushes_early(self):
+        self.batcher.window = 10
+        self.batcher.max_size = 2
+
+        with eventlet.Timeout(1):
+            results = self._submit_all([['a'], ['b']])
+
+        self.assertEqual(self.sent, [['a', 'b']])
+        self.assertEqual(results, ['ok 1', 'ok 1'])
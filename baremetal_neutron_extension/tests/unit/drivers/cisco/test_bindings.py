@@ -0,0 +1,67 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from baremetal_neutron_extension.drivers.cisco import bindings
+from baremetal_neutron_extension.drivers.cisco import commands
+
+HOST = 'switch1.host.com'
+
+
+def _binding(po, ip='10.0.0.2'):
+    return ('ip source binding %s FFFF.FFFF.FFFF.FFFF vlan 1 '
+            'interface port-channel%s' % (ip, po))
+
+
+class TestBindingIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = bindings.BindingIndex(ttl=60)
+
+    def test_unknown_until_loaded(self):
+        self.assertEqual(self.index.get(HOST, '1'), None)
+
+        self.index.load(HOST, {'1': [_binding('1')]})
+        self.assertEqual(self.index.get(HOST, '1'), [_binding('1')])
+        self.assertEqual(self.index.get(HOST, '2'), [])
+
+    def test_expires(self):
+        self.index.ttl = 0
+        self.index.load(HOST, {'1': [_binding('1')]})
+        self.assertEqual(self.index.get(HOST, '1'), None)
+
+    def test_apply_bind_and_unbind(self):
+        self.index.load(HOST, {'1': [_binding('1')]})
+
+        self.index.apply(HOST, commands.add_vlan(
+            'eth1/2', 1, '10.0.0.3', 'ff:ff:ff:ff:ff:ff', True))
+        self.assertEqual(len(self.index.get(HOST, '2')), 1)
+
+        self.index.apply(HOST, commands.unbind_ip(
+            'eth1/2', 1, '10.0.0.3', 'ff:ff:ff:ff:ff:ff', True))
+        self.index.apply(HOST, ['no ' + _binding('1')])
+        self.assertEqual(self.index.get(HOST, '1'), [])
+        self.assertEqual(self.index.get(HOST, '2'), [])
+
+    def test_deleting_bound_port_channel_invalidates(self):
+        self.index.load(HOST, {'1': [_binding('1')]})
+
+        self.index.apply(HOST, ['no interface port-channel 2-4'])
+        self.assertEqual(self.index.get(HOST, '1'), [_binding('1')])
+
+        self.index.apply(HOST, ['no interface port-channel 1-4'])
+        self.assertEqual(self.index.get(HOST, '1'), None)
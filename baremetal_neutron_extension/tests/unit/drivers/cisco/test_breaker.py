@@ -0,0 +1,75 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+
+import unittest
+
+from baremetal_neutron_extension.drivers.cisco import breaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = breaker.CircuitBreaker('switch1.host.com',
+                                              failure_threshold=2,
+                                              reset_timeout=30)
+
+    def _open(self):
+        with mock.patch.object(breaker.time, 'time', return_value=0):
+            self.breaker.failure()
+            self.breaker.failure()
+
+    def test_opens_after_threshold(self):
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+        self._open()
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+
+        with mock.patch.object(breaker.time, 'time', return_value=10):
+            self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.rejected, 1)
+
+    def test_success_resets_failures(self):
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+
+    def test_half_open_allows_single_probe(self):
+        self._open()
+
+        with mock.patch.object(breaker.time, 'time', return_value=30):
+            self.assertTrue(self.breaker.allow())
+            self.assertEqual(self.breaker.state, breaker.HALF_OPEN)
+            self.assertFalse(self.breaker.allow())
+
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        self._open()
+
+        with mock.patch.object(breaker.time, 'time', return_value=30):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.failure()
+
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+        with mock.patch.object(breaker.time, 'time', return_value=40):
+            self.assertFalse(self.breaker.allow())
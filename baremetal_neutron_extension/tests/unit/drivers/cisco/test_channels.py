@@ -0,0 +1,118 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+
+import unittest
+
+from baremetal_neutron_extension import config
+from baremetal_neutron_extension.drivers import base as base_driver
+from baremetal_neutron_extension.drivers.cisco import channels
+from baremetal_neutron_extension.drivers.cisco import driver
+
+
+class TestSharedTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = mock.Mock()
+        self.transport.is_active.return_value = True
+        self.ncclient = mock.Mock()
+        self.ncclient_transport = mock.Mock()
+        mock.patch.object(channels.importutils, 'import_module',
+                          return_value=self.ncclient_transport).start()
+        self.addCleanup(mock.patch.stopall)
+
+        self.shared = channels.SharedTransport('switch1.host.com',
+                                               self.transport, 2)
+
+    def test_open_channel(self):
+        m = self.shared.open(self.ncclient, timeout=10)
+
+        channel = self.transport.open_session.return_value
+        channel.invoke_subsystem.assert_called_once_with('netconf')
+        session = self.ncclient_transport.SSHSession.return_value
+        self.assertEqual(session._transport, self.transport)
+        session._post_connect.assert_called_once_with()
+        self.assertEqual(m, self.ncclient.Manager.return_value)
+        self.assertEqual(self.shared.channels, 1)
+
+    def test_available(self):
+        self.assertTrue(self.shared.available())
+        self.shared.open(self.ncclient, timeout=10)
+        self.shared.open(self.ncclient, timeout=10)
+        self.assertFalse(self.shared.available())
+
+    def test_close_only_closes_channel(self):
+        first = mock.Mock()
+        self.shared.adopt(first)
+        self.shared.open(self.ncclient, timeout=10)
+
+        first._session.close()
+        first._session.close()
+        first._session._channel.close.assert_called_once_with()
+        self.assertFalse(self.transport.close.called)
+
+        self.ncclient.Manager.return_value._session.close()
+        self.transport.close.assert_called_once_with()
+
+    def test_failed_channel_is_closed(self):
+        session = self.ncclient_transport.SSHSession.return_value
+        session._post_connect.side_effect = IOError('no hello')
+
+        self.assertRaises(IOError, self.shared.open, self.ncclient, 10)
+        channel = self.transport.open_session.return_value
+        channel.close.assert_called_once_with()
+        self.assertEqual(self.shared.channels, 0)
+
+
+class TestDriverChannels(unittest.TestCase):
+
+    def setUp(self):
+        config.cfg.CONF.set_override('netconf_channels_per_transport', 4,
+                                     group='ironic')
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'netconf_channels_per_transport', group='ironic')
+
+        self.ncclient_manager = mock.Mock()
+        mock.patch.object(driver.CiscoDriver, '_import_ncclient',
+                          return_value=self.ncclient_manager).start()
+        self.addCleanup(mock.patch.stopall)
+
+        self.driver = driver.CiscoDriver()
+        self.port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1')
+
+    def test_sessions_share_one_connection(self):
+        with mock.patch.object(channels.SharedTransport, 'open') as open:
+            p = self.driver._get_pool(self.port)
+            sessions = [p.get() for i in range(3)]
+
+        self.assertEqual(self.ncclient_manager.connect.call_count, 1)
+        self.assertEqual(open.call_count, 2)
+        self.assertEqual(sessions[0],
+                         self.ncclient_manager.connect.return_value)
+
+    def test_falls_back_to_connecting(self):
+        with mock.patch.object(channels.SharedTransport, 'open',
+                               side_effect=Exception('channel refused')):
+            p = self.driver._get_pool(self.port)
+            p.get()
+            p.get()
+
+        self.assertEqual(self.ncclient_manager.connect.call_count, 2)
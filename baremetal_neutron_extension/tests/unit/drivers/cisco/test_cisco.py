@@ -15,20 +15,59 @@
 # limitations under the License.
 
 import eventlet
+from eventlet import event
 import mock
 
+import threading
+import time
 import unittest
 import xml.etree.ElementTree as ET
 
+from baremetal_neutron_extension import config
 from baremetal_neutron_extension.drivers import base as base_driver
+from baremetal_neutron_extension.drivers.cisco import commands
 from baremetal_neutron_extension.drivers.cisco import driver
 from baremetal_neutron_extension.tests.unit.drivers.cisco import fixtures
 
 
-class FakeNcClientResponse(object):
+class FakeNcClientReply(object):
+    """An ncclient reply."""
 
     def __init__(self, data):
         self._root = ET.fromstring(data)
+        self.xml = data
+        self._error = None
+
+    @property
+    def error(self):
+        # as in ncclient, looking at the error parses the reply
+        self.parse()
+        return self._error
+
+    def parse(self):
+        for elem in self._root.iter():
+            if elem.tag.endswith('error-message'):
+                self._error = Exception(elem.text)
+
+
+class FakeNcClientResponse(object):
+    """An ncclient RPC sent in async mode, already answered."""
+
+    def __init__(self, data):
+        self.reply = FakeNcClientReply(data)
+        self.error = None
+        self.event = threading.Event()
+        self.event.set()
+
+
+class FakeRpc(object):
+    """An ncclient RPC sent in async mode, answered after latency."""
+
+    def __init__(self, data, latency=0):
+        self.reply = FakeNcClientReply(data)
+        self.error = None
+        self.event = threading.Event()
+        threading.Timer(latency, self.event.set).start()
 
 
 class TestCiscoDriver(unittest.TestCase):
@@ -44,8 +83,8 @@ class TestCiscoDriver(unittest.TestCase):
                           '_import_ncclient',
                           return_value=self.ncclient_manager).start()
 
-        self.driver = driver.CiscoDriver(save_queue_max_age=0,
-                                         save_queue_get_wait=0)
+        self.driver = driver.CiscoDriver(save_quiet_period=0,
+                                         save_max_delay=0)
 
     def _get_called_commands(self, pos=0):
         return self.ncclient.command.call_args_list[pos][0][0]
@@ -68,6 +107,7 @@ class TestCiscoDriver(unittest.TestCase):
             mac_address='ff:ff:ff:ff:ff:ff',
             trunked=True)
 
+        self.driver._mark_dirty(port)
         self.driver.save(port)
         eventlet.sleep(0)
 
@@ -78,6 +118,113 @@ class TestCiscoDriver(unittest.TestCase):
 
         self.assertEqual(save_cmd, save_expected)
 
+    def test_save_skips_clean_switch(self):
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        self.driver.save(port)
+        eventlet.sleep(0)
+
+        self.assertEqual(self.ncclient.command.call_count, 0)
+
+    def test_save_only_once_per_change(self):
+
+        self.ncclient.command.side_effect = [
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        self.driver._mark_dirty(port)
+        self.driver.save(port)
+        eventlet.sleep(0)
+        self.assertFalse(self.driver.is_dirty(port))
+
+        # nothing changed since the last save
+        self.driver.save(port)
+        eventlet.sleep(0)
+
+        self.assertEqual(self.ncclient.command.call_count, 1)
+
+    def test_save_runs_on_own_session_without_lock(self):
+
+        self.ncclient.command.side_effect = [
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        with mock.patch.object(driver.lockutils, 'lock') as lock:
+            self.driver._mark_dirty(port)
+            self.driver.save(port, async=False)
+
+        self.assertFalse(lock.called)
+        self.assertEqual(self.ncclient.command.call_count, 1)
+        self.assertEqual(self.driver.save_pools.keys(), ['switch1.host.com'])
+        self.assertEqual(self.driver.pools, {})
+
+    def test_save_waits_for_changes_in_flight(self):
+        calls = []
+
+        def _command(cmds):
+            calls.append(cmds[-1])
+            if cmds[-1] == 'shutdown':
+                eventlet.sleep(.02)
+            return FakeNcClientResponse(fixtures.ok())
+
+        self.ncclient.command.side_effect = _command
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        change = eventlet.spawn(self.driver._run_commands, port,
+                                ['configure terminal', 'shutdown'])
+        eventlet.sleep(0)
+        self.driver.save(port, async=False)
+        change.wait()
+
+        # the save waited for the change to land before copying config
+        self.assertEqual(calls, ['shutdown',
+                                 'copy running-config startup-config'])
+        self.assertFalse(self.driver.is_dirty(port))
+
     def test_save_combines_same_host(self):
 
         self.ncclient.command.side_effect = [
@@ -85,8 +232,8 @@ class TestCiscoDriver(unittest.TestCase):
             FakeNcClientResponse(fixtures.ok())
         ]
 
-        self.driver = driver.CiscoDriver(save_queue_max_age=.01,
-                                         save_queue_get_wait=0)
+        self.driver = driver.CiscoDriver(save_quiet_period=.01,
+                                         save_max_delay=.05)
 
         port = base_driver.PortInfo(
             switch_host='switch1.host.com',
@@ -99,7 +246,9 @@ class TestCiscoDriver(unittest.TestCase):
             mac_address='ff:ff:ff:ff:ff:ff',
             trunked=True)
 
+        self.driver._mark_dirty(port)
         self.driver.save(port)
+        self.driver._mark_dirty(port)
         self.driver.save(port)
         eventlet.sleep(.02)
 
@@ -117,8 +266,8 @@ class TestCiscoDriver(unittest.TestCase):
             FakeNcClientResponse(fixtures.ok())
         ]
 
-        self.driver = driver.CiscoDriver(save_queue_max_age=.01,
-                                         save_queue_get_wait=0)
+        self.driver = driver.CiscoDriver(save_quiet_period=.01,
+                                         save_max_delay=.05)
 
         port = base_driver.PortInfo(
             switch_host='switch1.host.com',
@@ -142,6 +291,8 @@ class TestCiscoDriver(unittest.TestCase):
             mac_address='ff:ff:ff:ff:ff:ff',
             trunked=True)
 
+        self.driver._mark_dirty(port)
+        self.driver._mark_dirty(port2)
         self.driver.save(port)
         self.driver.save(port2)
         eventlet.sleep(.02)
@@ -175,6 +326,7 @@ class TestCiscoDriver(unittest.TestCase):
             mac_address='ff:ff:ff:ff:ff:ff',
             trunked=True)
 
+        self.driver._mark_dirty(port)
         self.driver.save(port)
         eventlet.sleep(.02)
 
@@ -206,6 +358,7 @@ class TestCiscoDriver(unittest.TestCase):
             mac_address='ff:ff:ff:ff:ff:ff',
             trunked=True)
 
+        self.driver._mark_dirty(port)
         eventlet.spawn(self.driver.save, port).wait()
         eventlet.sleep(.02)
 
@@ -274,7 +427,6 @@ class TestCiscoDriver(unittest.TestCase):
             'no interface port-channel 1',
             'configure terminal',
             'default interface ethernet 1/1',
-            'configure terminal',
             'interface ethernet 1/1',
             'shutdown'
         ]
@@ -287,7 +439,6 @@ class TestCiscoDriver(unittest.TestCase):
             ('ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff '
              'vlan 1 interface port-channel1'),
 
-            'configure terminal',
             'interface ethernet 1/1',
             'channel-group 1 mode active',
             'spanning-tree bpduguard enable',
@@ -295,7 +446,6 @@ class TestCiscoDriver(unittest.TestCase):
             'no cdp enable',
             'no shutdown',
 
-            'configure terminal',
             'interface port-channel 1',
             'description CUSThardware1-host',
             'switchport mode trunk',
@@ -372,7 +522,6 @@ class TestCiscoDriver(unittest.TestCase):
             'no interface port-channel 1',
             'configure terminal',
             'default interface ethernet 1/1',
-            'configure terminal',
             'interface ethernet 1/1',
             'shutdown'
         ]
@@ -400,12 +549,18 @@ class TestCiscoDriver(unittest.TestCase):
         self.assertEqual(create_port_cmd, create_port_expected)
         self.assertEqual(save_cmd, save_expected)
 
-    def test_attach(self):
+    def test_create_incremental(self):
+        self.driver.incremental_create = True
+
         self.ncclient.command.side_effect = [
-            # run attach commands
+            # read running config
+            FakeNcClientResponse(fixtures.ok()),
+            FakeNcClientResponse(fixtures.show_ethernet_config_access(1)),
+            Exception('Syntax error while parsing interface port-channel1'),
+            # run the difference
+            FakeNcClientResponse(fixtures.ok()),
+            # run save commands
             FakeNcClientResponse(fixtures.ok()),
-            # save commands
-            FakeNcClientResponse(fixtures.ok())
         ]
 
         port = base_driver.PortInfo(
@@ -417,40 +572,41 @@ class TestCiscoDriver(unittest.TestCase):
             vlan_id=1,
             ip='10.0.0.2',
             mac_address='ff:ff:ff:ff:ff:ff',
-            trunked=True)
-
-        eventlet.spawn(self.driver.attach, port).wait()
-
-        self.assertEqual(self.ncclient.command.call_count, 2)
-        attach_cmd = self._get_called_commands(0)
-        save_cmd = self._get_called_commands(1)
+            trunked=False)
 
-        attach_expected = [
-            'configure terminal',
-            'interface port-channel 1',
+        eventlet.spawn(self.driver.create, port).wait()
 
-            'configure terminal',
-            ('ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff '
-             'vlan 1 interface port-channel1'),
+        self.assertEqual(self.ncclient.command.call_count, 5)
+        update_port_cmd = self._get_called_commands(3)
+        save_cmd = self._get_called_commands(4)
 
+        update_port_expected = [
             'configure terminal',
-            'interface port-channel 1',
-            'switchport trunk allowed vlan add 1',
+            'interface ethernet 1/1',
+            'description CUSThardware1-host',
+            'switchport access vlan 1',
         ]
 
         save_expected = ['copy running-config startup-config']
 
-        self.assertEqual(attach_cmd, attach_expected)
+        self.assertEqual(update_port_cmd, update_port_expected)
         self.assertEqual(save_cmd, save_expected)
 
-    def test_detach(self):
+    def test_create_incremental_falls_back(self):
+        self.driver.incremental_create = True
+
         self.ncclient.command.side_effect = [
-            # run detach commands
+            # read running config, which has a port-channel we'd delete
+            FakeNcClientResponse(fixtures.show_dhcp(1)),
+            FakeNcClientResponse(fixtures.show_ethernet_config_trunked(1)),
+            FakeNcClientResponse(fixtures.show_port_channel_config_trunked(1)),
+            # full clear and create
+            FakeNcClientResponse(fixtures.show_dhcp(1)),
             FakeNcClientResponse(fixtures.ok()),
-            # run remove ip binding commands
             FakeNcClientResponse(fixtures.ok()),
-            # save commands
-            FakeNcClientResponse(fixtures.ok())
+            FakeNcClientResponse(fixtures.ok()),
+            # run save commands
+            FakeNcClientResponse(fixtures.ok()),
         ]
 
         port = base_driver.PortInfo(
@@ -462,45 +618,24 @@ class TestCiscoDriver(unittest.TestCase):
             vlan_id=1,
             ip='10.0.0.2',
             mac_address='ff:ff:ff:ff:ff:ff',
-            trunked=True)
-
-        eventlet.spawn(self.driver.detach, port).wait()
-
-        self.assertEqual(self.ncclient.command.call_count, 3)
-        detach_cmd = self._get_called_commands(0)
-        remove_binding_cmd = self._get_called_commands(1)
-        save_cmd = self._get_called_commands(2)
-
-        detach_expected = [
-            'configure terminal',
-            'interface port-channel 1',
-            'switchport trunk allowed vlan remove 1'
-        ]
+            trunked=False)
 
-        remove_binding_cmd = [
-            'configure terminal',
-            'interface port-channel 1',
-            'configure terminal',
-            ('no ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff '
-             'vlan 1 interface port-channel1')
-        ]
+        eventlet.spawn(self.driver.create, port).wait()
 
-        save_expected = ['copy running-config startup-config']
+        self.assertEqual(self.ncclient.command.call_count, 8)
+        self.assertEqual(self._get_called_commands(5)[-1], 'shutdown')
+        self.assertEqual(self._get_called_commands(6)[-1], 'no shutdown')
 
-        self.assertEqual(detach_cmd, detach_expected)
-        self.assertEqual(remove_binding_cmd, remove_binding_cmd)
-        self.assertEqual(save_cmd, save_expected)
+    def test_create_fused(self):
+        self.driver.fused_commands = True
 
-    def test_delete(self):
         self.ncclient.command.side_effect = [
             # list dhcp bindings to clear
             FakeNcClientResponse(fixtures.show_dhcp(1)),
-            # run remove dhcp binding commands
+            # clear and create in one go
             FakeNcClientResponse(fixtures.ok()),
-            # run clear commands
+            # run save commands
             FakeNcClientResponse(fixtures.ok()),
-            # save commands
-            FakeNcClientResponse(fixtures.ok())
         ]
 
         port = base_driver.PortInfo(
@@ -514,47 +649,36 @@ class TestCiscoDriver(unittest.TestCase):
             mac_address='ff:ff:ff:ff:ff:ff',
             trunked=True)
 
-        eventlet.spawn(self.driver.delete, port).wait()
-
-        self.assertEqual(self.ncclient.command.call_count, 4)
-        show_bindings_cmd = self._get_called_commands(0)
-        remove_bindings_cmd = self._get_called_commands(1)
-        clear_port_cmd = self._get_called_commands(2)
-        save_cmd = self._get_called_commands(3)
+        eventlet.spawn(self.driver.create, port).wait()
 
-        show_bindings_expected = ['show running dhcp | egrep port-channel1$']
+        self.assertEqual(self.ncclient.command.call_count, 3)
+        fused_cmd = self._get_called_commands(1)
 
-        remove_bindings_expected = [
+        self.assertEqual(fused_cmd[:4], [
             'configure terminal',
             'interface port-channel 1',
             ('no ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
-             'vlan 1 interface port-channel1')
-        ]
-
-        clear_port_expected = [
-            'configure terminal',
-            'interface port-channel 1',
+             'vlan 1 interface port-channel1'),
             'no ip verify source dhcp-snooping-vlan',
-            'no interface port-channel 1',
-            'configure terminal',
-            'default interface ethernet 1/1',
-            'configure terminal',
-            'interface ethernet 1/1',
-            'shutdown'
-        ]
-
-        save_expected = ['copy running-config startup-config']
+        ])
+        self.assertEqual(fused_cmd[-1], 'vpc 1')
+        self.assertEqual(self._get_called_commands(2),
+                         ['copy running-config startup-config'])
 
-        self.assertEqual(show_bindings_cmd, show_bindings_expected)
-        self.assertEqual(remove_bindings_cmd, remove_bindings_expected)
-        self.assertEqual(clear_port_cmd, clear_port_expected)
-        self.assertEqual(save_cmd, save_expected)
+    def test_create_fused_skips_tolerated_errors(self):
+        self.driver.fused_commands = True
 
-    def test_running_config_trunked(self):
         self.ncclient.command.side_effect = [
+            # list dhcp bindings to clear
             FakeNcClientResponse(fixtures.show_dhcp(1)),
-            FakeNcClientResponse(fixtures.show_ethernet_config_trunked(1)),
-            FakeNcClientResponse(fixtures.show_port_channel_config_trunked(1))
+            # the binding is already gone, and the switch says which
+            Exception('ERROR: no ip source binding 10.0.0.1 '
+                      'FFFF.FFFF.FFFF.FFFF vlan 1 interface port-channel1: '
+                      'Entry does not exist'),
+            # the rest of the commands
+            FakeNcClientResponse(fixtures.ok()),
+            # run save commands
+            FakeNcClientResponse(fixtures.ok()),
         ]
 
         port = base_driver.PortInfo(
@@ -568,47 +692,30 @@ class TestCiscoDriver(unittest.TestCase):
             mac_address='ff:ff:ff:ff:ff:ff',
             trunked=True)
 
-        res = self.driver.running_config(port)
-        expected_res = {
-            'switch': {
-                'interface': 'eth1/1',
-                'hostname': 'switch1.host.com'
-            },
-            'running-config': {
-                'dhcp': [
-                    ('ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
-                     'vlan 1 interface port-channel1')
-                ],
-                'port-channel': [
-                    ('description '
-                     'CUST39a8365c-3b84-4169-bc1a-1efa3ab20e04-host'),
-                    'switchport mode trunk',
-                    'switchport trunk allowed vlan 1,2',
-                    'ip verify source dhcp-snooping-vlan',
-                    'spanning-tree port type edge trunk',
-                    'no negotiate auto',
-                    'vpc 1'
-                ],
-                'ethernet': [
-                    ('description '
-                     'CUST39a8365c-3b84-4169-bc1a-1efa3ab20e04-host'),
-                    'no lldp transmit',
-                    'switchport mode trunk',
-                    'switchport trunk allowed vlan 1,2',
-                    'spanning-tree port type edge trunk',
-                    'spanning-tree bpduguard enable',
-                    'channel-group 1 mode active'
-                ]
-            }
-        }
-        self.assertEqual(self.ncclient.command.call_count, 3)
-        self.assertEqual(res, expected_res)
+        eventlet.spawn(self.driver.create, port).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 4)
+        fused_cmd = self._get_called_commands(1)
+        resumed_cmd = self._get_called_commands(2)
+
+        # picks up after the failed line, in the same interface
+        self.assertEqual(resumed_cmd, [
+            'configure terminal',
+            'interface port-channel 1'
+        ] + fused_cmd[3:])
+
+    def test_detach_fused(self):
+        self.driver.fused_commands = True
 
-    def test_running_config_access(self):
         self.ncclient.command.side_effect = [
-            FakeNcClientResponse(fixtures.show_dhcp(1)),
-            FakeNcClientResponse(fixtures.show_ethernet_config_trunked(1)),
-            Exception('Syntax Error')
+            # the binding is already gone
+            Exception('ERROR: Entry does not exist'),
+            # the error doesn't say which line failed, so the vlan...
+            FakeNcClientResponse(fixtures.ok()),
+            # ...and the binding go out on their own
+            Exception('ERROR: Entry does not exist'),
+            # run save commands
+            FakeNcClientResponse(fixtures.ok()),
         ]
 
         port = base_driver.PortInfo(
@@ -622,7 +729,754 @@ class TestCiscoDriver(unittest.TestCase):
             mac_address='ff:ff:ff:ff:ff:ff',
             trunked=True)
 
-        res = self.driver.running_config(port)
+        eventlet.spawn(self.driver.detach, port).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 4)
+        self.assertEqual(self._get_called_commands(0), [
+            'configure terminal',
+            'interface port-channel 1',
+            'switchport trunk allowed vlan remove 1',
+            'configure terminal',
+            ('no ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff '
+             'vlan 1 interface port-channel1'),
+        ])
+        self.assertEqual(self._get_called_commands(1), [
+            'configure terminal',
+            'interface port-channel 1',
+            'switchport trunk allowed vlan remove 1',
+        ])
+        self.assertEqual(self._get_called_commands(2), [
+            'configure terminal',
+            ('no ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff '
+             'vlan 1 interface port-channel1'),
+        ])
+
+    def test_detach_fused_other_line_fails(self):
+        self.driver.fused_commands = True
+
+        self.ncclient.command.side_effect = [
+            # fails with a tolerated category, but not on the binding
+            Exception('ERROR: VLAN does not exist'),
+            # the vlan alone
+            Exception('ERROR: VLAN does not exist'),
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        self.assertRaises(driver.CiscoException,
+                          eventlet.spawn(self.driver.detach, port).wait)
+
+        # the binding is left for the retry, and nothing is saved
+        self.assertEqual(self.ncclient.command.call_count, 2)
+        self.assertEqual(self._get_called_commands(1)[-1],
+                         'switchport trunk allowed vlan remove 1')
+
+    def test_attach(self):
+        self.ncclient.command.side_effect = [
+            # run attach commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        eventlet.spawn(self.driver.attach, port).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 2)
+        attach_cmd = self._get_called_commands(0)
+        save_cmd = self._get_called_commands(1)
+
+        attach_expected = [
+            'configure terminal',
+            'interface port-channel 1',
+
+            'configure terminal',
+            ('ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff '
+             'vlan 1 interface port-channel1'),
+
+            'interface port-channel 1',
+            'switchport trunk allowed vlan add 1',
+        ]
+
+        save_expected = ['copy running-config startup-config']
+
+        self.assertEqual(attach_cmd, attach_expected)
+        self.assertEqual(save_cmd, save_expected)
+
+    def test_attach_access_does_not_save(self):
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=False)
+
+        eventlet.spawn(self.driver.attach, port).wait()
+
+        # there are no commands for access ports, so nothing to save
+        self.assertEqual(self.ncclient.command.call_count, 0)
+
+    def _spawn_concurrently(self, make_commands, ports):
+        config.cfg.CONF.set_override('command_batch_window', .01,
+                                     group='ironic')
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'command_batch_window', 'ironic')
+
+        return [eventlet.spawn(self.driver._run_commands, port,
+                               make_commands(
+                                   interface=port.interface,
+                                   vlan_id=port.vlan_id,
+                                   ip=port.ip,
+                                   mac_address=port.mac_address,
+                                   trunked=port.trunked))
+                for port in ports]
+
+    def test_batches_concurrent_changes(self):
+        self.ncclient.command.return_value = FakeNcClientResponse(
+            fixtures.ok())
+
+        for t in self._spawn_concurrently(commands.remove_vlan,
+                                          self._rack(2)):
+            t.wait()
+
+        # both changes went out in a single rpc
+        self.assertEqual(self.ncclient.command.call_count, 1)
+        batch_cmd = self._get_called_commands(0)
+        self.assertEqual(batch_cmd[-1],
+                         'switchport trunk allowed vlan remove 1')
+        self.assertTrue('interface port-channel 2' in batch_cmd)
+
+    def test_bindings_not_batched(self):
+        self.ncclient.command.return_value = FakeNcClientResponse(
+            fixtures.ok())
+
+        # a binding can't be added twice, so a failed batch couldn't
+        # send it again
+        for t in self._spawn_concurrently(commands.add_vlan, self._rack(2)):
+            t.wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 2)
+        self.assertEqual(self.driver.batchers, {})
+
+    def test_batch_breaker_counts_rpcs(self):
+        # the batch, then each list again on its own
+        self.ncclient.command.side_effect = Exception(
+            'Could not open socket to switch1.host.com:22')
+
+        for t in self._spawn_concurrently(commands.remove_vlan,
+                                          self._rack(2)):
+            self.assertRaises(driver.CiscoException, t.wait)
+
+        # one failure for each of the three rpcs, not each of two callers
+        self.assertEqual(self.ncclient.command.call_count, 3)
+        self.assertEqual(
+            self.driver.circuit_status()['switch1.host.com']['failures'], 3)
+
+    def test_circuit_breaker_ignores_switch_errors(self):
+        # an rpc-error we can't categorize, which the switch still sent
+        err = Exception('ERROR: VLAN 4095 is reserved')
+        err.tag = 'operation-failed'
+        self.ncclient.command.side_effect = err
+
+        for i in range(4):
+            self.assertRaises(driver.CiscoException,
+                              self.driver.show_interface, self._port(1))
+
+        self.assertEqual(self.ncclient.command.call_count, 4)
+        self.assertEqual(
+            self.driver.circuit_status()['switch1.host.com']['state'],
+            'closed')
+
+    def test_attach_vlans(self):
+        self.ncclient.command.side_effect = [
+            # run attach commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        ports = [base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=vlan_id,
+            ip='10.0.%d.2' % (vlan_id),
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True) for vlan_id in (101, 102, 103, 201)]
+
+        eventlet.spawn(self.driver.attach_vlans, ports).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 2)
+        attach_cmd = self._get_called_commands(0)
+
+        self.assertEqual(attach_cmd[-1],
+                         'switchport trunk allowed vlan add 101-103,201')
+        self.assertEqual(len([c for c in attach_cmd
+                              if c.startswith('ip source binding')]), 4)
+
+    def test_attach_vlans_needs_one_switchport(self):
+        ports = [base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface=interface,
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True) for interface in ('eth1/1', 'eth1/2')]
+
+        self.assertRaises(driver.CiscoException,
+                          self.driver.attach_vlans, ports)
+
+    def test_detach_vlans_binding_already_gone(self):
+        # not configured to be tolerated, but a binding that's gone is
+        # still fine
+        self.driver.tolerated_errors = []
+
+        self.ncclient.command.side_effect = [
+            # run detach commands
+            FakeNcClientResponse(fixtures.ok()),
+            # the first binding is already gone
+            Exception('ERROR: Entry does not exist'),
+            # each binding on its own
+            Exception('ERROR: Entry does not exist'),
+            FakeNcClientResponse(fixtures.ok()),
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        ports = [base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=vlan_id,
+            ip='10.0.%d.2' % (vlan_id),
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True) for vlan_id in (101, 102, 103)]
+
+        eventlet.spawn(self.driver.detach_vlans, ports).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 6)
+        self.assertEqual(self._get_called_commands(0)[-1],
+                         'switchport trunk allowed vlan remove 101-103')
+
+        # the error doesn't say which binding is gone, so each one is
+        # sent on its own
+        def _bindings(cmds):
+            return [c for c in cmds if c.startswith('no ip source binding')]
+        unbind_cmd = self._get_called_commands(1)
+        self.assertEqual(len(_bindings(unbind_cmd)), 3)
+        self.assertEqual([_bindings(self._get_called_commands(i))
+                          for i in (2, 3, 4)],
+                         [[c] for c in _bindings(unbind_cmd)])
+
+    def test_detach_vlans_unbind_error_raises(self):
+        self.ncclient.command.side_effect = [
+            # run detach commands
+            FakeNcClientResponse(fixtures.ok()),
+            Exception('ERROR: Invalid range'),
+        ]
+
+        ports = [base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=vlan_id,
+            ip='10.0.%d.2' % (vlan_id),
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True) for vlan_id in (101, 102)]
+
+        self.assertRaises(driver.CiscoException,
+                          self.driver.detach_vlans, ports)
+
+    def _rack(self, count, trunked=True):
+        return [base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/%d' % (i),
+            hardware_id='hardware%d' % (i),
+            vlan_id=1,
+            ip='10.0.0.%d' % (i),
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=trunked) for i in range(1, count + 1)]
+
+    def test_attach_ports(self):
+        self.ncclient.command.side_effect = [
+            # run attach commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        eventlet.spawn(self.driver.attach_ports, self._rack(30)).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 2)
+        attach_cmd = self._get_called_commands(0)
+
+        self.assertEqual(attach_cmd[-2:], [
+            'interface port-channel 1-30',
+            'switchport trunk allowed vlan add 1',
+        ])
+        self.assertEqual(len([c for c in attach_cmd
+                              if c.startswith('ip source binding')]), 30)
+
+    def test_attach_ports_locks_every_interface(self):
+        gate = event.Event()
+        sent = []
+
+        def _command(cmds):
+            sent.append(cmds)
+            if len(sent) == 1:
+                gate.wait()
+            return FakeNcClientResponse(fixtures.ok())
+
+        self.ncclient.command.side_effect = _command
+        ports = self._rack(3)
+
+        bulk = eventlet.spawn(self.driver.attach_ports, ports)
+        eventlet.sleep(0)
+        single = eventlet.spawn(self.driver.attach, ports[1])
+        eventlet.sleep(.01)
+
+        # the single-port attach waits for the bulk one's lock on eth1/2
+        self.assertEqual(len(sent), 1)
+
+        gate.send()
+        bulk.wait()
+        single.wait()
+        self.assertEqual(sent[1][-1], 'switchport trunk allowed vlan add 1')
+        self.assertEqual(sent[1][-2], 'interface port-channel 2')
+
+    def test_attach_ports_needs_one_switch(self):
+        ports = self._rack(2)
+        ports[1].switch_host = 'switch2.host.com'
+
+        self.assertRaises(driver.CiscoException,
+                          self.driver.attach_ports, ports)
+
+    def test_detach_ports(self):
+        self.ncclient.command.side_effect = [
+            # run detach and remove ip binding commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        eventlet.spawn(self.driver.detach_ports, self._rack(3)).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 2)
+        detach_cmd = self._get_called_commands(0)
+
+        self.assertEqual(detach_cmd[:3], [
+            'configure terminal',
+            'interface port-channel 1-3',
+            'switchport trunk allowed vlan remove 1',
+        ])
+        self.assertEqual(len([c for c in detach_cmd
+                              if c.startswith('no ip source binding')]), 3)
+
+    def test_detach_ports_binding_already_gone(self):
+        self.driver.tolerated_errors = []
+
+        self.ncclient.command.side_effect = [
+            # a binding is already gone
+            Exception('ERROR: Entry does not exist'),
+            # the vlans, then each binding on its own
+            FakeNcClientResponse(fixtures.ok()),
+            Exception('ERROR: Entry does not exist'),
+            FakeNcClientResponse(fixtures.ok()),
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        eventlet.spawn(self.driver.detach_ports, self._rack(3)).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 6)
+
+    def test_delete_ports_binding_already_gone(self):
+        self.driver.tolerated_errors = []
+
+        self.ncclient.command.side_effect = [
+            # list dhcp bindings to clear
+            FakeNcClientResponse(fixtures.show_dhcp(1)),
+            # the binding is already gone
+            Exception('ERROR: Entry does not exist'),
+            # the binding on its own
+            Exception('ERROR: Entry does not exist'),
+            # the rest of the commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        eventlet.spawn(self.driver.delete_ports, self._rack(4)).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 5)
+        self.assertTrue('no interface port-channel 1-4' in
+                        self._get_called_commands(3))
+
+    def test_delete_ports(self):
+        self.ncclient.command.side_effect = [
+            # list dhcp bindings to clear
+            FakeNcClientResponse(fixtures.show_dhcp(1)),
+            # run remove dhcp binding and clear commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        eventlet.spawn(self.driver.delete_ports, self._rack(4)).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 3)
+        show_bindings_cmd = self._get_called_commands(0)
+        clear_cmd = self._get_called_commands(1)
+
+        self.assertEqual(show_bindings_cmd,
+                         ['show running dhcp | include "ip source binding"'])
+        self.assertEqual(clear_cmd[:3], [
+            'configure terminal',
+            'interface port-channel 1',
+            ('no ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
+             'vlan 1 interface port-channel1'),
+        ])
+        self.assertTrue('no interface port-channel 1-4' in clear_cmd)
+        self.assertTrue('default interface ethernet 1/1-4' in clear_cmd)
+
+    def test_detach(self):
+        self.ncclient.command.side_effect = [
+            # run detach commands
+            FakeNcClientResponse(fixtures.ok()),
+            # run remove ip binding commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        eventlet.spawn(self.driver.detach, port).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 3)
+        detach_cmd = self._get_called_commands(0)
+        remove_binding_cmd = self._get_called_commands(1)
+        save_cmd = self._get_called_commands(2)
+
+        detach_expected = [
+            'configure terminal',
+            'interface port-channel 1',
+            'switchport trunk allowed vlan remove 1'
+        ]
+
+        remove_binding_cmd = [
+            'configure terminal',
+            'interface port-channel 1',
+            'configure terminal',
+            ('no ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff '
+             'vlan 1 interface port-channel1')
+        ]
+
+        save_expected = ['copy running-config startup-config']
+
+        self.assertEqual(detach_cmd, detach_expected)
+        self.assertEqual(remove_binding_cmd, remove_binding_cmd)
+        self.assertEqual(save_cmd, save_expected)
+
+    def test_detach_fails_on_unexpected_unbind_error(self):
+        self.ncclient.command.side_effect = [
+            # run detach commands
+            FakeNcClientResponse(fixtures.ok()),
+            # run remove ip binding commands
+            Exception('Syntax error while parsing ip source binding'),
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        self.assertRaises(driver.CiscoException, self.driver.detach, port)
+
+    def test_delete(self):
+        self.ncclient.command.side_effect = [
+            # list dhcp bindings to clear
+            FakeNcClientResponse(fixtures.show_dhcp(1)),
+            # run remove dhcp binding commands
+            FakeNcClientResponse(fixtures.ok()),
+            # run clear commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok())
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        eventlet.spawn(self.driver.delete, port).wait()
+
+        self.assertEqual(self.ncclient.command.call_count, 4)
+        show_bindings_cmd = self._get_called_commands(0)
+        remove_bindings_cmd = self._get_called_commands(1)
+        clear_port_cmd = self._get_called_commands(2)
+        save_cmd = self._get_called_commands(3)
+
+        show_bindings_expected = ['show running dhcp | egrep port-channel1$']
+
+        remove_bindings_expected = [
+            'configure terminal',
+            'interface port-channel 1',
+            ('no ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
+             'vlan 1 interface port-channel1')
+        ]
+
+        clear_port_expected = [
+            'configure terminal',
+            'interface port-channel 1',
+            'no ip verify source dhcp-snooping-vlan',
+            'no interface port-channel 1',
+            'configure terminal',
+            'default interface ethernet 1/1',
+            'interface ethernet 1/1',
+            'shutdown'
+        ]
+
+        save_expected = ['copy running-config startup-config']
+
+        self.assertEqual(show_bindings_cmd, show_bindings_expected)
+        self.assertEqual(remove_bindings_cmd, remove_bindings_expected)
+        self.assertEqual(clear_port_cmd, clear_port_expected)
+        self.assertEqual(save_cmd, save_expected)
+
+    def test_running_config_trunked(self):
+        self.ncclient.command.side_effect = [
+            FakeNcClientResponse(fixtures.show_dhcp(1)),
+            FakeNcClientResponse(fixtures.show_ethernet_config_trunked(1)),
+            FakeNcClientResponse(fixtures.show_port_channel_config_trunked(1))
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        res = self.driver.running_config(port)
+        expected_res = {
+            'switch': {
+                'interface': 'eth1/1',
+                'hostname': 'switch1.host.com'
+            },
+            'running-config': {
+                'dhcp': [
+                    ('ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
+                     'vlan 1 interface port-channel1')
+                ],
+                'port-channel': [
+                    ('description '
+                     'CUST39a8365c-3b84-4169-bc1a-1efa3ab20e04-host'),
+                    'switchport mode trunk',
+                    'switchport trunk allowed vlan 1,2',
+                    'ip verify source dhcp-snooping-vlan',
+                    'spanning-tree port type edge trunk',
+                    'no negotiate auto',
+                    'vpc 1'
+                ],
+                'ethernet': [
+                    ('description '
+                     'CUST39a8365c-3b84-4169-bc1a-1efa3ab20e04-host'),
+                    'no lldp transmit',
+                    'switchport mode trunk',
+                    'switchport trunk allowed vlan 1,2',
+                    'spanning-tree port type edge trunk',
+                    'spanning-tree bpduguard enable',
+                    'channel-group 1 mode active'
+                ]
+            }
+        }
+        self.assertEqual(self.ncclient.command.call_count, 3)
+        self.assertEqual(res, expected_res)
+
+    def _port(self, number):
+        return base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/%d' % (number),
+            hardware_id='hardware%d' % (number),
+            vlan_id=1,
+            ip='10.0.0.%d' % (number),
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+    def test_running_config_snapshot(self):
+        self.driver.snapshot_ttl = 60
+        self.ncclient.command.side_effect = [
+            FakeNcClientResponse(fixtures.show_running_config([1, 2]))
+        ]
+
+        res1 = self.driver.running_config(self._port(1))
+        res2 = self.driver.running_config(self._port(2))
+
+        self.assertEqual(self.ncclient.command.call_count, 1)
+        self.assertEqual(self._get_called_commands(0),
+                         ['show running-config'])
+
+        self.assertEqual(res1['running-config']['dhcp'], [
+            ('ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
+             'vlan 1 interface port-channel1')
+        ])
+        self.assertEqual(res2['running-config']['port-channel'][-1], 'vpc 2')
+        self.assertEqual(res2['running-config']['ethernet'][-1],
+                         'channel-group 2 mode active')
+
+    def test_running_config_snapshot_invalidated_on_write(self):
+        self.driver.snapshot_ttl = 60
+        self.ncclient.command.side_effect = [
+            FakeNcClientResponse(fixtures.show_running_config([1])),
+            # attach commands
+            FakeNcClientResponse(fixtures.ok()),
+            # save commands
+            FakeNcClientResponse(fixtures.ok()),
+            FakeNcClientResponse(fixtures.show_running_config([1])),
+        ]
+
+        self.driver.running_config(self._port(1))
+        self.driver.attach(self._port(1))
+        eventlet.sleep(0)
+        self.driver.running_config(self._port(1))
+
+        self.assertEqual(self.ncclient.command.call_count, 4)
+        self.assertEqual(self._get_called_commands(3),
+                         ['show running-config'])
+
+    def test_clear_uses_fresh_snapshot(self):
+        self.driver.snapshot_ttl = 60
+        self.ncclient.command.side_effect = [
+            FakeNcClientResponse(fixtures.show_running_config([1])),
+            # remove dhcp binding commands
+            FakeNcClientResponse(fixtures.ok()),
+            # clear commands
+            FakeNcClientResponse(fixtures.ok()),
+        ]
+
+        self.driver.running_config(self._port(1))
+        self.driver._clear(self._port(1))
+
+        self.assertEqual(self.ncclient.command.call_count, 3)
+        self.assertEqual(self._get_called_commands(1)[-1],
+                         ('no ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
+                          'vlan 1 interface port-channel1'))
+
+    def test_clear_uses_binding_index(self):
+        self.driver.binding_index.ttl = 60
+        self.ncclient.command.side_effect = [
+            # list all dhcp bindings, once
+            FakeNcClientResponse(fixtures.show_dhcp(1)),
+            # remove dhcp binding commands
+            FakeNcClientResponse(fixtures.ok()),
+            # clear commands
+            FakeNcClientResponse(fixtures.ok()),
+            # clear commands of the second port, nothing bound
+            FakeNcClientResponse(fixtures.ok()),
+            # clear commands of the first port again
+            FakeNcClientResponse(fixtures.ok()),
+        ]
+
+        self.driver._clear(self._port(1))
+        self.driver._clear(self._port(2))
+        self.driver._clear(self._port(1))
+
+        self.assertEqual(self.ncclient.command.call_count, 5)
+        self.assertEqual(self._get_called_commands(0),
+                         ['show running dhcp | include "ip source binding"'])
+        self.assertEqual(self._get_called_commands(1)[-1],
+                         ('no ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
+                          'vlan 1 interface port-channel1'))
+        # the binding removed by the first clear is gone from the index
+        self.assertEqual(self._get_called_commands(4)[1],
+                         'interface port-channel 1')
+        self.assertFalse([c for c in self._get_called_commands(4)
+                          if 'ip source binding' in c])
+
+    def test_running_config_access(self):
+        self.ncclient.command.side_effect = [
+            FakeNcClientResponse(fixtures.show_dhcp(1)),
+            FakeNcClientResponse(fixtures.show_ethernet_config_trunked(1)),
+            Exception('Syntax Error')
+        ]
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        res = self.driver.running_config(port)
         expected_res = {
             'switch': {
                 'interface': 'eth1/1',
@@ -686,3 +1540,196 @@ class TestCiscoDriver(unittest.TestCase):
         }
         self.assertEqual(self.ncclient.command.call_count, 2)
         self.assertEqual(res, expected_res)
+
+    def test_interface_status_bulk(self):
+        self.driver.status_ttl = 60
+        self.ncclient.command.side_effect = [
+            FakeNcClientResponse(fixtures.show_interfaces([1, 2, 3])),
+        ]
+
+        res = [self.driver.interface_status(self._port(i))
+               for i in (1, 2, 3)]
+
+        self.assertEqual(self.ncclient.command.call_count, 1)
+        self.assertEqual(self._get_called_commands(0), ['show interface'])
+        self.assertEqual(res[1]['interface-status'], {
+            'ethernet': {
+                'interface': 'Ethernet1/2',
+                'state': 'up'
+            },
+            'port-channel': {
+                'interface': 'port-channel2',
+                'state': 'up',
+                'vpc_status': 'vPC Status: Up, vPC number: 2'
+            }
+        })
+
+    def test_interface_status_bulk_expires(self):
+        self.driver.status_ttl = 60
+        self.ncclient.command.side_effect = [
+            FakeNcClientResponse(fixtures.show_interfaces([1])),
+            FakeNcClientResponse(fixtures.show_interfaces([1])),
+        ]
+
+        self.driver.interface_status(self._port(1))
+        self.driver.statuses['switch1.host.com']['fetched_at'] -= 60
+        self.driver.interface_status(self._port(1))
+
+        self.assertEqual(self.ncclient.command.call_count, 2)
+
+    def test_interface_status_bulk_waits_for_changes_in_flight(self):
+        self.driver.status_ttl = 60
+        gate = event.Event()
+        # don't leave the change holding its lock if the test fails
+        self.addCleanup(lambda: gate.ready() or gate.send())
+        calls = []
+
+        def _command(cmds):
+            calls.append(cmds[-1])
+            if cmds[-1] == 'shutdown':
+                gate.wait()
+                return FakeNcClientResponse(fixtures.ok())
+            return FakeNcClientResponse(fixtures.show_interfaces([1, 2]))
+
+        self.ncclient.command.side_effect = _command
+
+        change = eventlet.spawn(self.driver._run_commands, self._port(1),
+                                ['configure terminal', 'shutdown'])
+        eventlet.sleep(0)
+        status = eventlet.spawn(self.driver.interface_status, self._port(2))
+        eventlet.sleep(0)
+
+        # the show would race the change, so it waits for it
+        self.assertEqual(calls, ['shutdown'])
+
+        gate.send()
+        change.wait()
+        status.wait()
+        self.assertEqual(calls, ['shutdown', 'show interface'])
+
+    def test_replies_not_parsed(self):
+        self.driver.status_ttl = 60
+        rpc = FakeNcClientResponse(fixtures.show_interfaces([1, 2, 3]))
+        # as ncclient leaves the replies to async RPCs
+        reply = rpc.reply
+        reply._root = None
+        reply.parse = mock.Mock()
+        self.ncclient.command.side_effect = [rpc]
+
+        res = self.driver.interface_status(self._port(2))
+
+        self.assertFalse(reply.parse.called)
+        self.assertFalse(self.ncclient.async_mode)
+        self.assertEqual(res['interface-status']['ethernet']['interface'],
+                         'Ethernet1/2')
+
+    def test_reply_error_raises(self):
+        rpc = FakeNcClientResponse(fixtures.rpc_error('ERROR: Invalid range'))
+        reply = rpc.reply
+        reply.parse = mock.Mock(side_effect=reply.parse)
+        self.ncclient.command.side_effect = [rpc]
+
+        self.assertRaises(driver.CiscoException,
+                          self.driver.attach, self._port(1))
+        self.assertTrue(reply.parse.called)
+
+    def test_running_config_pipelined(self):
+        self.driver.pipelined_reads = True
+        self.ncclient.timeout = 1
+        sent = []
+
+        def _command(cmds):
+            sent.append(self.ncclient.async_mode)
+            return next(replies)
+
+        replies = iter([
+            FakeRpc(fixtures.show_ethernet_config_trunked(1), latency=.05),
+            FakeRpc(fixtures.rpc_error('ERROR: Invalid range'), latency=.05),
+            FakeRpc(fixtures.show_dhcp(1), latency=.05),
+        ])
+        self.ncclient.command.side_effect = _command
+
+        start = time.time()
+        res = self.driver.running_config(self._port(1))
+
+        # all three went out before waiting for any reply
+        self.assertTrue(time.time() - start < .1)
+        self.assertEqual(sent, [True, True, True])
+        self.assertFalse(self.ncclient.async_mode)
+
+        running_config = res['running-config']
+        self.assertEqual(running_config['ethernet'][-1],
+                         'channel-group 1 mode active')
+        self.assertEqual(running_config['port-channel'], ['no port-channel'])
+        self.assertEqual(len(running_config['dhcp']), 1)
+
+    def test_interface_status_pipelined(self):
+        self.driver.pipelined_reads = True
+        self.ncclient.timeout = 1
+        self.ncclient.command.side_effect = [
+            FakeRpc(fixtures.show_ethernet_status(1)),
+            FakeRpc(fixtures.show_port_channel_status(1)),
+        ]
+
+        res = self.driver.interface_status(self._port(1))
+
+        self.assertEqual(self.ncclient.command.call_count, 2)
+        self.assertEqual(res['interface-status']['port-channel']['vpc_status'],
+                         'vPC Status: Up, vPC number: 1')
+
+    def test_pipelined_ethernet_error_raises(self):
+        self.driver.pipelined_reads = True
+        self.ncclient.timeout = 1
+        self.ncclient.command.side_effect = [
+            FakeRpc(fixtures.rpc_error('ERROR: Invalid range')),
+            FakeRpc(fixtures.show_port_channel_status(1)),
+        ]
+
+        self.assertRaises(driver.CiscoException,
+                          self.driver.interface_status, self._port(1))
+
+    def test_pipelined_transient_error_retries(self):
+        self.driver.pipelined_reads = True
+        self.driver.retry_policy._sleep = mock.Mock()
+        self.ncclient.timeout = 1
+        self.ncclient.command.side_effect = [
+            FakeRpc(fixtures.show_ethernet_status(1)),
+            FakeRpc(fixtures.rpc_error('ERROR: authorization failed')),
+            FakeRpc(fixtures.show_ethernet_status(1)),
+            FakeRpc(fixtures.show_port_channel_status(1)),
+        ]
+
+        res = self.driver.interface_status(self._port(1))
+
+        # the whole pipeline went out again
+        self.assertEqual(self.ncclient.command.call_count, 4)
+        self.assertEqual(self.driver.retry_policy._sleep.call_count, 1)
+        self.assertEqual(res['interface-status']['port-channel']['vpc_status'],
+                         'vPC Status: Up, vPC number: 1')
+
+    def test_circuit_breaker_fails_fast(self):
+        self.ncclient_manager.connect.side_effect = Exception(
+            'Could not open socket to switch1.host.com:22')
+
+        port = base_driver.PortInfo(
+            switch_host='switch1.host.com',
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=1,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+        for i in range(3):
+            self.assertRaises(driver.CiscoException,
+                              self.driver.show_interface, port)
+        self.assertEqual(self.ncclient_manager.connect.call_count, 3)
+
+        self.assertRaises(driver.CiscoSwitchUnavailable,
+                          self.driver.show_interface, port)
+        self.assertEqual(self.ncclient_manager.connect.call_count, 3)
+        self.assertEqual(
+            self.driver.circuit_status()['switch1.host.com']['state'],
+            'open')
@@ -0,0 +1,292 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from baremetal_neutron_extension.drivers.cisco import commands
+
+
+def _simulate(cmds):
+    """Play commands against a toy switch, returning its config.
+
+    Each line lands in the interface context it was run in (or the
+    global config), and entering an interface creates it.
+    """
+    config = {}
+    current = None
+    for cmd in cmds:
+        if cmd == 'configure terminal':
+            current = 'global'
+        elif cmd.startswith('interface '):
+            current = cmd
+            config.setdefault(current, [])
+        elif cmd.startswith('no interface '):
+            config.pop(cmd[3:], None)
+            current = 'global'
+        elif cmd.startswith('default interface '):
+            config[cmd[8:]] = []
+            current = 'global'
+        else:
+            config.setdefault(current, []).append(cmd)
+    return config
+
+
+def _port_args(trunked):
+    return {
+        'interface': 'eth1/1',
+        'vlan_id': 1,
+        'ip': '10.0.0.2',
+        'mac_address': 'ff:ff:ff:ff:ff:ff',
+        'trunked': trunked
+    }
+
+
+def _builders():
+    builders = []
+    for trunked in (True, False):
+        args = _port_args(trunked)
+        builders.append(commands.create_port(hardware_id='hardware1',
+                                             **args))
+        builders.append(commands.add_vlan(**args))
+        builders.append(commands.remove_vlan(**args))
+        builders.append(commands.unbind_ip(**args))
+        vlans = [(101, '10.0.0.2', 'ff:ff:ff:ff:ff:ff'),
+                 (102, '10.0.1.2', 'ff:ff:ff:ff:ff:ff')]
+        builders.append(commands.add_vlans('eth1/1', vlans, trunked))
+        builders.append(commands.remove_vlans('eth1/1', vlans, trunked))
+        builders.append(commands.unbind_ips('eth1/1', vlans, trunked))
+    builders.append(commands._delete_port_channel_interface('1') +
+                    commands._delete_ethernet_interface('1/1'))
+    builders.append(commands._configure_interface('port-channel', '1') +
+                    commands._add_vpc('1'))
+    builders.append(commands.copy_running_config())
+    builders.append(commands.show_interface('ethernet', 'eth1/1'))
+    return builders
+
+
+class TestOptimize(unittest.TestCase):
+
+    def test_every_builder_is_equivalent(self):
+        for cmds in _builders():
+            optimized = commands.optimize(cmds)
+            self.assertEqual(_simulate(optimized), _simulate(cmds))
+            self.assertTrue(len(optimized) <= len(cmds))
+
+    def test_drops_redundant_configure(self):
+        cmds = (commands._configure_interface('ethernet', '1/1') +
+                ['shutdown'] +
+                commands._configure_interface('port-channel', '1') +
+                ['shutdown'])
+
+        self.assertEqual(commands.optimize(cmds), [
+            'configure terminal',
+            'interface ethernet 1/1',
+            'shutdown',
+            'interface port-channel 1',
+            'shutdown',
+        ])
+
+    def test_drops_repeated_interface(self):
+        cmds = (commands._configure_interface('port-channel', '1') +
+                commands._configure_interface('port-channel', '1') +
+                ['shutdown'])
+
+        self.assertEqual(commands.optimize(cmds), [
+            'configure terminal',
+            'interface port-channel 1',
+            'shutdown',
+        ])
+
+    def test_keeps_configure_before_global_commands(self):
+        cmds = commands.add_vlan(**_port_args(True))
+
+        self.assertEqual(commands.optimize(cmds), [
+            'configure terminal',
+            'interface port-channel 1',
+            'configure terminal',
+            ('ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff vlan 1 '
+             'interface port-channel1'),
+            'interface port-channel 1',
+            'switchport trunk allowed vlan add 1',
+        ])
+
+    def test_keeps_empty_interface_that_creates_it(self):
+        # entering the port-channel makes sure it exists
+        cmds = (commands._configure_interface('port-channel', '1') +
+                commands._configure() +
+                ['ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff vlan 1 '
+                 'interface port-channel1'])
+
+        self.assertEqual(commands.optimize(cmds), cmds)
+
+    def test_drops_empty_interface_that_exists(self):
+        cmds = (commands._configure_interface('port-channel', '1') +
+                ['shutdown'] +
+                commands._configure_interface('ethernet', '1/1') +
+                ['shutdown'] +
+                commands._configure_interface('port-channel', '1') +
+                commands._configure_interface('ethernet', '1/1') +
+                ['no shutdown'])
+
+        self.assertEqual(commands.optimize(cmds), [
+            'configure terminal',
+            'interface port-channel 1',
+            'shutdown',
+            'interface ethernet 1/1',
+            'shutdown',
+            'no shutdown',
+        ])
+
+    def test_recreates_deleted_interface(self):
+        cmds = (commands._delete_port_channel_interface('1') +
+                commands._configure_interface('port-channel', '1') +
+                commands._configure() +
+                ['ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff vlan 1 '
+                 'interface port-channel1'])
+
+        self.assertEqual(commands.optimize(cmds), [
+            'configure terminal',
+            'interface port-channel 1',
+            'no ip verify source dhcp-snooping-vlan',
+            'no interface port-channel 1',
+            'interface port-channel 1',
+            'configure terminal',
+            ('ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff vlan 1 '
+             'interface port-channel1'),
+        ])
+
+    def test_context(self):
+        cmds = (commands._configure_interface('port-channel', '1') +
+                ['shutdown'] +
+                commands._configure() +
+                ['ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff vlan 1 '
+                 'interface port-channel1'] +
+                commands._delete_ethernet_interface('1/1'))
+
+        self.assertEqual(commands.context(cmds, 2),
+                         ['configure terminal', 'interface port-channel 1'])
+        self.assertEqual(commands.context(cmds, 4), ['configure terminal'])
+        self.assertEqual(commands.context(cmds, 9),
+                         ['configure terminal', 'interface ethernet 1/1'])
+
+    def test_only_modes(self):
+        self.assertTrue(commands.only_modes([]))
+        self.assertTrue(commands.only_modes(
+            commands._configure_interface('port-channel', '1')))
+        self.assertFalse(commands.only_modes(
+            commands._configure_interface('port-channel', '1') +
+            ['shutdown']))
+
+    def test_idempotent(self):
+        self.assertTrue(commands.idempotent(commands.remove_vlan(
+            'eth1/1', 1, '10.0.0.2', 'ff:ff:ff:ff:ff:ff', True)))
+        self.assertFalse(commands.idempotent(commands.add_vlan(
+            'eth1/1', 1, '10.0.0.2', 'ff:ff:ff:ff:ff:ff', True)))
+        self.assertFalse(commands.idempotent(commands._add_vpc('1')))
+
+
+class TestVlans(unittest.TestCase):
+
+    def test_compact_vlans(self):
+        self.assertEqual(commands.compact_vlans([]), '')
+        self.assertEqual(commands.compact_vlans([5]), '5')
+        self.assertEqual(
+            commands.compact_vlans([110] + range(101, 110) + [301, 201, 5]),
+            '5,101-110,201,301')
+        self.assertEqual(commands.compact_vlans(['2', 1, 3, 3]), '1-3')
+
+    def test_add_vlans(self):
+        vlans = [(101, '10.0.0.2', 'ff:ff:ff:ff:ff:ff'),
+                 (102, '10.0.1.2', 'ff:ff:ff:ff:ff:ff')]
+
+        self.assertEqual(commands.add_vlans('eth1/1', vlans, True), [
+            'configure terminal',
+            'interface port-channel 1',
+            'configure terminal',
+            ('ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff vlan 101 '
+             'interface port-channel1'),
+            'configure terminal',
+            ('ip source binding 10.0.1.2 ff:ff:ff:ff:ff:ff vlan 102 '
+             'interface port-channel1'),
+            'configure terminal',
+            'interface port-channel 1',
+            'switchport trunk allowed vlan add 101-102',
+        ])
+        self.assertEqual(commands.add_vlans('eth1/1', vlans, False), [])
+
+    def test_remove_vlans(self):
+        vlans = [(101, '10.0.0.2', 'ff:ff:ff:ff:ff:ff'),
+                 (103, '10.0.1.2', 'ff:ff:ff:ff:ff:ff')]
+
+        self.assertEqual(commands.remove_vlans('eth1/1', vlans, True), [
+            'configure terminal',
+            'interface port-channel 1',
+            'switchport trunk allowed vlan remove 101,103',
+        ])
+        self.assertEqual(commands.unbind_ips('eth1/1', vlans, True)[-1],
+                         ('no ip source binding 10.0.1.2 ff:ff:ff:ff:ff:ff '
+                          'vlan 103 interface port-channel1'))
+
+    def test_interface_range(self):
+        self.assertEqual(
+            commands._interface_range('port-channel',
+                                      ['15'] + [str(i) for i in range(1, 11)]),
+            'port-channel 1-10,15')
+        self.assertEqual(
+            commands._interface_range('ethernet',
+                                      ['1/3', '1/1', '2/5', '1/2', '1/5']),
+            'ethernet 1/1-3, ethernet 1/5, ethernet 2/5')
+
+    def test_add_vlan_range(self):
+        ports = [('eth1/%d' % (i), 101 if i < 3 else 102,
+                  '10.0.0.%d' % (i), 'ff:ff:ff:ff:ff:ff')
+                 for i in range(1, 4)]
+
+        cmds = commands.add_vlan_range(ports)
+        self.assertEqual(cmds[:2], ['configure terminal',
+                                    'interface port-channel 1-3'])
+        self.assertEqual(len([c for c in cmds
+                              if c.startswith('ip source binding')]), 3)
+        self.assertEqual(cmds[-6:], [
+            'configure terminal',
+            'interface port-channel 1-2',
+            'switchport trunk allowed vlan add 101',
+            'configure terminal',
+            'interface port-channel 3',
+            'switchport trunk allowed vlan add 102',
+        ])
+
+    def test_delete_port_range(self):
+        self.assertEqual(commands.delete_port_range(['eth1/1', 'eth1/2']), [
+            'configure terminal',
+            'interface port-channel 1-2',
+            'no ip verify source dhcp-snooping-vlan',
+            'no interface port-channel 1-2',
+            'configure terminal',
+            'default interface ethernet 1/1-2',
+            'configure terminal',
+            'interface ethernet 1/1-2',
+            'shutdown',
+        ])
+
+    def test_single_vlan_matches_add_vlan(self):
+        args = _port_args(True)
+        vlans = [(args['vlan_id'], args['ip'], args['mac_address'])]
+
+        self.assertEqual(commands.add_vlans('eth1/1', vlans, True),
+                         commands.add_vlan(**args))
+        self.assertEqual(commands.remove_vlans('eth1/1', vlans, True),
+                         commands.remove_vlan(**args))
@@ -0,0 +1,120 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import xml.etree.ElementTree as ET
+
+from baremetal_neutron_extension.drivers.cisco import driver
+from baremetal_neutron_extension.drivers.cisco import errors
+from baremetal_neutron_extension.drivers.cisco import nxapi
+from baremetal_neutron_extension.drivers.cisco import retry
+
+
+RPC_ERROR = """<?xml version="1.0" encoding="ISO-8859-1"?>
+<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"
+           message-id="urn:uuid:e7ef8254-10a6-11e4-b86d-becafe000bed">
+  <rpc-error>
+    <error-type>application</error-type>
+    <error-tag>%(tag)s</error-tag>
+    <error-severity>error</error-severity>
+    <error-message>%(message)s</error-message>
+  </rpc-error>
+</rpc-reply>"""
+
+
+class RPCError(Exception):
+    """Looks like ncclient.operations.rpc.RPCError."""
+
+    def __init__(self, tag, message):
+        self.xml = ET.fromstring(RPC_ERROR % {'tag': tag,
+                                              'message': message})
+        error = errors.parse_rpc_errors(self.xml)[0]
+        self.tag = error['tag']
+        self.message = error['message']
+        super(RPCError, self).__init__(error['message'])
+
+
+class SessionCloseError(Exception):
+    pass
+
+
+class TestErrors(unittest.TestCase):
+
+    def test_parse_rpc_errors(self):
+        root = ET.fromstring(RPC_ERROR % {'tag': 'operation-failed',
+                                          'message': 'ERROR: oops'})
+        self.assertEqual(errors.parse_rpc_errors(root), [{
+            'tag': 'operation-failed',
+            'type': 'application',
+            'severity': 'error',
+            'message': 'ERROR: oops'
+        }])
+
+    def test_categorize_messages(self):
+        for message, category in [
+                ('Authorization failed', errors.TRANSIENT_AUTH),
+                ('ERROR: Entry does not exist', errors.DOES_NOT_EXIST),
+                ('ERROR: Operation failed: [vPC already exists]',
+                 errors.ALREADY_EXISTS),
+                ('Syntax error while parsing interface port-channel1',
+                 errors.SYNTAX),
+                ('% Invalid command at \'^\' marker.', errors.SYNTAX),
+                ('ERROR: Not enough resources', errors.RESOURCE_EXHAUSTED),
+                ('something else', errors.UNKNOWN)]:
+            err = RPCError('operation-failed', message)
+            self.assertEqual(errors.categorize(err), category)
+
+    def test_categorize_tags(self):
+        self.assertEqual(
+            errors.categorize(RPCError('data-missing', 'ERROR: failed')),
+            errors.DOES_NOT_EXIST)
+        self.assertEqual(
+            errors.categorize(RPCError('resource-denied', 'ERROR: failed')),
+            errors.RESOURCE_EXHAUSTED)
+
+    def test_categorize_wrapped(self):
+        err = driver.CiscoException(
+            RPCError('operation-failed', 'ERROR: Entry does not exist'))
+        self.assertTrue(errors.is_category(err, errors.DOES_NOT_EXIST))
+
+    def test_transport_errors(self):
+        err = driver.CiscoException(SessionCloseError('Unexpected close'))
+        self.assertEqual(errors.categorize(err), errors.CONNECTION)
+        self.assertFalse(errors.switch_answered(err))
+        self.assertEqual(errors.retry_classifier(err), retry.TRANSIENT)
+
+    def test_switch_answered(self):
+        # the switch answered, even if we don't know what it means
+        self.assertTrue(errors.switch_answered(driver.CiscoException(
+            RPCError('operation-failed', 'VLAN 4095 is reserved'))))
+        self.assertTrue(errors.switch_answered(
+            nxapi.NxapiError('Invalid VLAN', code='400')))
+        self.assertTrue(errors.switch_answered(
+            Exception('ERROR: Entry does not exist')))
+
+        self.assertFalse(errors.switch_answered(
+            Exception('Could not open socket to switch1.host.com:22')))
+
+    def test_retry_classifier(self):
+        self.assertEqual(
+            errors.retry_classifier(RPCError('access-denied', 'denied')),
+            retry.TRANSIENT)
+        self.assertEqual(
+            errors.retry_classifier(RPCError('operation-failed',
+                                             'vPC already exists')),
+            retry.PERMANENT)
+        self.assertEqual(
+            errors.retry_classifier(Exception('something else')), None)
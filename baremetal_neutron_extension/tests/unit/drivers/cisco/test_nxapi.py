@@ -0,0 +1,181 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+
+import unittest
+
+from baremetal_neutron_extension import config
+from baremetal_neutron_extension.drivers import base as base_driver
+from baremetal_neutron_extension.drivers.cisco import driver
+from baremetal_neutron_extension.drivers.cisco import errors
+from baremetal_neutron_extension.drivers.cisco import nxapi
+from baremetal_neutron_extension.tests.unit.drivers.cisco import nxapi_server
+
+HOST = '127.0.0.1'
+
+RUNNING_ETHERNET = """
+!Command: show running-config interface Ethernet1/1
+!Time: Mon May 19 18:40:08 2014
+
+version 6.0(2)U2(4)
+
+interface Ethernet1/1
+  switchport mode trunk
+  channel-group 1 mode active
+"""
+
+
+def _interfaces(*names):
+    return {'TABLE_interface': {'ROW_interface': [
+        {'interface': name, 'state': 'up', 'eth_mtu': 1500}
+        for name in names]}}
+
+
+class TestNxapiSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = nxapi_server.FakeNxapiServer()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+        self.session = nxapi.NxapiSession(HOST, 'user1', 'pass',
+                                          port=self.server.port,
+                                          scheme='http')
+        self.addCleanup(self.session.close_session)
+
+    def test_batch_in_one_request(self):
+        cmds = ['configure terminal',
+                'interface port-channel 1',
+                'switchport trunk allowed vlan add 2']
+        self.session.command(cmds)
+
+        self.assertEqual(self.server.requests, [cmds])
+
+    def test_keeps_connection_alive(self):
+        for i in range(3):
+            self.session.command(['show clock'])
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(set(self.server.clients)), 1)
+
+    def test_reply_shapes(self):
+        self.server.outputs['show running interface ethernet 1/1'] = {
+            'msg': RUNNING_ETHERNET}
+        self.server.outputs['show interface'] = {
+            'body': _interfaces('Ethernet1/1', 'port-channel1')}
+
+        reply = self.session.command(['show running interface ethernet 1/1'])
+        self.assertEqual(reply.text, RUNNING_ETHERNET)
+
+        reply = self.session.command(['show interface'])
+        self.assertEqual(reply.rows[1], {'interface': 'port-channel1',
+                                         'state': 'up',
+                                         'eth_mtu': '1500'})
+
+    def test_error(self):
+        self.server.errors['no ip source binding x'] = (
+            'ERROR: Entry does not exist\n')
+
+        with self.assertRaises(nxapi.NxapiError) as cm:
+            self.session.command(['configure terminal',
+                                  'no ip source binding x'])
+
+        self.assertEqual(cm.exception.cmd, 'no ip source binding x')
+        self.assertEqual(errors.categorize(cm.exception),
+                         errors.DOES_NOT_EXIST)
+
+    def test_bad_password(self):
+        session = nxapi.NxapiSession(HOST, 'user1', 'wrong',
+                                     port=self.server.port, scheme='http')
+        self.addCleanup(session.close_session)
+
+        with self.assertRaises(nxapi.NxapiError) as cm:
+            session.command(['show clock'])
+        self.assertEqual(errors.categorize(cm.exception),
+                         errors.TRANSIENT_AUTH)
+
+    def test_transport_error(self):
+        self.server.stop()
+
+        with self.assertRaises(nxapi.NxapiTransportError) as cm:
+            self.session.command(['show clock'])
+        self.assertEqual(errors.categorize(cm.exception), errors.CONNECTION)
+        self.assertFalse(self.session.connected)
+
+
+class TestNxapiDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.server = nxapi_server.FakeNxapiServer()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+        for name, value in [('nxapi_switches', [HOST]),
+                            ('nxapi_port', self.server.port),
+                            ('nxapi_scheme', 'http')]:
+            config.cfg.CONF.set_override(name, value, group='ironic')
+            self.addCleanup(config.cfg.CONF.clear_override, name,
+                            group='ironic')
+
+        self.import_ncclient = mock.patch.object(
+            driver.CiscoDriver, '_import_ncclient').start()
+        self.addCleanup(mock.patch.stopall)
+
+        self.driver = driver.CiscoDriver(save_quiet_period=0,
+                                         save_max_delay=0)
+        self.port = base_driver.PortInfo(
+            switch_host=HOST,
+            switch_username='user1',
+            switch_password='pass',
+            interface='eth1/1',
+            hardware_id='hardware1',
+            vlan_id=2,
+            ip='10.0.0.2',
+            mac_address='ff:ff:ff:ff:ff:ff',
+            trunked=True)
+
+    def test_attach(self):
+        self.driver.attach(self.port)
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0][-1],
+                         'switchport trunk allowed vlan add 2')
+        self.assertFalse(self.import_ncclient.called)
+
+    def test_running_config(self):
+        self.server.outputs['show running interface ethernet 1/1'] = {
+            'msg': RUNNING_ETHERNET}
+        self.server.errors['show running interface port-channel 1'] = (
+            'Invalid range\n')
+
+        res = self.driver.running_config(self.port)['running-config']
+
+        self.assertEqual(res['dhcp'], [])
+        self.assertEqual(res['ethernet'], ['switchport mode trunk',
+                                           'channel-group 1 mode active'])
+        self.assertEqual(res['port-channel'], ['no port-channel'])
+
+    def test_interface_status(self):
+        self.server.outputs['show interface ethernet 1/1'] = {
+            'body': _interfaces('Ethernet1/1')}
+        self.server.outputs['show interface port-channel 1'] = {
+            'body': _interfaces('port-channel1')}
+
+        res = self.driver.interface_status(self.port)['interface-status']
+
+        self.assertEqual(res['ethernet']['interface'], 'Ethernet1/1')
+        self.assertEqual(res['port-channel']['state'], 'up')
@@ -0,0 +1,153 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import eventlet
+import mock
+
+import unittest
+
+from baremetal_neutron_extension.drivers.cisco import pool
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.sessions = []
+        self.pool = pool.SessionPool('switch1.host.com',
+                                     create=self._create,
+                                     max_size=2,
+                                     idle_timeout=60)
+
+    def _create(self):
+        session = mock.Mock()
+        session.connected = True
+        self.sessions.append(session)
+        return session
+
+    def test_reuses_idle_session(self):
+        with self.pool.item() as s1:
+            pass
+        with self.pool.item() as s2:
+            pass
+
+        self.assertIs(s1, s2)
+        self.assertEqual(len(self.sessions), 1)
+        self.assertEqual(self.pool.size, 1)
+
+    def test_concurrent_checkouts_open_sessions(self):
+        s1 = self.pool.get()
+        s2 = self.pool.get()
+
+        self.assertIsNot(s1, s2)
+        self.assertEqual(self.pool.size, 2)
+
+        self.pool.put(s1)
+        self.pool.put(s2)
+        self.assertEqual(self.pool.idle, 2)
+
+    def test_blocks_at_max_size(self):
+        s1 = self.pool.get()
+        self.pool.get()
+
+        gt = eventlet.spawn(self.pool.get)
+        eventlet.sleep(0)
+        self.assertEqual(self.pool.size, 2)
+
+        self.pool.put(s1)
+        self.assertIs(gt.wait(), s1)
+        self.assertEqual(len(self.sessions), 2)
+
+    def test_discards_session_on_error(self):
+        try:
+            with self.pool.item():
+                raise Exception('failed')
+        except Exception:
+            pass
+
+        self.assertEqual(self.pool.size, 0)
+        self.assertEqual(self.pool.idle, 0)
+        self.sessions[0].close_session.assert_called_once_with()
+
+    def test_evicts_disconnected_session(self):
+        with self.pool.item() as s1:
+            pass
+        s1.connected = False
+
+        with self.pool.item() as s2:
+            pass
+
+        self.assertIsNot(s1, s2)
+        self.assertEqual(self.pool.size, 1)
+        s1.close_session.assert_called_once_with()
+
+    def test_evicts_expired_session(self):
+        with mock.patch.object(pool.time, 'time', return_value=0):
+            with self.pool.item() as s1:
+                pass
+
+        with mock.patch.object(pool.time, 'time', return_value=61):
+            self.pool.evict()
+
+        self.assertEqual(self.pool.size, 0)
+        s1.close_session.assert_called_once_with()
+
+    def test_keeps_min_size_sessions(self):
+        self.pool.min_size = 1
+        self.pool.fill()
+        self.assertEqual(self.pool.size, 1)
+
+        with mock.patch.object(pool.time, 'time', return_value=1e10):
+            self.pool.evict()
+
+        self.assertEqual(self.pool.size, 1)
+        self.assertEqual(self.pool.idle, 1)
+
+    def test_probe_keeps_healthy_session(self):
+        with self.pool.item() as s1:
+            pass
+
+        check = mock.Mock()
+        self.pool.probe(check)
+
+        check.assert_called_once_with(s1)
+        self.assertEqual(self.pool.idle, 1)
+        self.assertEqual(self.pool.stats['probes'], 1)
+        self.assertEqual(self.pool.stats['probe_failures'], 0)
+
+    def test_probe_reconnects_failed_session(self):
+        with self.pool.item() as s1:
+            pass
+
+        self.pool.probe(mock.Mock(side_effect=Exception('dead')))
+
+        s1.close_session.assert_called_once_with()
+        self.assertEqual(len(self.sessions), 2)
+        self.assertEqual(self.pool.size, 1)
+        self.assertEqual(self.pool.stats['probe_failures'], 1)
+        self.assertEqual(self.pool.stats['reconnects'], 1)
+
+        with self.pool.item() as s2:
+            pass
+        self.assertIs(s2, self.sessions[1])
+
+    def test_probe_skips_recently_used_session(self):
+        with self.pool.item():
+            pass
+
+        check = mock.Mock()
+        self.pool.probe(check, min_idle=60)
+
+        self.assertEqual(check.call_count, 0)
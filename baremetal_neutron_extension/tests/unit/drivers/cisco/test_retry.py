@@ -0,0 +1,110 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+
+import unittest
+
+from baremetal_neutron_extension.drivers.cisco import errors
+from baremetal_neutron_extension.drivers.cisco import retry
+
+
+class FakeSwitchError(Exception):
+    pass
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.sleep = mock.Mock()
+        self.policy = retry.RetryPolicy(
+            max_retries=3,
+            interval=1,
+            backoff=2,
+            max_interval=3,
+            classifiers=[errors.retry_classifier],
+            sleep=self.sleep)
+
+    def test_classify(self):
+        self.assertEqual(
+            self.policy.classify(FakeSwitchError('Authorization Failed')),
+            retry.TRANSIENT)
+        self.assertEqual(
+            self.policy.classify(FakeSwitchError('Syntax error at ^')),
+            retry.PERMANENT)
+        self.assertEqual(
+            self.policy.classify(FakeSwitchError('something else')),
+            retry.PERMANENT)
+
+    def test_substring_classifier(self):
+        classify = retry.substring_classifier(['authorization failed'],
+                                              retry.TRANSIENT)
+        self.assertEqual(classify(FakeSwitchError('Authorization Failed')),
+                         retry.TRANSIENT)
+        self.assertEqual(classify(FakeSwitchError('something else')), None)
+
+    def test_retries_transient_errors_with_backoff(self):
+        func = mock.Mock(side_effect=[
+            FakeSwitchError('authorization failed'),
+            FakeSwitchError('authorization failed'),
+            FakeSwitchError('authorization failed'),
+            'ok'
+        ])
+
+        self.assertEqual(self.policy.call(func, 'arg'), 'ok')
+        self.assertEqual(func.call_count, 4)
+        func.assert_called_with('arg')
+        self.assertEqual([c[0][0] for c in self.sleep.call_args_list],
+                         [1, 2, 3])
+
+    def test_gives_up_after_max_retries(self):
+        func = mock.Mock(side_effect=FakeSwitchError('authorization failed'))
+
+        self.assertRaises(FakeSwitchError, self.policy.call, func)
+        self.assertEqual(func.call_count, 4)
+
+    def test_permanent_errors_fail_immediately(self):
+        func = mock.Mock(side_effect=FakeSwitchError('% Invalid command at ^'))
+
+        self.assertRaises(FakeSwitchError, self.policy.call, func)
+        self.assertEqual(func.call_count, 1)
+        self.assertEqual(self.sleep.call_count, 0)
+
+    def test_deadline(self):
+        self.policy.deadline = 2.5
+        func = mock.Mock(side_effect=FakeSwitchError('authorization failed'))
+
+        clock = [0]
+
+        def _sleep(seconds):
+            clock[0] += seconds
+
+        self.sleep.side_effect = _sleep
+
+        with mock.patch.object(retry.time, 'time', lambda: clock[0]):
+            self.assertRaises(FakeSwitchError, self.policy.call, func)
+
+        # 1s + 2s of sleeping would overrun the deadline
+        self.assertEqual(func.call_count, 2)
+        self.assertEqual(self.sleep.call_count, 1)
+
+    def test_jitter(self):
+        self.policy.jitter = 0.5
+
+        with mock.patch.object(retry.random, 'random', return_value=1):
+            self.assertEqual(self.policy.delay(2), 1)
+        with mock.patch.object(retry.random, 'random', return_value=0):
+            self.assertEqual(self.policy.delay(2), 2)
@@ -0,0 +1,289 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import eventlet
+from eventlet import event
+import mock
+
+import unittest
+
+from baremetal_neutron_extension.drivers import base as base_driver
+from baremetal_neutron_extension.drivers.cisco import save
+
+
+def _port(host):
+    return base_driver.PortInfo(
+        switch_host=host,
+        switch_username='user1',
+        switch_password='pass',
+        interface='eth1/1')
+
+
+class FakeTimer(object):
+
+    def __init__(self, at, f, args):
+        self.at = at
+        self.f = f
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeClock(object):
+    """Time that only passes when a test calls advance()."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.timers = []
+
+    def time(self):
+        return self.now
+
+    def spawn_after(self, seconds, f, *args):
+        timer = FakeTimer(self.now + seconds, f, args)
+        self.timers.append(timer)
+        return timer
+
+    def advance(self, seconds):
+        """Move time on, running the timers that come due in order."""
+        end = self.now + seconds
+        while True:
+            due = [t for t in self.timers
+                   if not t.cancelled and t.at <= end]
+            if not due:
+                break
+            timer = min(due, key=lambda t: t.at)
+            self.timers.remove(timer)
+            self.now = timer.at
+            eventlet.spawn(timer.f, *timer.args)
+            eventlet.sleep(0)
+        self.now = end
+
+
+class TestSaveScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = []
+        self.clock = FakeClock()
+        self.scheduler = save.SaveScheduler(self._save,
+                                            quiet_period=2,
+                                            max_delay=5,
+                                            clock=self.clock.time,
+                                            spawn_after=self.clock.spawn_after)
+
+    def _save(self, port):
+        self.saved.append(port.switch_host)
+
+    def test_debounces_changes(self):
+        port = _port('switch1.host.com')
+
+        self.scheduler.schedule(port)
+        self.clock.advance(1)
+        self.scheduler.schedule(port)
+        self.clock.advance(1.5)
+
+        # the second change pushed the save back
+        self.assertEqual(self.saved, [])
+
+        self.clock.advance(.5)
+        self.assertEqual(self.saved, ['switch1.host.com'])
+
+    def test_max_delay(self):
+        port = _port('switch1.host.com')
+
+        for i in range(5):
+            self.assertEqual(self.saved, [])
+            self.scheduler.schedule(port)
+            self.clock.advance(1)
+
+        # a steady stream of changes can't put the save off forever
+        self.assertEqual(self.saved, ['switch1.host.com'])
+
+    def test_slow_switch_does_not_delay_others(self):
+        self.scheduler.quiet_period = 0
+        gate = event.Event()
+
+        def _save(port):
+            if port.switch_host == 'slow.host.com':
+                gate.wait()
+            self.saved.append(port.switch_host)
+
+        self.scheduler._save = _save
+        self.scheduler.schedule(_port('slow.host.com'))
+        self.scheduler.schedule(_port('switch1.host.com'))
+        self.clock.advance(0)
+
+        self.assertEqual(self.saved, ['switch1.host.com'])
+        gate.send()
+        eventlet.sleep(0)
+        self.assertEqual(self.saved, ['switch1.host.com', 'slow.host.com'])
+
+    def test_one_save_per_switch_at_a_time(self):
+        self.scheduler.quiet_period = 0
+        gate = event.Event()
+        running = []
+        most_running = []
+
+        def _save(port):
+            running.append(port)
+            most_running.append(len(running))
+            gate.wait()
+            running.remove(port)
+            self.saved.append(port.switch_host)
+
+        self.scheduler._save = _save
+        port = _port('switch1.host.com')
+
+        self.scheduler.schedule(port)
+        self.clock.advance(0)
+        self.scheduler.schedule(port)
+        self.clock.advance(1)
+
+        # the second save waits for the first
+        self.assertEqual(most_running, [1])
+        gate.send()
+        eventlet.sleep(0)
+        self.clock.advance(1)
+
+        self.assertEqual(most_running, [1, 1])
+        self.assertEqual(self.saved, ['switch1.host.com',
+                                      'switch1.host.com'])
+
+
+class TestSaveSchedulerStore(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = []
+        self.store = mock.Mock()
+        self.clock = FakeClock()
+        self.scheduler = save.SaveScheduler(self._save,
+                                            quiet_period=0,
+                                            max_delay=0,
+                                            max_attempts=1,
+                                            store=self.store,
+                                            clock=self.clock.time,
+                                            spawn_after=self.clock.spawn_after)
+
+    def _save(self, port):
+        self.saved.append(port.switch_host)
+
+    def test_completes_claimed_save(self):
+        self.store.claim.return_value = {'switch1.host.com': 3}
+
+        self.scheduler.schedule(_port('switch1.host.com'))
+        self.clock.advance(0)
+
+        self.store.add.assert_called_once_with('switch1.host.com')
+        self.assertEqual(self.saved, ['switch1.host.com'])
+        self.store.complete.assert_called_once_with('switch1.host.com', 3)
+
+    def test_skips_save_claimed_elsewhere(self):
+        self.store.claim.return_value = {}
+
+        self.scheduler.schedule(_port('switch1.host.com'))
+        self.clock.advance(0)
+
+        self.assertEqual(self.saved, [])
+        self.assertFalse(self.store.complete.called)
+
+    def test_releases_failed_save(self):
+        self.store.claim.return_value = {'switch1.host.com': 0}
+        self.scheduler._save = mock.Mock(side_effect=Exception('failed'))
+
+        self.scheduler.schedule(_port('switch1.host.com'))
+        self.clock.advance(0)
+
+        self.store.release.assert_called_once_with('switch1.host.com')
+        self.assertFalse(self.store.complete.called)
+
+    def test_saves_when_store_is_down(self):
+        self.store.add.side_effect = Exception('db down')
+        self.store.claim.side_effect = Exception('db down')
+
+        self.scheduler.schedule(_port('switch1.host.com'))
+        self.clock.advance(0)
+
+        self.assertEqual(self.saved, ['switch1.host.com'])
+
+
+class TestSaveSchedulerOverflow(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = []
+        self.clock = FakeClock()
+        self.scheduler = save.SaveScheduler(self._save,
+                                            quiet_period=2,
+                                            max_delay=5,
+                                            max_pending=1,
+                                            overflow_timeout=5,
+                                            clock=self.clock.time,
+                                            spawn_after=self.clock.spawn_after)
+
+    def _save(self, port):
+        self.saved.append(port.switch_host)
+
+    def test_coalesces_queued_switch(self):
+        for i in range(5):
+            self.scheduler.schedule(_port('switch1.host.com'))
+
+        self.assertEqual(self.scheduler.stats['overflows'], 0)
+        self.assertEqual(self.scheduler.stats['coalesced'], 4)
+
+        self.clock.advance(2)
+        self.assertEqual(self.saved, ['switch1.host.com'])
+
+    def test_block_waits_for_room(self):
+        self.scheduler.schedule(_port('switch1.host.com'))
+        blocked = eventlet.spawn(self.scheduler.schedule,
+                                 _port('switch2.host.com'))
+        eventlet.sleep(0)
+        self.clock.advance(2)
+        blocked.wait()
+
+        # switch2 had to wait until switch1 left the queue
+        self.assertEqual(self.saved, ['switch1.host.com'])
+        self.assertEqual(self.scheduler.pending(), ['switch2.host.com'])
+        self.assertEqual(self.scheduler.stats['overflows'], 1)
+        self.assertEqual(self.scheduler.stats['sync_saves'], 0)
+
+        self.clock.advance(2)
+        self.assertEqual(self.saved, ['switch1.host.com', 'switch2.host.com'])
+
+    def test_block_times_out_to_sync_save(self):
+        self.scheduler.overflow_timeout = 1
+        self.scheduler.schedule(_port('switch1.host.com'))
+        blocked = eventlet.spawn(self.scheduler.schedule,
+                                 _port('switch2.host.com'))
+        eventlet.sleep(0)
+        self.clock.advance(1)
+        blocked.wait()
+
+        self.assertEqual(self.saved, ['switch2.host.com'])
+        self.assertEqual(self.scheduler.stats['sync_saves'], 1)
+
+        self.clock.advance(1)
+        self.assertEqual(self.saved, ['switch2.host.com', 'switch1.host.com'])
+
+    def test_sync_policy(self):
+        self.scheduler.overflow_policy = save.SYNC
+        self.scheduler.schedule(_port('switch1.host.com'))
+        self.scheduler.schedule(_port('switch2.host.com'))
+
+        self.assertEqual(self.saved, ['switch2.host.com'])
+        self.assertEqual(self.scheduler.stats['overflow_waits'], 0)
+        self.assertEqual(self.scheduler.stats['sync_saves'], 1)
@@ -0,0 +1,108 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import xml.etree.ElementTree as ET
+
+from baremetal_neutron_extension.drivers.cisco import snapshot
+from baremetal_neutron_extension.tests.unit.drivers.cisco import fixtures
+
+
+def _text(xml):
+    return ET.fromstring(xml)[0].text
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_parse_running_config(self):
+        snap = snapshot.parse_running_config(
+            _text(fixtures.show_running_config([1, 2])))
+
+        self.assertEqual(sorted(snap.interfaces.keys()), [
+            ('ethernet', '1/1'),
+            ('ethernet', '1/2'),
+            ('port-channel', '1'),
+            ('port-channel', '2'),
+        ])
+        self.assertEqual(snap.interface('port-channel', '2')[-1], 'vpc 2')
+        self.assertEqual(snap.interface('ethernet', '1/1')[-1],
+                         'channel-group 1 mode active')
+        self.assertEqual(snap.interface('port-channel', '3'), None)
+
+        self.assertEqual(snap.dhcp('2'), [
+            ('ip source binding 10.0.0.2 FFFF.FFFF.FFFF.FFFF '
+             'vlan 1 interface port-channel2')
+        ])
+        self.assertEqual(snap.dhcp('3'), [])
+
+    def test_sections_end_at_dedent(self):
+        snap = snapshot.parse_running_config('\n'.join([
+            'interface port-channel1',
+            '  vpc 1',
+            '',
+            'ip source binding 10.0.0.1 FFFF.FFFF.FFFF.FFFF '
+            'vlan 1 interface port-channel1',
+            'interface Ethernet1/1',
+        ]))
+
+        self.assertEqual(snap.interface('port-channel', '1'), ['vpc 1'])
+        self.assertEqual(snap.interface('ethernet', '1/1'), [])
+        self.assertEqual(len(snap.dhcp('1')), 1)
+
+    def test_typed_interfaces(self):
+        snap = snapshot.parse_running_config(
+            _text(fixtures.show_running_config([1, 2])))
+
+        po = snap.config('port-channel', '1')
+        self.assertEqual(po.name, 'port-channel1')
+        self.assertEqual(po.mode, 'trunk')
+        self.assertEqual(po.allowed_vlans, set([1, 2]))
+        self.assertEqual(po.vpc, '1')
+
+        eth = snap.config('ethernet', '1/2')
+        self.assertEqual(eth.channel_group, '2')
+        self.assertEqual(eth.channel_mode, 'active')
+        self.assertEqual(eth.vpc, None)
+        self.assertFalse(eth.shutdown)
+
+    def test_allowed_vlans(self):
+        def _config(*lines):
+            return snapshot.InterfaceConfig('port-channel', '1', list(lines))
+
+        self.assertEqual(_config('switchport mode trunk').vlans(), None)
+        self.assertEqual(_config('switchport mode trunk',
+                                 'switchport trunk allowed vlan none',
+                                 ).vlans(), set())
+        self.assertEqual(_config('switchport mode trunk',
+                                 'switchport trunk allowed vlan 1,5-6',
+                                 'switchport trunk allowed vlan add 10',
+                                 ).vlans(), set([1, 5, 6, 10]))
+        self.assertEqual(_config('switchport access vlan 7').vlans(),
+                         set([7]))
+
+    def test_indexes(self):
+        snap = snapshot.parse_running_config(
+            _text(fixtures.show_running_config([1, 2])))
+
+        self.assertEqual([c.name for c in snap.by_vlan[2]], [
+            'ethernet1/1', 'ethernet1/2', 'port-channel1', 'port-channel2'])
+        self.assertEqual([c.name for c in snap.by_port_channel['2']],
+                         ['port-channel2', 'ethernet1/2'])
+
+        self.assertEqual(len(snap.mac('ff:ff:ff:ff:ff:ff:ff:ff')), 2)
+        binding = snap.by_ip['10.0.0.2'][0]
+        self.assertEqual((binding.vlan, binding.port_channel), (1, '2'))
+        self.assertEqual(snap.binding_entries('2')[0].ip, '10.0.0.2')
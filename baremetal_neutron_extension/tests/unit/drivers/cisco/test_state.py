@@ -0,0 +1,209 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from baremetal_neutron_extension.drivers.cisco import state
+
+
+def _trunked(vlan_id=1):
+    return state.compile_port(
+        hardware_id='hardware1',
+        interface='eth1/1',
+        vlan_id=vlan_id,
+        ip='10.0.0.2',
+        mac_address='ff:ff:ff:ff:ff:ff',
+        trunked=True)
+
+
+def _access(vlan_id=1):
+    return state.compile_port(
+        hardware_id='hardware1',
+        interface='eth1/1',
+        vlan_id=vlan_id,
+        ip='10.0.0.2',
+        mac_address='ff:ff:ff:ff:ff:ff',
+        trunked=False)
+
+
+TRUNKED_ETHERNET = [
+    'description CUSThardware1-host',
+    'no lldp transmit',
+    'no cdp enable',
+    'switchport mode trunk',
+    'switchport trunk allowed vlan 1',
+    'spanning-tree port type edge trunk',
+    'spanning-tree bpduguard enable',
+    'channel-group 1 mode active',
+]
+
+TRUNKED_PORT_CHANNEL = [
+    'description CUSThardware1-host',
+    'switchport mode trunk',
+    'switchport trunk allowed vlan 1',
+    'switchport block unicast',
+    'ip verify source dhcp-snooping-vlan',
+    'spanning-tree port type edge trunk',
+    'no negotiate auto',
+    'vpc 1',
+]
+
+TRUNKED_DHCP = [
+    ('ip source binding 10.0.0.2 FFFF.FFFF.FFFF vlan 1 '
+     'interface port-channel1'),
+]
+
+ACCESS_ETHERNET = [
+    'description CUSThardware1-host',
+    'switchport access vlan 1',
+    'spanning-tree port type edge',
+    'spanning-tree bpduguard enable',
+]
+
+
+class TestCompile(unittest.TestCase):
+
+    def test_compile_access(self):
+        desired = _access()
+
+        self.assertEqual(desired.ethernet.lines, ACCESS_ETHERNET)
+        # defaults and settings that were undone must not show up
+        self.assertEqual(desired.ethernet.absent,
+                         set(['shutdown',
+                              'no lldp transmit',
+                              'no cdp enable',
+                              'ip verify source dhcp-snooping-vlan']))
+        self.assertEqual(desired.ethernet.defaults,
+                         {'switchport mode': 'switchport mode access'})
+        self.assertEqual(desired.port_channel, None)
+        self.assertEqual(desired.bindings, [])
+
+    def test_compile_trunked(self):
+        desired = _trunked()
+
+        self.assertEqual(desired.ethernet.lines, [
+            'channel-group 1 mode active',
+            'spanning-tree bpduguard enable',
+            'no lldp transmit',
+            'no cdp enable',
+        ])
+        self.assertEqual(desired.port_channel.lines, [
+            'description CUSThardware1-host',
+            'switchport mode trunk',
+            'switchport trunk allowed vlan 1',
+            'spanning-tree port type edge trunk',
+            'ip verify source dhcp-snooping-vlan',
+            'switchport block unicast',
+            'vpc 1',
+        ])
+        self.assertEqual(desired.bindings, [
+            (('10.0.0.2', 'ffffffffffff', '1', '1'),
+             ('ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff vlan 1 '
+              'interface port-channel1'))
+        ])
+
+
+class TestDiff(unittest.TestCase):
+
+    def test_no_changes(self):
+        self.assertEqual(state.diff_port(_trunked(),
+                                         TRUNKED_ETHERNET,
+                                         TRUNKED_PORT_CHANNEL,
+                                         TRUNKED_DHCP), [])
+        self.assertEqual(state.diff_port(_access(),
+                                         ACCESS_ETHERNET,
+                                         None,
+                                         []), [])
+
+    def test_vlan_lists_compare_as_sets(self):
+        running = [l for l in TRUNKED_PORT_CHANNEL
+                   if not l.startswith('switchport trunk allowed vlan')]
+        running.append('switchport trunk allowed vlan 1-3')
+
+        desired = _trunked(vlan_id='3,1-2')
+        self.assertEqual(desired.port_channel.diff(running), [])
+
+    def test_trunked_changes(self):
+        dhcp = [('ip source binding 10.0.0.9 0000.0000.0001 vlan 2 '
+                 'interface port-channel1')]
+
+        batches = state.diff_port(_trunked(vlan_id=2),
+                                  TRUNKED_ETHERNET,
+                                  TRUNKED_PORT_CHANNEL,
+                                  dhcp)
+
+        self.assertEqual(batches, [[
+            'configure terminal',
+            'interface port-channel 1',
+            'switchport trunk allowed vlan 2',
+
+            'configure terminal',
+            ('no ip source binding 10.0.0.9 0000.0000.0001 vlan 2 '
+             'interface port-channel1'),
+            ('ip source binding 10.0.0.2 ff:ff:ff:ff:ff:ff vlan 2 '
+             'interface port-channel1'),
+        ]])
+
+    def test_vpc_is_added_on_its_own(self):
+        running = [l for l in TRUNKED_PORT_CHANNEL if l != 'vpc 1']
+
+        batches = state.diff_port(_trunked(), TRUNKED_ETHERNET,
+                                  running, TRUNKED_DHCP)
+
+        self.assertEqual(batches, [[
+            'configure terminal',
+            'interface port-channel 1',
+            'vpc 1',
+        ]])
+
+    def test_access_restores_defaults(self):
+        running = ACCESS_ETHERNET[1:] + [
+            'description CUSTold-host',
+            'switchport mode trunk',
+            'no lldp transmit',
+            'shutdown',
+        ]
+
+        batches = state.diff_port(_access(), running, None, [])
+
+        self.assertEqual(batches, [[
+            'configure terminal',
+            'interface ethernet 1/1',
+            'switchport mode access',
+            'lldp transmit',
+            'no shutdown',
+            'description CUSThardware1-host',
+        ]])
+
+    def test_unknown_config_needs_rebuild(self):
+        running = ACCESS_ETHERNET + ['mtu 9000']
+
+        self.assertEqual(state.diff_port(_access(), running, None, []),
+                         None)
+
+    def test_port_channel_change_needs_rebuild(self):
+        self.assertEqual(state.diff_port(_access(),
+                                         ACCESS_ETHERNET,
+                                         TRUNKED_PORT_CHANNEL,
+                                         []), None)
+        self.assertEqual(state.diff_port(_trunked(),
+                                         TRUNKED_ETHERNET,
+                                         None,
+                                         []), None)
+        self.assertEqual(state.diff_port(_access(),
+                                         ACCESS_ETHERNET,
+                                         None,
+                                         TRUNKED_DHCP), None)
@@ -0,0 +1,89 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+
+import unittest
+import xml.etree.ElementTree as ET
+
+from baremetal_neutron_extension.drivers.cisco import utils as cisco_utils
+from baremetal_neutron_extension.tests.unit.drivers.cisco import fixtures
+
+
+class FakeReply(object):
+
+    def __init__(self, data, stream=True):
+        self._root = ET.fromstring(data)
+        if stream:
+            self.xml = data
+
+
+@unittest.skipIf(cisco_utils.etree is None, 'lxml is not installed')
+class TestStreamingParser(unittest.TestCase):
+
+    def _both(self, parse, data):
+        streamed = parse(FakeReply(data))
+        with mock.patch.object(cisco_utils, '_iterparse') as iterparse:
+            dom = parse(FakeReply(data, stream=False))
+            self.assertFalse(iterparse.called)
+        self.assertEqual(streamed, dom)
+        return streamed
+
+    def test_command_result(self):
+        res = self._both(cisco_utils.parse_command_result,
+                         fixtures.show_ethernet_config_trunked(1))
+        self.assertEqual(res[-1], 'channel-group 1 mode active')
+
+        self.assertEqual(
+            self._both(cisco_utils.parse_command_result, fixtures.ok()), [])
+
+    def test_interface_statuses(self):
+        res = self._both(cisco_utils.parse_interface_statuses,
+                         fixtures.show_interfaces(range(1, 49)))
+        self.assertEqual(len(res), 96)
+        self.assertEqual(res['port-channel48']['vpc_status'],
+                         'vPC Status: Up, vPC number: 48')
+
+    def test_interface_status(self):
+        res = self._both(cisco_utils.parse_interface_status,
+                         fixtures.show_port_channel_status(1))
+        self.assertEqual(res['state'], 'up')
+
+    def _max_live_elements(self, data):
+        most = 0
+        for elem in cisco_utils._iterparse(data, 'ROW_interface'):
+            root = elem.getroottree().getroot()
+            most = max(most, len(list(root.iter())))
+        return most
+
+    def test_memory_does_not_follow_reply_size(self):
+        # lxml reads ahead a buffer at a time, so the tree holds the rows
+        # of about one buffer however long the reply is
+        small = self._max_live_elements(
+            fixtures.show_interfaces(range(1, 1001)))
+        large = self._max_live_elements(
+            fixtures.show_interfaces(range(1, 4001)))
+        self.assertEqual(small, large)
+        self.assertTrue(small < 1000)
+
+    def test_reply_error(self):
+        reply = mock.Mock(xml=fixtures.ok())
+        self.assertIsNone(cisco_utils.reply_error(reply))
+        # looking at the error would have parsed the reply
+        self.assertEqual(reply.mock_calls, [])
+
+        reply = mock.Mock(xml=fixtures.rpc_error('ERROR: Invalid range'))
+        self.assertEqual(cisco_utils.reply_error(reply), reply.error)
@@ -0,0 +1,111 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# (c) Copyright 2015 Hewlett-Packard Development Company, L.P.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import eventlet
+
+from baremetal_neutron_extension.db import db
+from baremetal_neutron_extension.tests import base
+
+
+class TestPendingSaves(base.IronicMl2MechanismTestCase):
+    """Tests for the durable save queue against the test database."""
+
+    def _get(self, switch_host):
+        for row in db.get_all_pending_saves():
+            if row.switch_host == switch_host:
+                return row
+        return None
+
+    def test_upsert_bumps_generation(self):
+        db.upsert_pending_save('switch1.host.com')
+        self.assertEqual(self._get('switch1.host.com').generation, 0)
+
+        # more requests for the same switch merge into its row
+        db.upsert_pending_save('switch1.host.com')
+        db.upsert_pending_save('switch1.host.com')
+        db.upsert_pending_save('switch2.host.com')
+
+        self.assertEqual(len(db.get_all_pending_saves()), 2)
+        self.assertEqual(self._get('switch1.host.com').generation, 2)
+        self.assertEqual(self._get('switch2.host.com').generation, 0)
+
+    def test_claim_has_one_claimant(self):
+        db.upsert_pending_save('switch1.host.com')
+
+        workers = ['worker%d' % (i) for i in range(5)]
+        threads = [eventlet.spawn(db.claim_pending_saves, worker, 60)
+                   for worker in workers]
+        claims = [t.wait() for t in threads]
+
+        winners = [w for w, claimed in zip(workers, claims) if claimed]
+        self.assertEqual(len(winners), 1)
+        self.assertEqual(self._get('switch1.host.com').claimed_by,
+                         winners[0])
+
+    def test_claim_expired_lease(self):
+        db.upsert_pending_save('switch1.host.com')
+        db.claim_pending_saves('worker1', -1)
+
+        claimed = db.claim_pending_saves('worker2', 60)
+
+        self.assertEqual([r.claimed_by for r in claimed], ['worker2'])
+
+    def test_claim_filters(self):
+        db.upsert_pending_save('switch1.host.com')
+        db.upsert_pending_save('switch2.host.com')
+
+        claimed = db.claim_pending_saves('worker1', 60,
+                                         switch_host='switch2.host.com')
+
+        self.assertEqual([r.switch_host for r in claimed],
+                         ['switch2.host.com'])
+        self.assertEqual(self._get('switch1.host.com').claimed_by, None)
+
+    def test_release(self):
+        db.upsert_pending_save('switch1.host.com')
+        db.claim_pending_saves('worker1', 60)
+
+        # only the claimant can release
+        self.assertFalse(
+            db.release_pending_save('switch1.host.com', 'worker2'))
+        self.assertTrue(
+            db.release_pending_save('switch1.host.com', 'worker1'))
+
+        claimed = db.claim_pending_saves('worker2', 60)
+        self.assertEqual([r.claimed_by for r in claimed], ['worker2'])
+
+    def test_complete(self):
+        db.upsert_pending_save('switch1.host.com')
+        claimed = db.claim_pending_saves('worker1', 60)
+
+        self.assertTrue(db.complete_pending_save(
+            'switch1.host.com', 'worker1', claimed[0].generation))
+        self.assertEqual(db.get_all_pending_saves(), [])
+
+    def test_complete_stale_generation_releases(self):
+        db.upsert_pending_save('switch1.host.com')
+        claimed = db.claim_pending_saves('worker1', 60)
+
+        # another save was requested while worker1 was saving
+        db.upsert_pending_save('switch1.host.com')
+
+        self.assertFalse(db.complete_pending_save(
+            'switch1.host.com', 'worker1', claimed[0].generation))
+
+        row = self._get('switch1.host.com')
+        self.assertEqual(row.generation, 1)
+        self.assertEqual(row.claimed_by, None)
+        self.assertEqual(row.lease_expires, None)
@@ -14,6 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from baremetal_neutron_extension.db import db
 from baremetal_neutron_extension.tests import base
 
 
@@ -217,3 +218,28 @@ class TestIronicDriverManager(base.IronicMl2MechanismTestCase):
                 manager_port, switch['switch'], switchport)
             self._assert_netinfo_equals(
                 manager_port, port['port'], self.net2['network'])
+
+    def test_create_rolls_back_peers_on_failure(self):
+        switchports = self._make_switchports(
+            self.fmt, [self.switch1, self.switch2],
+            self.hardware_id, ['eth1/1', 'eth1/1'], ['eth0', 'eth1']
+        )
+
+        self.hw_driver.create.side_effect = [
+            None, Exception('failed configuring switch')]
+
+        self._make_port_with_switchports(
+            network=self.net1['network']['id'],
+            switchports=switchports,
+            commit=True,
+            expected_status_code=500)
+
+        # both peers were configured concurrently, and the one that
+        # succeeded was rolled back
+        self.assertHWDriverNotCalled(exclude=['create', 'delete'])
+        self.assertEqual(self.hw_driver.create.call_count, 2)
+        self.assertEqual(self.hw_driver.delete.call_count, 1)
+
+        mport = self.hw_driver.create.call_args_list[0][0][0]
+        self.assertEqual(self.hw_driver.delete.call_args[0][0], mport)
+        self.assertEqual(db.get_all_switchport_bindings(), [])
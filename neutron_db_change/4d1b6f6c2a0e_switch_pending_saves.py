@@ -0,0 +1,44 @@
+# Copyright 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""
+Baremetal-neutron-extension pending switch config saves
+
+Revision ID: 4d1b6f6c2a0e
+Revises: 3caaf9877f73
+Create Date: 2015-03-02 10:12:41.503417
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4d1b6f6c2a0e'
+down_revision = '3caaf9877f73'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade(active_plugins=None, options=None):
+    op.create_table(
+        'switch_pending_saves',
+        sa.Column('switch_host', sa.String(255), primary_key=True),
+        sa.Column('generation', sa.Integer, nullable=False),
+        sa.Column('requested_at', sa.DateTime, nullable=False),
+        sa.Column('claimed_by', sa.String(255), nullable=True),
+        sa.Column('lease_expires', sa.DateTime, nullable=True))
+
+
+def downgrade(active_plugins=None, options=None):
+    op.drop_table('switch_pending_saves')